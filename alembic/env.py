@@ -8,9 +8,10 @@ import sys
 # Add the parent directory to the path so we can import our models
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from app.core.config import settings
 from app.database import Base
 from app.models.user import User
-from app.models.document import Document, AnalysisResult
+from app.models.document import Document, AnalysisResult, StoredFile, DocumentSignature, LshBucket, RiskFeedback
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -21,6 +22,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Use the same database as the application (DATABASE_URL / .env)
+config.set_main_option("sqlalchemy.url", settings.database_url)
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 target_metadata = Base.metadata
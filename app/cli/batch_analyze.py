@@ -0,0 +1,426 @@
+"""
+Bulk-analyze a contract archive without going through the HTTP API.
+
+    python -m app.cli.batch_analyze --input /archive --output results.jsonl
+    python -m app.cli.batch_analyze --manifest files.txt --database --user-email archive@example.com
+
+Files are extracted and analyzed in a pool of worker processes, each limited to
+--memory-mb of address space and replaced after --tasks-per-worker files. The
+analyzer state is loaded once in this process and the workers are forked from
+it (app.services.worker_pool), so new workers start ready and share it.
+Extraction of each file is bounded by the extraction_* settings (CPU and wall
+clock time, pages, archive size) like in the API.
+Every finished file is appended to the checkpoint (<output>.checkpoint by
+default) after its results were written, so an interrupted run continues where
+it stopped when started again with the same arguments.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings, ensure_directories
+from app.core.tracing import traced
+from app.services.worker_pool import warm_executor
+
+READ_CHUNK = 1024 * 1024
+
+
+# Worker side ---------------------------------------------------------------
+
+def _init_worker(memory_mb: int):
+    if memory_mb > 0:
+        import resource
+
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+@traced("batch_analyze_file")
+def analyze_file(path: str, include_text: bool) -> dict:
+    """Extract and analyze one file; runs in a worker process"""
+    from app.services.ai_analyzer import get_analyzer
+    from app.services.contract_classifier import classify
+    from app.services.document_processor import ExtractionError
+    from app.services.extraction_sandbox import guarded_extract
+
+    result = {"path": path, "status": "analyzed", "error": None, "error_reason": None, "risks": []}
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(READ_CHUNK), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        result["sha256"] = digest.hexdigest()
+        result["size"] = size
+
+        content = guarded_extract(
+            path,
+            cpu_seconds=settings.extraction_cpu_seconds,
+            wall_seconds=settings.extraction_timeout_seconds
+        )
+        result["contract_type"] = classify(content, path)
+        risks = get_analyzer().analyze_document(content, contract_type=result["contract_type"])
+        result["characters"] = len(content)
+        result["risks"] = [
+            {
+                "rule_id": risk["rule_id"],
+                "level": risk["level"].value,
+                "text": risk["text"],
+                "explanation": risk["explanation"],
+                "start_position": risk["start_position"],
+                "end_position": risk["end_position"],
+                "confidence": risk["confidence"],
+            }
+            for risk in risks
+        ]
+        if include_text:
+            result["content"] = content
+    except ExtractionError as e:
+        result.update(status="error", error=str(e), error_reason=e.reason)
+    except MemoryError:
+        result.update(status="error", error="memory limit exceeded", error_reason="memory_limit")
+    except Exception as e:
+        result.update(status="error", error=str(e), error_reason="processing_failed")
+    return result
+
+
+# Inputs and checkpoint -------------------------------------------------------
+
+def iter_inputs(input_dir: Optional[str], manifest: Optional[str], extensions: List[str]) -> Iterator[str]:
+    if manifest:
+        with open(manifest, encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)["path"] if line.startswith("{") else line
+        return
+    for root, directories, files in os.walk(input_dir):
+        directories.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(root, name)
+
+
+class Checkpoint:
+    """Append-only list of finished paths"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as checkpoint_file:
+                self.done = {line.rstrip("\n") for line in checkpoint_file if line.strip()}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def mark(self, paths: List[str]):
+        self._file.writelines(f"{path}\n" for path in paths)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(paths)
+
+    def close(self):
+        self._file.close()
+
+
+# Sinks ---------------------------------------------------------------------
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, results: List[dict]):
+        for result in results:
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class DatabaseSink:
+    """Bulk insert of documents and findings; files are copied into the storage backend"""
+
+    def __init__(self, user_email: str):
+        from app.database import SessionLocal
+        from app.models.user import User
+        from app.services.ai_analyzer import get_analyzer
+        from app.services.reanalysis import register_ruleset
+        from app.services.storage import get_storage
+
+        self.db = SessionLocal()
+        self.storage = get_storage()
+        user = self.db.query(User).filter(User.email == user_email).first()
+        if user is None:
+            raise SystemExit(f"User {user_email} not found")
+        self.user_id = user.id
+        self.ruleset_version = register_ruleset(self.db, get_analyzer())
+        self.db.commit()
+
+    def write(self, results: List[dict]):
+        from sqlalchemy import insert
+
+        from app.models.document import AnalysisResult, Document, DocumentStatus, RiskLevel
+        from app.services.risk_storage import packed_record
+        from app.services.storage import add_reference, record_orphan
+        from app.services.text_store import text_store
+
+        staged = []
+        stored = []
+        documents = []
+        try:
+            for result in results:
+                if "sha256" not in result:
+                    continue  # unreadable file: nothing to store
+                handle, staging_path = tempfile.mkstemp(dir=settings.upload_dir, suffix=".upload")
+                os.close(handle)
+                shutil.copyfile(result["path"], staging_path)
+                staged.append((staging_path, result["sha256"], result["size"]))
+                add_reference(self.db, result["sha256"], result["size"])
+                document = Document(
+                    filename=f"{result['sha256']}{os.path.splitext(result['path'])[1].lower()}",
+                    original_filename=os.path.basename(result["path"]),
+                    file_path=self.storage.location(result["sha256"]),
+                    file_size=result["size"],
+                    content_hash=result["sha256"],
+                    content=result.get("content"),
+                    user_id=self.user_id,
+                    status=DocumentStatus.ANALYZED if result["status"] == "analyzed" else DocumentStatus.ERROR,
+                    contract_type=result.get("contract_type"),
+                    error_reason=result.get("error_reason"),
+                    error_detail=result["error"][:1000] if result.get("error") else None,
+                    ruleset_version=self.ruleset_version if result["status"] == "analyzed" else None
+                )
+                documents.append((document, result))
+            self.db.add_all(document for document, _ in documents)
+            self.db.flush()
+
+            if settings.risk_storage_mode == "packed":
+                self.db.add_all([
+                    packed_record(self.db, document.id, result["risks"], result.get("content"))
+                    for document, result in documents
+                    if result["status"] == "analyzed"
+                ])
+                rows = []
+            else:
+                rows = [
+                    {
+                        "document_id": document.id,
+                        "rule_id": risk["rule_id"],
+                        "risk_level": RiskLevel(risk["level"]),
+                        "text_fragment": risk["text"],
+                        "explanation": risk["explanation"],
+                        "start_position": risk["start_position"],
+                        "end_position": risk["end_position"],
+                        "confidence_score": risk["confidence"],
+                    }
+                    for document, result in documents
+                    for risk in result["risks"]
+                ]
+            if rows:
+                self.db.execute(insert(AnalysisResult), rows)
+            # Blobs go into storage before their references are committed (see the upload endpoint)
+            for staging_path, digest, size in staged:
+                self.storage.put(staging_path, digest)
+                stored.append((digest, size))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            for staging_path, _, _ in staged:
+                if os.path.exists(staging_path):
+                    os.remove(staging_path)
+            for digest, size in stored:
+                record_orphan(self.db, digest, size)
+            raise
+        for document, result in documents:
+            if result.get("content") is not None:
+                text_store.write(document.id, result["content"])
+        self.db.expunge_all()
+
+    def close(self):
+        self.db.close()
+
+
+# Driver --------------------------------------------------------------------
+
+class Progress:
+    def __init__(self, total: int, interval: float = 5.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, result: dict, force: bool = False):
+        if result is not None:
+            self.done += 1
+            self.bytes += result.get("size", 0)
+            self.errors += result["status"] != "analyzed"
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        remaining = (self.total - self.done) / rate if rate else float("inf")
+        eta = time.strftime("%H:%M:%S", time.gmtime(remaining)) if remaining != float("inf") else "?"
+        print(
+            f"[{self.done}/{self.total}] {rate:.1f} docs/s, {self.bytes / elapsed / 1e6:.1f} MB/s, "
+            f"{self.errors} errors, ETA {eta}",
+            file=sys.stderr,
+            flush=True
+        )
+
+
+class WorkerPool:
+    """Process pool that is replaced after ``tasks_per_worker`` files per worker
+
+    Recycling is done here rather than with max_tasks_per_child, which can
+    deadlock the executor on Python 3.11. Workers are forked from this process
+    after the analyzer state was preloaded in it, so a replacement pool starts
+    without rebuilding anything.
+    """
+
+    def __init__(self, workers: int, memory_mb: int, tasks_per_worker: int, include_text: bool):
+        self.workers = workers
+        self.memory_mb = memory_mb
+        self.task_budget = workers * tasks_per_worker if tasks_per_worker > 0 else 0
+        self.include_text = include_text
+        self.in_flight: Dict = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._submitted = 0
+
+    def can_submit(self) -> bool:
+        if self.task_budget and self._submitted >= self.task_budget:
+            return False
+        return len(self.in_flight) < self.workers * 4
+
+    def submit(self, path: str):
+        if self._executor is None:
+            self._executor = warm_executor(self.workers, initializer=_init_worker, initargs=(self.memory_mb,))
+        self.in_flight[self._executor.submit(analyze_file, path, self.include_text)] = path
+        self._submitted += 1
+
+    def recycle_if_exhausted(self):
+        if not self.in_flight and self._executor is not None and self.task_budget and self._submitted >= self.task_budget:
+            self.shutdown()
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+        self._submitted = 0
+
+
+def run(args) -> int:
+    extensions = [extension.lower() for extension in args.extensions]
+    checkpoint = Checkpoint(args.checkpoint)
+    pending = [path for path in iter_inputs(args.input, args.manifest, extensions) if path not in checkpoint.done]
+    print(f"{len(checkpoint.done)} file(s) already done, {len(pending)} to process", file=sys.stderr)
+
+    sink = DatabaseSink(args.user_email) if args.database else JsonlSink(args.output)
+    progress = Progress(len(pending), args.progress_interval)
+    buffer: List[dict] = []
+
+    def flush():
+        if buffer:
+            sink.write(buffer)
+            checkpoint.mark([result["path"] for result in buffer])
+            buffer.clear()
+
+    pool = WorkerPool(args.workers, args.memory_mb, args.tasks_per_worker, args.database or args.include_text)
+    crashes: Dict[str, int] = {}
+    queue = iter(pending)
+    try:
+        while True:
+            pool.recycle_if_exhausted()
+            while pool.can_submit():
+                path = next(queue, None)
+                if path is None:
+                    break
+                pool.submit(path)
+            if not pool.in_flight:
+                break
+
+            finished, _ = wait(pool.in_flight, return_when=FIRST_COMPLETED)
+            crashed = []
+            for future in finished:
+                path = pool.in_flight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    crashed.append(path)
+                    continue
+                buffer.append(result)
+                progress.update(result)
+
+            if crashed:
+                # A worker died (e.g. killed by the OOM killer) and took the pool with it.
+                # The culprit is unknown: retry every file that was in flight once in a
+                # new pool, and fail files that were in flight during a second crash.
+                retry = crashed + list(pool.in_flight.values())
+                pool.in_flight.clear()
+                pool.shutdown(wait=False)
+                for path in retry:
+                    crashes[path] = crashes.get(path, 0) + 1
+                    if crashes[path] > 1:
+                        result = {"path": path, "status": "error", "error": "worker crashed", "error_reason": "worker_crashed", "risks": []}
+                        buffer.append(result)
+                        progress.update(result)
+                    else:
+                        pool.submit(path)
+
+            if len(buffer) >= args.batch_size:
+                flush()
+        flush()
+    finally:
+        pool.shutdown()
+        sink.close()
+        checkpoint.close()
+    progress.update(None, force=True)
+    return 0 if progress.errors == 0 else 2
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-analyze a contract archive")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="directory to walk")
+    source.add_argument("--manifest", help="file with one path (or {\"path\": ...} JSON) per line")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="JSONL file to append results to")
+    target.add_argument("--database", action="store_true", help="insert documents and findings into the database")
+    parser.add_argument("--user-email", help="owner of the imported documents (with --database)")
+    parser.add_argument("--checkpoint", help="default: <output>.checkpoint or batch.checkpoint")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--memory-mb", type=int, default=1024, help="address space limit per worker, 0 disables")
+    parser.add_argument("--tasks-per-worker", type=int, default=500, help="recycle workers after this many files")
+    parser.add_argument("--batch-size", type=int, default=200, help="results per write/commit")
+    parser.add_argument("--extensions", nargs="+", default=settings.allowed_file_types)
+    parser.add_argument("--include-text", action="store_true", help="add extracted text to JSONL output")
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    if args.database and not args.user_email:
+        parser.error("--database requires --user-email")
+    if args.checkpoint is None:
+        args.checkpoint = f"{args.output}.checkpoint" if args.output else "batch.checkpoint"
+    if args.database:
+        ensure_directories()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
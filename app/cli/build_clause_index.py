@@ -0,0 +1,38 @@
+"""
+Build the similar-clause index from a clause library.
+
+    python -m app.cli.build_clause_index [--library data/risky_clauses.jsonl] [--output artifacts/clause_index]
+
+The library is JSON Lines with "id", "text", "risk_level" (low/medium/high)
+and "explanation" per clause. Restart the API afterwards: the index is
+memory-mapped once per process.
+"""
+
+import argparse
+import time
+
+from app.core.config import settings
+from app.services.clause_index import build_index, load_library
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the TF-IDF clause index")
+    parser.add_argument("--library", default=settings.clause_library_path)
+    parser.add_argument("--output", default=settings.clause_index_dir)
+    parser.add_argument("--n-features", type=int, default=2 ** 20)
+    parser.add_argument("--candidate-max-df", type=float, default=0.01,
+                        help="only n-grams in at most this share of clauses generate candidates")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = build_index(load_library(args.library), args.output, n_features=args.n_features, candidate_max_df=args.candidate_max_df)
+    print(
+        f"Indexed {stats['clauses']} clauses ({stats['nonzeros']} non-zeros, "
+        f"{stats['candidate_nonzeros']} used for candidates) "
+        f"into {args.output} in {time.perf_counter() - started:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+"""
+(Re)build MinHash signatures and LSH buckets for documents with extracted text.
+
+    python -m app.cli.similarity_index [--all] [--batch-size 200]
+
+Without --all only documents that have no signature yet are indexed; use --all
+after changing the similarity_* settings.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.document import Document, DocumentSignature
+from app.services.similarity import index_document
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the near-duplicate index")
+    parser.add_argument("--all", action="store_true", help="reindex documents that already have a signature")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    indexed = 0
+    last_id = 0
+    try:
+        while True:
+            query = db.query(Document).filter(Document.content.isnot(None), Document.id > last_id)
+            if not args.all:
+                query = query.outerjoin(DocumentSignature).filter(
+                    (DocumentSignature.document_id.is_(None)) | (DocumentSignature.num_perm != settings.similarity_num_perm)
+                )
+            documents = query.order_by(Document.id).limit(args.batch_size).all()
+            if not documents:
+                break
+            for document in documents:
+                index_document(db, document, document.content)
+            db.commit()
+            indexed += len(documents)
+            last_id = documents[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+    print(f"Indexed {indexed} document(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
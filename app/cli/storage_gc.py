@@ -0,0 +1,31 @@
+"""
+Remove stored files that no document references any more.
+
+    python -m app.cli.storage_gc [--grace-seconds 3600] [--batch-size 500]
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.storage import get_storage, collect_garbage
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Garbage-collect unreferenced stored files")
+    parser.add_argument("--grace-seconds", type=int, default=settings.storage_gc_grace_seconds,
+                        help="keep blobs orphaned more recently than this")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        removed = collect_garbage(db, get_storage(), batch_size=args.batch_size, grace_seconds=args.grace_seconds)
+    finally:
+        db.close()
+    print(f"Removed {removed} unreferenced stored file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+"""
+Aggregate traces written by app.core.tracing (JSON Lines, one span per line).
+
+    python -m app.cli.trace_summary traces.jsonl [--root "POST /documents/upload"] [--slowest 5]
+
+For every span name the report gives the number of spans, their median and
+p95 duration and the time they spent on the critical path of their traces,
+i.e. the time by which the root would have finished earlier without them.
+Time of a span not covered by a child on the critical path is its own
+("self") time. Spans whose trace root is missing from the files (still
+running) are ignored; a trace continued from a caller's traceparent is rooted
+at its first local span.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+def load_traces(paths: Iterable[str]) -> Dict[str, List[dict]]:
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as source:
+            for line in source:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crashed writer
+                if record.get("duration") is not None:
+                    traces[record["trace_id"]].append(record)
+    return traces
+
+
+def trace_root(spans: List[dict]):
+    """The longest span whose parent is not in the trace (the request or job span)"""
+    span_ids = {record["span_id"] for record in spans}
+    roots = [record for record in spans if record["parent_id"] not in span_ids]
+    return max(roots, key=lambda record: record["duration"]) if roots else None
+
+
+def critical_path(spans: List[dict]) -> Dict[str, float]:
+    """Seconds each span name contributed to the critical path of the trace"""
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for record in spans:
+        children[record["parent_id"]].append(record)
+    contributions: Dict[str, float] = defaultdict(float)
+
+    def walk(record: dict, limit: float):
+        # Walk back from the span's end: the child finishing last is on the path,
+        # then the child finishing last before that child started, and so on
+        start = record["start"]
+        cursor = min(record["start"] + record["duration"], limit)
+        for child in sorted(children[record["span_id"]], key=lambda c: c["start"] + c["duration"], reverse=True):
+            child_end = child["start"] + child["duration"]
+            if child["start"] >= cursor or child_end <= start:
+                continue
+            if child_end < cursor:
+                contributions[record["name"]] += cursor - child_end
+            walk(child, cursor)
+            cursor = max(child["start"], start)
+        contributions[record["name"]] += max(cursor - start, 0.0)
+
+    root = trace_root(spans)
+    if root is not None:
+        walk(root, float("inf"))
+    return contributions
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(traces: Dict[str, List[dict]], root_name: str = None, slowest: int = 5, output=sys.stdout) -> int:
+    durations: Dict[str, List[float]] = defaultdict(list)
+    on_path: Dict[str, float] = defaultdict(float)
+    roots = []
+    for spans in traces.values():
+        root = trace_root(spans)
+        if root is None or (root_name and root["name"] != root_name):
+            continue
+        roots.append((root, spans))
+        for record in spans:
+            durations[record["name"]].append(record["duration"])
+        for name, seconds in critical_path(spans).items():
+            on_path[name] += seconds
+
+    if not roots:
+        print("No complete traces found", file=output)
+        return 1
+
+    total = sum(root["duration"] for root, _ in roots)
+    root_durations = [root["duration"] for root, _ in roots]
+    print(f"{len(roots)} traces, root median {statistics.median(root_durations) * 1000:.1f} ms, "
+          f"p95 {percentile(root_durations, 0.95) * 1000:.1f} ms, max {max(root_durations) * 1000:.1f} ms\n", file=output)
+    print(f"{'span':<40} {'count':>7} {'median ms':>10} {'p95 ms':>10} {'critical path s':>16} {'share':>6}", file=output)
+    for name in sorted(durations, key=lambda name: -on_path.get(name, 0.0)):
+        values = durations[name]
+        print(f"{name[:40]:<40} {len(values):>7} {statistics.median(values) * 1000:>10.1f} "
+              f"{percentile(values, 0.95) * 1000:>10.1f} {on_path.get(name, 0.0):>16.3f} "
+              f"{on_path.get(name, 0.0) / total:>6.1%}", file=output)
+
+    if slowest:
+        print("\nslowest traces:", file=output)
+        for root, spans in sorted(roots, key=lambda item: -item[0]["duration"])[:slowest]:
+            path = sorted(critical_path(spans).items(), key=lambda item: -item[1])
+            breakdown = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in path[:4])
+            print(f"  {root['trace_id']} {root['name']} {root['duration'] * 1000:.0f} ms: {breakdown}", file=output)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize pipeline traces (critical-path timings)")
+    parser.add_argument("files", nargs="+", help="JSON Lines files written by the tracing exporter")
+    parser.add_argument("--root", help="only traces whose root span has this name")
+    parser.add_argument("--slowest", type=int, default=5, help="list the N slowest traces")
+    args = parser.parse_args(argv)
+    return summarize(load_traces(args.files), root_name=args.root, slowest=args.slowest)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+"""
+Train the risk confidence scorer from reviewer feedback.
+
+    python -m app.cli.train_risk_scorer [--output artifacts/risk_scorer.joblib] [--min-samples 50]
+
+The model is written as a versioned artifact next to --output and --output is
+switched to it atomically; running API processes pick it up on restart.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.risk_scorer import RiskScorer, build_pipeline, new_version, training_rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train the learned risk scorer")
+    parser.add_argument("--output", default=settings.risk_scorer_path)
+    parser.add_argument("--min-samples", type=int, default=50,
+                        help="refuse to train on less feedback than this")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds for the report")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        features, labels = training_rows(db)
+    finally:
+        db.close()
+
+    positives = sum(labels)
+    negatives = len(labels) - positives
+    print(f"Feedback: {len(labels)} findings ({positives} confirmed, {negatives} rejected)")
+    if len(labels) < args.min_samples or not positives or not negatives:
+        print("Not enough feedback with both verdicts to train; keeping the current scorer")
+        return 1
+
+    from sklearn.model_selection import cross_val_score
+
+    pipeline = build_pipeline()
+    folds = min(args.folds, positives, negatives)
+    metadata = {"samples": len(labels), "positives": positives}
+    if folds >= 2:
+        scores = cross_val_score(pipeline, features, labels, cv=folds, scoring="roc_auc")
+        metadata["cv_roc_auc"] = float(scores.mean())
+        print(f"Cross-validated ROC AUC: {scores.mean():.3f} (+/- {scores.std():.3f}, {folds} folds)")
+
+    pipeline.fit(features, labels)
+    scorer = RiskScorer(pipeline, new_version(), metadata)
+    path = scorer.save(args.output)
+    print(f"Saved scorer version {scorer.version} to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
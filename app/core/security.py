@@ -6,7 +6,7 @@ from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.database import get_db
+from app.database import get_db, read_session_factory
 from app.models.user import User
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -58,3 +58,22 @@ def get_current_user(
         raise credentials_exception
     
     return user
+
+def get_read_db(current_user: User = Depends(get_current_user)):
+    """Read-only session for the current user: a read replica unless the user has just written"""
+    db = read_session_factory(current_user.id)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def is_admin(user: User) -> bool:
+    return user.email in settings.admin_emails
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required"
+        )
+    return current_user
@@ -0,0 +1,225 @@
+"""
+Span-based tracing of the document pipeline.
+
+A span is a named, timed operation with attributes; spans opened inside
+another span become its children and share its trace id. The current span is
+kept in a ContextVar, so it follows asyncio tasks automatically; threads get
+it through ``propagating`` and other processes through a W3C ``traceparent``
+string (``span(..., parent=traceparent)`` on the other side).
+
+Finished spans of sampled traces are handed to ``exporters``; by default one
+JSON object per line is appended to settings.tracing_file (an O_APPEND write
+per span, so worker processes can share the file). Summaries:
+``python -m app.cli.trace_summary traces.jsonl``.
+
+Disabled (settings.tracing_enabled = False) a span costs one attribute check.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start", "duration", "status", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def as_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "pid": os.getpid(),
+            "attributes": self.attributes,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) of a W3C traceparent header, or None if malformed"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """Context to hand to another process, or None outside a trace"""
+    active = _current.get()
+    return active.traceparent if active is not None else None
+
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attributes):
+    """Time the block as a span; ``parent`` is a traceparent from another process"""
+    if not settings.tracing_enabled:
+        yield None
+        return
+    remote = parse_traceparent(parent)
+    current = _current.get()
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    elif current is not None:
+        trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < settings.tracing_sample_rate
+    active = Span(name, trace_id, parent_id, sampled, attributes)
+    token = _current.set(active)
+    started = time.perf_counter()
+    try:
+        yield active
+    except BaseException as e:
+        active.status = "error"
+        active.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        active.duration = time.perf_counter() - started
+        _current.reset(token)
+        if active.sampled:
+            _export(active)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running every call of a function (sync or async) in a span"""
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def propagating(function: Callable) -> Callable:
+    """``function`` bound to the caller's context, for running in another thread"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return context.run(function, *args, **kwargs)
+    return wrapper
+
+
+# Exporters -----------------------------------------------------------------
+
+class JsonlExporter:
+    """Appends finished spans to a JSON Lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, finished: Span):
+        line = (json.dumps(finished.as_dict(), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid():
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+            os.write(self._fd, line)
+
+
+# Callables(span) receiving finished spans; the JSONL file exporter is added on first use
+exporters: List[Callable[[Span], None]] = []
+_default_exporter: Optional[JsonlExporter] = None
+
+
+def _export(finished: Span):
+    global _default_exporter
+    if settings.tracing_file and (_default_exporter is None or _default_exporter.path != settings.tracing_file):
+        _default_exporter = JsonlExporter(settings.tracing_file)
+    for exporter in ([_default_exporter] if settings.tracing_file else []) + exporters:
+        try:
+            exporter(finished)
+        except Exception:
+            pass  # tracing must never fail the traced operation
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per request (continuing an incoming traceparent)
+
+    The response carries the trace id in X-Trace-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.tracing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        incoming = headers.get(b"traceparent", b"").decode("latin-1") or None
+        with span(f"{scope['method']} {scope['path']}", parent=incoming, method=scope["method"]) as request_span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    request_span.set(status=message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", request_span.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    # Route template instead of the concrete path, so traces group by endpoint
+                    request_span.name = f"{scope['method']} {route.path}"
@@ -1,11 +1,27 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core import metrics
 
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _pool_usage():
+    pool = engine.pool
+    usage = {}
+    for state, method in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow"), ("checked_in", "checkedin")):
+        if hasattr(pool, method):
+            usage[(state,)] = getattr(pool, method)()
+    return usage
+
+metrics.gauge("db_pool_connections", "Connection pool usage of the primary engine", ("state",), callback=_pool_usage)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,3 +30,111 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Read replicas -------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+replica_reads = metrics.counter(
+    "db_read_sessions_total",
+    "Read-only request sessions, by target (replica index or primary) and why the primary was used",
+    ("target",)
+)
+
+class ReadReplicas:
+    """Round-robin over the healthy read replicas
+
+    A replica is checked with SELECT 1 when its last check is older than
+    ``check_interval`` seconds; a failed replica is skipped until the next
+    check. Users who wrote within ``sticky_seconds`` read from the primary, so
+    they see their own upload before it reaches the replicas.
+    """
+
+    def __init__(self, urls, check_interval: float, sticky_seconds: float):
+        self.engines = [create_engine(url, pool_pre_ping=True) for url in urls]
+        self.factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, info={"replica": True})
+            for replica_engine in self.engines
+        ]
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._healthy = [True] * len(self.engines)
+        self._checked_at = [float("-inf")] * len(self.engines)
+        self._next = 0
+        self._recent_writers: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, index: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at[index] < self.check_interval:
+                return self._healthy[index]
+            self._checked_at[index] = now
+        try:
+            with self.engines[index].connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy = True
+        except Exception as e:
+            logger.warning("Read replica %d failed its health check: %s", index, e)
+            healthy = False
+        self._healthy[index] = healthy
+        return healthy
+
+    def mark_written(self, user_id: int):
+        """Keep the user's reads on the primary for the next ``sticky_seconds``"""
+        with self._lock:
+            now = time.monotonic()
+            self._recent_writers[user_id] = now + self.sticky_seconds
+            if len(self._recent_writers) > 10000:
+                self._recent_writers = {
+                    writer: until for writer, until in self._recent_writers.items() if until > now
+                }
+
+    def _sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._recent_writers.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def session_factory(self, user_id: Optional[int] = None) -> sessionmaker:
+        """Next healthy replica, or the primary's factory if none is usable"""
+        if self._sticky(user_id):
+            replica_reads.inc(target="primary_sticky")
+            return SessionLocal
+        for _ in range(len(self.factories)):
+            with self._lock:
+                index = self._next
+                self._next = (self._next + 1) % len(self.factories)
+            if self._check(index):
+                replica_reads.inc(target=f"replica_{index}")
+                return self.factories[index]
+        replica_reads.inc(target="primary_fallback")
+        return SessionLocal
+
+    def status(self) -> Dict:
+        return {
+            "replicas": [
+                {"url": replica_engine.url.render_as_string(hide_password=True), "healthy": healthy}
+                for replica_engine, healthy in zip(self.engines, self._healthy)
+            ],
+            "sticky_users": sum(until > time.monotonic() for until in list(self._recent_writers.values())),
+        }
+
+read_replicas = ReadReplicas(
+    settings.database_replica_urls,
+    settings.replica_health_check_seconds,
+    settings.read_your_writes_seconds
+)
+
+metrics.gauge(
+    "db_replica_healthy",
+    "Read replicas by result of their last health check (1 healthy, 0 failed)",
+    ("replica",),
+    callback=lambda: {(str(index),): int(healthy) for index, healthy in enumerate(read_replicas._healthy)}
+)
+
+def read_session_factory(user_id: Optional[int] = None) -> sessionmaker:
+    """Session factory for read-only work: a replica if configured and healthy, else the primary"""
+    if not read_replicas.factories:
+        return SessionLocal
+    return read_replicas.session_factory(user_id)
@@ -1,5 +1,5 @@
 # Database models
 from .user import User
-from .document import Document, DocumentStatus, AnalysisResult, RiskLevel
+from .document import Document, DocumentStatus, AnalysisResult, RiskLevel, StoredFile, DocumentSignature, LshBucket, RiskFeedback, Ruleset, Rule, DocumentRisks
 
-__all__ = ["User", "Document", "DocumentStatus", "AnalysisResult", "RiskLevel"]
+__all__ = ["User", "Document", "DocumentStatus", "AnalysisResult", "RiskLevel", "StoredFile", "DocumentSignature", "LshBucket", "RiskFeedback", "Ruleset", "Rule", "DocumentRisks"]
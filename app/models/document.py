@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, LargeBinary, Boolean, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -17,14 +17,23 @@ class RiskLevel(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_user_id_created_at", "user_id", "created_at"),  # a user's documents by upload time
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), ForeignKey("stored_files.sha256"), index=True)  # SHA-256 of the stored file
     content = Column(Text)
+    previous_document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), index=True)  # earlier version of the same contract
+    ruleset_version = Column(String(16), ForeignKey("rulesets.version"), index=True)  # ruleset that produced the analysis results
+    contract_type = Column(String(32), index=True)  # detected type; selects the rules that were run
     status = Column(Enum(DocumentStatus), default=DocumentStatus.UPLOADED)
+    error_reason = Column(String(32))  # why the status is ERROR, e.g. "timeout" or "page_limit"
+    error_detail = Column(Text)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -32,12 +41,87 @@ class Document(Base):
     # Relationships
     user = relationship("User", back_populates="documents")
     analysis_results = relationship("AnalysisResult", back_populates="document", cascade="all, delete-orphan")
+    signature = relationship("DocumentSignature", uselist=False, cascade="all, delete-orphan")
+    lsh_buckets = relationship("LshBucket", cascade="all, delete-orphan")
+    packed_risks = relationship("DocumentRisks", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def findings(self):
+        """Analysis results in either storage mode: result rows or the lazily decoded packed record"""
+        if self.packed_risks is not None:
+            return self.packed_risks.results(self)
+        return self.analysis_results
+
+class Ruleset(Base):
+    """Rule versions ({rule_id: version}) behind a ruleset version recorded on documents"""
+    __tablename__ = "rulesets"
+
+    version = Column(String(16), primary_key=True)
+    rules = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Rule(Base):
+    """Rule and explanation referenced by packed risk records"""
+    __tablename__ = "rules"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(40), nullable=False, unique=True)  # SHA-1 of (rule_id, risk_level, explanation)
+    rule_id = Column(String, nullable=False, index=True)
+    risk_level = Column(Enum(RiskLevel), nullable=False)
+    explanation = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DocumentRisks(Base):
+    """All risks of a document in one packed record (settings.risk_storage_mode = "packed")"""
+    __tablename__ = "document_risks"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    risk_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # see app.services.risk_storage
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def results(self, document: "Document"):
+        from app.services.risk_storage import PackedResults
+
+        decoded = self.__dict__.get("_decoded")
+        if decoded is None or decoded.data is not self.data:
+            decoded = PackedResults(self, document)
+            self.__dict__["_decoded"] = decoded
+        return decoded
+
+class StoredFile(Base):
+    """Content-addressed blob shared by all documents with identical bytes"""
+    __tablename__ = "stored_files"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    orphaned_at = Column(DateTime(timezone=True), index=True)  # set when ref_count drops to 0
+
+class DocumentSignature(Base):
+    """MinHash signature of a document's text, used for near-duplicate search"""
+    __tablename__ = "document_signatures"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # num_perm little-endian uint32 values
+    num_perm = Column(Integer, nullable=False)
+    shingle_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LshBucket(Base):
+    """One LSH band of a document signature; documents sharing a bucket are candidates"""
+    __tablename__ = "lsh_buckets"
+
+    bucket = Column(BigInteger, primary_key=True)  # hash of (band number, band values)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, index=True)
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    rule_id = Column(String, index=True)
     risk_level = Column(Enum(RiskLevel), nullable=False)
     text_fragment = Column(Text, nullable=False)
     explanation = Column(Text, nullable=False)
@@ -48,3 +132,20 @@ class AnalysisResult(Base):
 
     # Relationships
     document = relationship("Document", back_populates="analysis_results")
+    feedback = relationship("RiskFeedback", back_populates="analysis_result", cascade="all, delete-orphan")
+
+class RiskFeedback(Base):
+    """Reviewer verdict on a reported risk; training data for the risk scorer"""
+    __tablename__ = "risk_feedback"
+    __table_args__ = (UniqueConstraint("analysis_result_id", "user_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_result_id = Column(Integer, ForeignKey("analysis_results.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    is_risk = Column(Boolean, nullable=False)  # False: false positive
+    comment = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    analysis_result = relationship("AnalysisResult", back_populates="feedback")
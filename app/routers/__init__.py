@@ -1,4 +1,4 @@
 # API routers
-from . import auth, documents
+from . import auth, documents, admin
 
-__all__ = ["auth", "documents"]
+__all__ = ["auth", "documents", "admin"]
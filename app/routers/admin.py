@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.models.user import User
+from app.core.security import get_current_admin
+from app.services.profiler import list_profiles, profile_file_path, profiling_switch, PROFILE_MODES
+from app.services.reanalysis import reanalysis_job
+from app.services.admission import admission
+from app.services.response_cache import response_cache
+from app.database import read_replicas
+
+router = APIRouter()
+
+class ProfilingRequest(BaseModel):
+    jobs: int = 1
+    mode: str = "cprofile"
+
+class ReanalysisRequest(BaseModel):
+    max_docs_per_second: Optional[float] = None
+
+@router.get("/profiles")
+async def get_profiles(
+    document_id: Optional[int] = None,
+    current_user: User = Depends(get_current_admin)
+) -> List[dict]:
+    return list_profiles(document_id)
+
+@router.get("/profiles/{document_id}/{filename}")
+async def download_profile(
+    document_id: int,
+    filename: str,
+    current_user: User = Depends(get_current_admin)
+):
+    path = profile_file_path(document_id, filename)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, filename=f"document-{document_id}-{filename}")
+
+@router.get("/profiling")
+async def get_profiling_switch(current_user: User = Depends(get_current_admin)):
+    return profiling_switch.status()
+
+@router.post("/profiling")
+async def arm_profiling(
+    request: ProfilingRequest,
+    current_user: User = Depends(get_current_admin)
+):
+    """Profile the next N processing jobs regardless of who uploads them"""
+    if request.mode not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown profile mode. Allowed modes: {list(PROFILE_MODES)}"
+        )
+    profiling_switch.arm(request.jobs, request.mode)
+    return profiling_switch.status()
+
+@router.get("/reanalysis")
+async def get_reanalysis(current_user: User = Depends(get_current_admin)):
+    return reanalysis_job.status()
+
+@router.post("/reanalysis")
+async def start_reanalysis(
+    request: ReanalysisRequest,
+    current_user: User = Depends(get_current_admin)
+):
+    """Bring documents analyzed with older rules up to the current ruleset in the background"""
+    if request.max_docs_per_second is not None and request.max_docs_per_second <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="max_docs_per_second must be positive"
+        )
+    try:
+        return reanalysis_job.start(request.max_docs_per_second)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.post("/reanalysis/pause")
+async def pause_reanalysis(current_user: User = Depends(get_current_admin)):
+    return reanalysis_job.pause()
+
+@router.post("/reanalysis/resume")
+async def resume_reanalysis(current_user: User = Depends(get_current_admin)):
+    return reanalysis_job.resume()
+
+@router.post("/reanalysis/cancel")
+async def cancel_reanalysis(current_user: User = Depends(get_current_admin)):
+    return reanalysis_job.cancel()
+
+@router.get("/admission")
+async def get_admission(current_user: User = Depends(get_current_admin)):
+    return admission.status()
+
+@router.get("/replicas")
+async def get_replicas(current_user: User = Depends(get_current_admin)):
+    return read_replicas.status()
+
+@router.get("/cache")
+async def get_cache(current_user: User = Depends(get_current_admin)):
+    return response_cache.stats()
@@ -1,28 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, defer, selectinload
+from typing import List, Optional
+import asyncio
 import os
-import uuid
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, read_replicas, read_session_factory
 from app.models.user import User
-from app.models.document import Document, DocumentStatus, AnalysisResult, RiskLevel
+from app.models.document import Document, DocumentStatus, AnalysisResult, DocumentRisks, RiskLevel, RiskFeedback
 from app.schemas.document import (
     Document as DocumentSchema, 
     DocumentUploadResponse,
-    DocumentAnalysisResponse
+    DocumentAnalysisResponse,
+    DocumentComparisonResponse,
+    SimilarDocument,
+    RiskFeedback as RiskFeedbackSchema,
+    RiskFeedbackCreate,
+    TextWindow
 )
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_read_db, is_admin
+from app.core.tracing import traced
 from app.core.config import settings
-from app.services.document_processor import DocumentProcessor
-from app.services.ai_analyzer import AIAnalyzer
+from app.core.metrics import stage_timer, pipeline_bytes, documents_processed, count_risks, processing_queue_depth, analysis_reuse
+from app.services.document_processor import ExtractionError
+from app.services.extraction_sandbox import extract_text
+from app.services.ai_analyzer import get_analyzer
+from app.services.contract_classifier import classify
+from app.services.response_cache import response_cache
+from app.services.profiler import ProfileCapture, PROFILE_MODES, profiling_switch
+from app.services.version_compare import compare_versions, reanalyze_changes, risks_from_results
+from app.services.similarity import index_document, find_similar, stored_signature
+from app.services.storage import get_storage, stage_upload, add_reference, record_orphan, release_reference, FileTooLargeError
+from app.services.export import EXPORT_FORMATS, export_query, packed_export_query, stream_export
+from app.services.reanalysis import register_ruleset
+from app.services.admission import admission, AdmissionRejected
+from app.services.risk_storage import find_result, level_counts, store_risks
+from app.services.text_store import text_store
 
 router = APIRouter()
 
 @router.post("/upload", response_model=DocumentUploadResponse)
+@traced("upload_document")
 async def upload_document(
     file: UploadFile = File(...),
+    previous_document_id: Optional[int] = Form(None),
+    x_profile: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -34,67 +57,171 @@ async def upload_document(
             detail=f"File type {file_extension} not allowed. Allowed types: {settings.allowed_file_types}"
         )
     
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > settings.max_file_size:
+    # A new version of an earlier contract is analyzed incrementally against it
+    if previous_document_id is not None:
+        previous = db.query(Document.id).filter(
+            Document.id == previous_document_id,
+            Document.user_id == current_user.id
+        ).first()
+        if not previous:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Previous document not found"
+            )
+    
+    # Stream the upload to a staging file, hashing it and validating its size
+    try:
+        with stage_timer("upload_read"):
+            staging_path, content_hash, file_size = await stage_upload(file, settings.max_file_size)
+    except FileTooLargeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size: {settings.max_file_size} bytes"
+            detail=str(e)
         )
+    pipeline_bytes.inc(file_size, stage="upload_read")
     
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(settings.upload_dir, unique_filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
-    
-    # Create document record
-    document = Document(
-        filename=unique_filename,
-        original_filename=file.filename,
-        file_path=file_path,
-        file_size=len(file_content),
-        user_id=current_user.id,
-        status=DocumentStatus.UPLOADED
-    )
-    
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    # Admission control: per-user rate and in-flight bytes, global backlog
+    ticket = None
+    if settings.admission_enabled:
+        try:
+            ticket = admission.admit(current_user.id, file_size)
+        except AdmissionRejected as e:
+            os.remove(staging_path)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
     
-    # Start processing in background (in real implementation, use Celery or similar)
     try:
-        await process_document_async(document.id, db)
-    except Exception as e:
-        document.status = DocumentStatus.ERROR
-        db.commit()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing document: {str(e)}"
+        # Create document record; identical files share one stored blob
+        storage = get_storage()
+        document = Document(
+            filename=f"{content_hash}{file_extension}",
+            original_filename=file.filename,
+            file_path=storage.location(content_hash),
+            file_size=file_size,
+            content_hash=content_hash,
+            previous_document_id=previous_document_id,
+            user_id=current_user.id,
+            status=DocumentStatus.UPLOADED
         )
+        # Database writes wait for locks held by documents being processed; keep them off the loop
+        await asyncio.to_thread(_store_upload, db, storage, document, staging_path)
+        document_id = document.id
+    
+        # Opt-in profiling: X-Profile header (administrators only) or the admin switch
+        profile_mode = None
+        if x_profile and is_admin(current_user):
+            profile_mode = x_profile.lower() if x_profile.lower() in PROFILE_MODES else "cprofile"
+        if profile_mode is None:
+            profile_mode = profiling_switch.take()
+    
+        # Start processing in background (in real implementation, use Celery or similar)
+        try:
+            if ticket is not None:
+                await admission.wait_turn(ticket)
+            document_status = await process_document_async(document_id, db, profile_mode=profile_mode)
+        except Exception as e:
+            await asyncio.to_thread(_mark_error, db, document)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing document: {str(e)}"
+            )
+    finally:
+        if ticket is not None:
+            admission.finish(ticket)
+        read_replicas.mark_written(current_user.id)
     
     return DocumentUploadResponse(
-        document_id=document.id,
+        document_id=document_id,
         message="Document uploaded successfully",
-        status=document.status
+        status=document_status
     )
 
+def _store_upload(db: Session, storage, document: Document, staging_path: str):
+    """Move the staged upload into storage and commit its Document (blocking)
+
+    The blob is stored before its reference is committed: a failed commit
+    leaves an orphan for the garbage collector, never a Document without a blob.
+    """
+    stored = False
+    try:
+        add_reference(db, document.content_hash, document.file_size)
+        db.add(document)
+        db.flush()
+        # Move the staged file into storage (dropped if the blob already exists)
+        with stage_timer("file_write"):
+            storage.put(staging_path, document.content_hash)
+        stored = True
+        with stage_timer("db_commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        if stored:
+            record_orphan(db, document.content_hash, document.file_size)
+        raise
+    db.refresh(document)
+
+def _mark_error(db: Session, document: Document):
+    document.status = DocumentStatus.ERROR
+    db.commit()
+
 @router.get("/", response_model=List[DocumentSchema])
 async def get_documents(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
+    # Results are loaded for all listed documents at once instead of one query per document
+    documents = db.query(Document).options(
+        selectinload(Document.analysis_results),
+        selectinload(Document.packed_risks)
+    ).filter(Document.user_id == current_user.id).all()
     return documents
 
+@router.get("/export")
+async def export_results(
+    export_format: str = Query("csv", alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    document_status: Optional[List[DocumentStatus]] = Query(None, alias="status"),
+    risk_level: Optional[List[RiskLevel]] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Every finding across the user's documents, streamed as CSV, JSON Lines or XLSX
+
+    date_from/date_to bound the upload time (date_to exclusive); status and
+    risk_level may be repeated.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export format. Allowed formats: {list(EXPORT_FORMATS)}"
+        )
+    query = export_query(current_user.id, date_from, date_to, document_status, risk_level)
+    packed_query = packed_export_query(current_user.id, date_from, date_to, document_status)
+    media_type = EXPORT_FORMATS[export_format][0]
+    filename = f"risks-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        stream_export(export_format, query, session_factory=read_session_factory(current_user.id),
+                      packed_query=packed_query, risk_levels=risk_level),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/{document_id}", response_model=DocumentSchema)
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
+    cached = response_cache.get(current_user.id, document_id, "document")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    generation = response_cache.generation(document_id)
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.user_id == current_user.id
@@ -106,14 +233,23 @@ async def get_document(
             detail="Document not found"
         )
     
-    return document
+    body = DocumentSchema.model_validate(document).model_dump_json().encode("utf-8")
+    if not db.info.get("replica"):
+        # A lagging replica may predate the generation; only primary reads are cached
+        response_cache.set(current_user.id, document_id, "document", body, generation)
+    return Response(content=body, media_type="application/json")
 
 @router.get("/{document_id}/analysis", response_model=DocumentAnalysisResponse)
 async def get_document_analysis(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
+    cached = response_cache.get(current_user.id, document_id, "analysis")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    generation = response_cache.generation(document_id)
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.user_id == current_user.id
@@ -126,59 +262,379 @@ async def get_document_analysis(
         )
     
     # Count risks by level
-    high_risks = len([r for r in document.analysis_results if r.risk_level == RiskLevel.HIGH])
-    medium_risks = len([r for r in document.analysis_results if r.risk_level == RiskLevel.MEDIUM])
-    low_risks = len([r for r in document.analysis_results if r.risk_level == RiskLevel.LOW])
+    counts = level_counts(document)
     
-    return DocumentAnalysisResponse(
+    analysis = DocumentAnalysisResponse(
         document=document,
-        total_risks=len(document.analysis_results),
-        high_risks=high_risks,
-        medium_risks=medium_risks,
-        low_risks=low_risks
+        total_risks=len(document.findings),
+        high_risks=counts[RiskLevel.HIGH],
+        medium_risks=counts[RiskLevel.MEDIUM],
+        low_risks=counts[RiskLevel.LOW]
     )
+    
+    body = analysis.model_dump_json().encode("utf-8")
+    if not db.info.get("replica"):
+        response_cache.set(current_user.id, document_id, "analysis", body, generation)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/{document_id}/compare/{other_document_id}", response_model=DocumentComparisonResponse)
+async def compare_documents(
+    document_id: int,
+    other_document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Diff a document against another version (the base) and report the risk delta"""
+    documents = {
+        document.id: document
+        for document in db.query(Document).filter(
+            Document.id.in_([document_id, other_document_id]),
+            Document.user_id == current_user.id
+        )
+    }
+    if document_id not in documents or other_document_id not in documents:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    document, base = documents[document_id], documents[other_document_id]
+    if document.status != DocumentStatus.ANALYZED or base.status != DocumentStatus.ANALYZED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Both documents must be analyzed before comparison"
+        )
+    
+    analyzer = get_analyzer()
+    with stage_timer("compare_versions"):
+        comparison = compare_versions(
+            base.content or "",
+            risks_from_results(analyzer, base.findings, require_positions=False),
+            document.content or "",
+            risks_from_results(analyzer, document.findings, require_positions=False)
+        )
+    
+    body = DocumentComparisonResponse(
+        base_document_id=base.id,
+        document_id=document.id,
+        **comparison
+    ).model_dump_json().encode("utf-8")
+    return Response(content=body, media_type="application/json")
+
+@router.get("/{document_id}/similar", response_model=List[SimilarDocument])
+async def get_similar_documents(
+    document_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Near-duplicates of a document among the user's documents (MinHash/LSH)"""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    signature = stored_signature(db, document_id)
+    if signature is None:
+        return []
+    
+    return [
+        SimilarDocument(
+            document_id=similar.id,
+            original_filename=similar.original_filename,
+            status=similar.status,
+            similarity=round(score, 4),
+            created_at=similar.created_at
+        )
+        for similar, score in find_similar(db, signature, current_user.id, exclude_document_id=document_id, limit=limit)
+    ]
 
-async def process_document_async(document_id: int, db: Session):
-    """Process document asynchronously"""
+@router.get("/{document_id}/text", response_model=TextWindow)
+async def get_document_text(
+    document_id: int,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Characters [start, end) of the extracted text, read from the memory-mapped text file"""
+    document = _owned_document(db, document_id, current_user)
+    if end is None:
+        end = start + settings.text_window_max_chars
+    if end < start or end - start > settings.text_window_max_chars:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range must be ordered and at most {settings.text_window_max_chars} characters"
+        )
+    with _mapped_text(document) as text:
+        return TextWindow(
+            document_id=document.id,
+            start=min(start, text.length),
+            end=min(end, text.length),
+            length=text.length,
+            text=text.slice(start, end)
+        )
+
+@router.get("/{document_id}/results/{result_id}/context", response_model=TextWindow)
+async def get_result_context(
+    document_id: int,
+    result_id: int,
+    context: int = Query(500, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """A finding with ``context`` characters of text on each side"""
+    document = _owned_document(db, document_id, current_user)
+    result = find_result(db, document, result_id)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis result not found"
+        )
+    if result.start_position is None or result.end_position is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Analysis result has no position"
+        )
+    
+    context = min(context, settings.text_window_max_chars // 2)
+    with _mapped_text(document) as text:
+        start = max(0, result.start_position - context)
+        end = min(text.length, result.end_position + context)
+        return TextWindow(
+            document_id=document.id,
+            start=start,
+            end=end,
+            length=text.length,
+            text=text.slice(start, end),
+            result_id=result.id,
+            highlight_start=result.start_position - start,
+            highlight_end=result.end_position - start
+        )
+
+@router.put("/{document_id}/results/{result_id}/feedback", response_model=RiskFeedbackSchema)
+async def submit_risk_feedback(
+    document_id: int,
+    result_id: int,
+    feedback_data: RiskFeedbackCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Record the reviewer's verdict on a finding (training data for the risk scorer)"""
+    result = db.query(AnalysisResult).join(Document).filter(
+        AnalysisResult.id == result_id,
+        AnalysisResult.document_id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not result:
+        packed = db.query(DocumentRisks.document_id).join(Document).filter(
+            DocumentRisks.document_id == document_id,
+            Document.user_id == current_user.id
+        ).first()
+        if packed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Feedback is only recorded for findings stored as rows"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis result not found"
+        )
+    
+    feedback = db.query(RiskFeedback).filter(
+        RiskFeedback.analysis_result_id == result_id,
+        RiskFeedback.user_id == current_user.id
+    ).first()
+    if feedback is None:
+        feedback = RiskFeedback(analysis_result_id=result_id, user_id=current_user.id)
+        db.add(feedback)
+    feedback.is_risk = feedback_data.is_risk
+    feedback.comment = feedback_data.comment
+    db.commit()
+    read_replicas.mark_written(current_user.id)
+    db.refresh(feedback)
+    return feedback
+
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    # The blob itself is removed later by the storage garbage collector
+    content_hash = document.content_hash
+    db.delete(document)
+    if content_hash:
+        release_reference(db, content_hash)
+    db.commit()
+    read_replicas.mark_written(current_user.id)
+    text_store.delete(document_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@traced("process_document_async")
+async def process_document_async(document_id: int, db: Session, profile_mode: Optional[str] = None):
+    """Process document asynchronously
+
+    Extraction, analysis and the database writes all block, so they run in a
+    worker thread: the event loop keeps serving other requests, and up to
+    settings.processing_slots admitted documents are processed at once. The
+    thread inherits the context (trace span, profile capture). Returns the
+    document's final status, read in the thread as well.
+    """
+    return await asyncio.to_thread(process_document, document_id, db, profile_mode)
+
+def process_document(document_id: int, db: Session, profile_mode: Optional[str] = None) -> Optional[DocumentStatus]:
+    """Extract, analyze and store one document (blocking; see process_document_async)"""
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
-        return
+        return None
     
-    try:
-        # Update status to processing
-        document.status = DocumentStatus.PROCESSING
-        db.commit()
-        
-        # Extract text from document
-        processor = DocumentProcessor()
-        content = processor.extract_text(document.file_path)
-        
-        # Update document with content
-        document.content = content
-        db.commit()
-        
-        # Analyze with AI
-        analyzer = AIAnalyzer()
-        risks = analyzer.analyze_document(content)
-        
-        # Save analysis results
-        for risk in risks:
-            analysis_result = AnalysisResult(
-                document_id=document.id,
-                risk_level=risk["level"],
-                text_fragment=risk["text"],
-                explanation=risk["explanation"],
-                start_position=risk.get("start_position"),
-                end_position=risk.get("end_position"),
-                confidence_score=risk.get("confidence", 0)
+    processing_queue_depth.inc()
+    with ProfileCapture(document_id, mode=profile_mode) as capture:
+        try:
+            # Update status to processing
+            document.status = DocumentStatus.PROCESSING
+            document.error_reason = document.error_detail = None
+            with stage_timer("db_commit"):
+                db.commit()
+            
+            # Extract text from document (sandboxed worker process with time and memory budgets)
+            file_extension = os.path.splitext(document.original_filename)[1]
+            with stage_timer("extract_text"):
+                if document.content_hash:
+                    with get_storage().local_path(document.content_hash) as file_path:
+                        content = extract_text(file_path, file_extension)
+                else:
+                    content = extract_text(document.file_path, file_extension)
+            pipeline_bytes.inc(len(content.encode("utf-8")), stage="extract_text")
+            
+            # Update document with content and its near-duplicate signature
+            document.content = content
+            with stage_timer("text_store"):
+                text_store.write(document.id, content)
+            with stage_timer("similarity_index"):
+                signature = index_document(db, document, content)
+            with stage_timer("db_commit"):
+                db.commit()
+            
+            # Analyze with AI, running only the rules of the detected contract type
+            analyzer = get_analyzer()
+            with stage_timer("classify_contract"):
+                document.contract_type = classify(content, document.original_filename)
+            with stage_timer("analyze_document"):
+                base, base_risks, source = _analysis_base(db, document, signature, analyzer)
+                if base is not None:
+                    # Reuse the earlier document's findings, rescanning only changed paragraphs
+                    risks, scanned = reanalyze_changes(
+                        analyzer, base.content, base_risks, content, rule_timings=capture.rule_timings,
+                        contract_type=document.contract_type
+                    )
+                    pipeline_bytes.inc(scanned, stage="analyze_incremental")
+                    analysis_reuse.inc(source=source)
+                else:
+                    risks = analyzer.analyze_document(
+                        content, rule_timings=capture.rule_timings, contract_type=document.contract_type
+                    )
+            count_risks(risks)
+            
+            # Save analysis results (rows or one packed record, see settings.risk_storage_mode)
+            store_risks(db, document, risks)
+            
+            # Update status to analyzed
+            document.status = DocumentStatus.ANALYZED
+            document.ruleset_version = register_ruleset(db, analyzer)
+            with stage_timer("db_commit"):
+                db.commit()
+            documents_processed.inc(status=DocumentStatus.ANALYZED.value)
+            
+        except ExtractionError as e:
+            # A refused or runaway file is an outcome of processing, not a server error
+            db.rollback()
+            document.status = DocumentStatus.ERROR
+            document.error_reason = e.reason
+            document.error_detail = str(e)[:1000]
+            db.commit()
+            documents_processed.inc(status=DocumentStatus.ERROR.value)
+        except Exception as e:
+            db.rollback()
+            document.status = DocumentStatus.ERROR
+            document.error_reason = "processing_failed"
+            document.error_detail = str(e)[:1000]
+            db.commit()
+            documents_processed.inc(status=DocumentStatus.ERROR.value)
+            raise e
+        finally:
+            processing_queue_depth.dec()
+    return document.status
+
+def _analysis_base(db: Session, document: Document, signature, analyzer):
+    """Earlier analyzed document whose findings can be reused: (document, risks, source)
+
+    An explicitly named previous version wins; otherwise the closest
+    near-duplicate above settings.similarity_reuse_threshold is used.
+    """
+    candidates = []
+    if document.previous_document_id:
+        previous = db.query(Document).filter(Document.id == document.previous_document_id).first()
+        if previous is not None:
+            candidates.append((previous, "previous_version"))
+    if not candidates:
+        similar = find_similar(db, signature, document.user_id, exclude_document_id=document.id, limit=1, analyzed_only=True)
+        if similar and similar[0][1] >= settings.similarity_reuse_threshold:
+            candidates.append((similar[0][0], "similar_document"))
+    
+    for base, source in candidates:
+        if base.status != DocumentStatus.ANALYZED or base.content is None:
+            continue
+        if base.ruleset_version != analyzer.ruleset_version:
+            continue  # findings from older rules; the re-analysis job updates them
+        if base.contract_type != document.contract_type:
+            continue  # findings from another rule subset
+        base_risks = risks_from_results(analyzer, base.findings)
+        if base_risks is not None:
+            return base, base_risks, source
+    return None, None, None
+
+def _owned_document(db: Session, document_id: int, user: User) -> Document:
+    """The user's document without its content column (loaded only if accessed)"""
+    document = db.query(Document).options(defer(Document.content)).filter(
+        Document.id == document_id,
+        Document.user_id == user.id
+    ).first()
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    return document
+
+def _mapped_text(document: Document):
+    """Memory-mapped text of the document, written from Document.content on first use"""
+    text = text_store.open(document.id)
+    if text is None:
+        if document.content is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Document text is not extracted yet"
             )
-            db.add(analysis_result)
-        
-        # Update status to analyzed
-        document.status = DocumentStatus.ANALYZED
-        db.commit()
-        
-    except Exception as e:
-        document.status = DocumentStatus.ERROR
-        db.commit()
-        raise e
+        text_store.write(document.id, document.content)
+        text = text_store.open(document.id)
+    return text
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import AliasChoices, BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.models.document import DocumentStatus, RiskLevel
 
@@ -10,6 +10,7 @@ class DocumentCreate(DocumentBase):
     pass
 
 class AnalysisResultBase(BaseModel):
+    rule_id: Optional[str] = None
     risk_level: RiskLevel
     text_fragment: str
     explanation: str
@@ -30,10 +31,18 @@ class Document(DocumentBase):
     original_filename: str
     file_size: int
     status: DocumentStatus
+    error_reason: Optional[str] = None
+    error_detail: Optional[str] = None
     user_id: int
+    previous_document_id: Optional[int] = None
+    ruleset_version: Optional[str] = None
+    contract_type: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
-    analysis_results: List[AnalysisResult] = []
+    # Rows or packed record, whichever storage mode the document was analyzed in
+    analysis_results: List[AnalysisResult] = Field(
+        default=[], validation_alias=AliasChoices("findings", "analysis_results")
+    )
 
     class Config:
         from_attributes = True
@@ -49,3 +58,67 @@ class DocumentAnalysisResponse(BaseModel):
     high_risks: int
     medium_risks: int
     low_risks: int
+
+class WordChange(BaseModel):
+    op: str
+    base: str
+    new: str
+
+class ParagraphChange(BaseModel):
+    op: str
+    base_paragraphs: List[int]
+    new_paragraphs: List[int]
+    base_text: str
+    new_text: str
+    words: List[WordChange] = []
+
+class RiskChange(BaseModel):
+    rule_id: Optional[str] = None
+    risk_level: RiskLevel
+    text_fragment: str
+    explanation: str
+    base_position: Optional[int] = None
+    new_position: Optional[int] = None
+
+class RiskDelta(BaseModel):
+    added: List[RiskChange]
+    removed: List[RiskChange]
+    moved: List[RiskChange]
+    unchanged: List[RiskChange]
+
+class DocumentComparisonResponse(BaseModel):
+    base_document_id: int
+    document_id: int
+    paragraphs: Dict[str, int]
+    changes: List[ParagraphChange]
+    risks: RiskDelta
+
+class SimilarDocument(BaseModel):
+    document_id: int
+    original_filename: str
+    status: DocumentStatus
+    similarity: float  # estimated Jaccard similarity of word shingles
+    created_at: datetime
+
+class TextWindow(BaseModel):
+    document_id: int
+    start: int
+    end: int
+    length: int  # characters in the whole document
+    text: str
+    result_id: Optional[int] = None
+    highlight_start: Optional[int] = None  # finding position relative to the window
+    highlight_end: Optional[int] = None
+
+class RiskFeedbackCreate(BaseModel):
+    is_risk: bool  # False marks the finding as a false positive
+    comment: Optional[str] = None
+
+class RiskFeedback(RiskFeedbackCreate):
+    id: int
+    analysis_result_id: int
+    user_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,242 @@
+"""
+Admission control and fair scheduling of document processing.
+
+An upload is admitted only if
+- the user's token bucket has a token (settings.admission_user_rate_per_minute,
+  bursts of settings.admission_user_burst),
+- the user's in-flight bytes (admitted, not yet processed) stay within
+  settings.admission_user_max_inflight_bytes,
+- the global backlog (queued + processing) is below
+  settings.admission_max_backlog.
+Otherwise AdmissionRejected carries a Retry-After estimate (the API answers 429).
+
+Admitted documents wait for one of settings.processing_slots. Free slots are
+handed out by weighted round-robin over the users with waiting documents
+(settings.admission_user_weights, default weight 1), so a user who uploads
+hundreds of files only delays their own queue.
+
+All state lives in the API process and is used from its event loop.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Upload refused; retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        self.tokens -= 1
+
+
+@dataclass(eq=False)
+class Ticket:
+    user_id: int
+    size: int
+    admitted_at: float = field(default_factory=time.monotonic)
+    started_at: float = 0.0
+    running: bool = False
+    finished: bool = False
+
+
+# Per-tenant metrics (label: user id)
+_lock = threading.Lock()
+_queued: Dict[int, int] = {}
+_inflight_bytes: Dict[int, int] = {}
+
+admission_queue_depth = metrics.gauge(
+    "admission_queue_depth",
+    "Admitted documents waiting for a processing slot, by user",
+    ("user",),
+    callback=lambda: {(str(user_id),): count for user_id, count in list(_queued.items()) if count}
+)
+admission_inflight_bytes = metrics.gauge(
+    "admission_inflight_bytes",
+    "Bytes of admitted documents that are queued or being processed, by user",
+    ("user",),
+    callback=lambda: {(str(user_id),): size for user_id, size in list(_inflight_bytes.items()) if size}
+)
+admission_wait_seconds = metrics.histogram(
+    "admission_wait_seconds",
+    "Time admitted documents waited for a processing slot, by user",
+    ("user",),
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+admission_rejections = metrics.counter(
+    "admission_rejections_total",
+    "Uploads refused by admission control, by user and reason",
+    ("user", "reason")
+)
+
+
+class AdmissionController:
+    def __init__(self):
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._waiting: Dict[int, Deque] = {}  # user -> (ticket, future) in arrival order
+        self._ring: Deque[int] = deque()  # users with waiting documents, in round-robin order
+        self._credits: Dict[int, int] = {}  # picks left in the current turn of the ring's head
+        self._running = 0
+        self._backlog = 0
+        self._processing_seconds = 5.0  # moving average, for Retry-After estimates
+
+    # Admission ---------------------------------------------------------------
+
+    def _reject(self, user_id: int, reason: str, message: str, retry_after: float):
+        admission_rejections.inc(user=str(user_id), reason=reason)
+        raise AdmissionRejected(reason, message, retry_after)
+
+    def _drain_estimate(self) -> float:
+        return self._backlog * self._processing_seconds / max(settings.processing_slots, 1)
+
+    def admit(self, user_id: int, size: int) -> Ticket:
+        """Admit one upload of ``size`` bytes or raise AdmissionRejected"""
+        now = time.monotonic()
+        if self._backlog >= settings.admission_max_backlog:
+            self._reject(user_id, "backlog", "The service is busy processing other documents",
+                         self._drain_estimate())
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(
+                settings.admission_user_rate_per_minute / 60.0, settings.admission_user_burst
+            )
+        wait = bucket.wait_time(now)
+        if wait > 0:
+            self._reject(user_id, "rate", "Too many uploads, slow down", wait)
+        inflight = _inflight_bytes.get(user_id, 0)
+        if inflight and inflight + size > settings.admission_user_max_inflight_bytes:
+            queued = len(self._waiting.get(user_id, ())) + 1
+            self._reject(user_id, "inflight_bytes", "Too many of your documents are still being processed",
+                         queued * self._processing_seconds)
+
+        bucket.take()
+        self._backlog += 1
+        with _lock:
+            _inflight_bytes[user_id] = inflight + size
+        return Ticket(user_id, size)
+
+    # Scheduling --------------------------------------------------------------
+
+    def _weight(self, user_id: int) -> int:
+        weights = settings.admission_user_weights
+        return max(1, int(weights.get(str(user_id), weights.get(user_id, 1))))
+
+    async def wait_turn(self, ticket: Ticket):
+        """Wait for a processing slot; slots go round-robin over users by weight"""
+        if self._running < settings.processing_slots and not self._ring:
+            self._start(ticket)
+            return
+        future = asyncio.get_running_loop().create_future()
+        queue = self._waiting.setdefault(ticket.user_id, deque())
+        queue.append((ticket, future))
+        if ticket.user_id not in self._ring:
+            self._ring.append(ticket.user_id)
+        with _lock:
+            _queued[ticket.user_id] = _queued.get(ticket.user_id, 0) + 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if ticket.running:
+                self.finish(ticket)
+            else:
+                self._forget(ticket)
+            raise
+        finally:
+            with _lock:
+                _queued[ticket.user_id] -= 1
+
+    def _start(self, ticket: Ticket):
+        ticket.running = True
+        self._running += 1
+        ticket.started_at = time.monotonic()
+        admission_wait_seconds.observe(ticket.started_at - ticket.admitted_at, user=str(ticket.user_id))
+
+    def _forget(self, ticket: Ticket):
+        queue = self._waiting.get(ticket.user_id)
+        if queue:
+            for entry in list(queue):
+                if entry[0] is ticket:
+                    queue.remove(entry)
+        self.finish(ticket)
+
+    def _grant_next(self):
+        while self._running < settings.processing_slots and self._ring:
+            user_id = self._ring[0]
+            queue = self._waiting.get(user_id)
+            if not queue:
+                self._ring.popleft()
+                self._credits.pop(user_id, None)
+                continue
+            ticket, future = queue.popleft()
+            credits = self._credits.get(user_id, self._weight(user_id)) - 1
+            if credits <= 0 or not queue:
+                # Turn over: the user goes to the back of the ring with a fresh allowance
+                self._ring.popleft()
+                self._credits.pop(user_id, None)
+                if queue:
+                    self._ring.append(user_id)
+            else:
+                self._credits[user_id] = credits
+            if future.done():
+                continue
+            self._start(ticket)
+            future.set_result(None)
+
+    def finish(self, ticket: Ticket):
+        """Release the ticket's slot and in-flight bytes (idempotent)"""
+        if ticket.finished:
+            return
+        ticket.finished = True
+        self._backlog -= 1
+        with _lock:
+            _inflight_bytes[ticket.user_id] = max(0, _inflight_bytes.get(ticket.user_id, 0) - ticket.size)
+        if ticket.running:
+            ticket.running = False
+            self._running -= 1
+            elapsed = time.monotonic() - ticket.started_at
+            self._processing_seconds = 0.8 * self._processing_seconds + 0.2 * elapsed
+        self._grant_next()
+
+    def status(self) -> dict:
+        return {
+            "processing": self._running,
+            "slots": settings.processing_slots,
+            "backlog": self._backlog,
+            "max_backlog": settings.admission_max_backlog,
+            "queued_by_user": {str(user_id): len(queue) for user_id, queue in self._waiting.items() if queue},
+            "average_processing_seconds": round(self._processing_seconds, 3),
+        }
+
+
+admission = AdmissionController()
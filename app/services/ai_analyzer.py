@@ -1,84 +1,330 @@
+import hashlib
+import json
 import re
-from typing import List, Dict, Any
+from functools import lru_cache
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
+from app.core import metrics
+from app.core.tracing import traced
 from app.models.document import RiskLevel
+from app.services.contract_classifier import CONTRACT_TYPES, GENERAL
+from app.services.risk_scorer import get_risk_scorer
+from app.services.clause_index import get_clause_index, RULE_ID as CLAUSE_RULE_ID
+from app.services.stem_matcher import StemMatcher
+
+STEM_RULES_ID = "stem_rules"  # rule_timings entry of the shared phrase-rule pass
+
+# Rules per scanner of the process-wide rulebook, by contract type
+_rule_counts: Dict[str, int] = {}
+
+analyzer_rules = metrics.gauge(
+    "analyzer_rules",
+    "Rules in the scanner of each contract type (general: every rule)",
+    ("contract_type",),
+    callback=lambda: {(contract_type,): count for contract_type, count in _rule_counts.items()}
+)
+rule_scans_skipped = metrics.counter(
+    "analyzer_rule_scans_skipped_total",
+    "Rule scans avoided by scanning documents with the rules of their contract type only",
+    ("contract_type",)
+)
+rule_scan_duration = metrics.histogram(
+    "analyzer_rule_scan_seconds",
+    "Time of a rule pass over a document or a changed part of it, by contract type",
+    ("contract_type",)
+)
+
+class RuleScanner:
+    """Precompiled subset of the rules (those of one contract type)"""
+    
+    def __init__(self, rules: List[Tuple[RiskLevel, Dict[str, Any]]]):
+        self.rule_ids = {pattern_info["id"] for _, pattern_info in rules}
+        self.compiled_patterns = [
+            (risk_level, re.compile(pattern_info["pattern"]), pattern_info)
+            for risk_level, pattern_info in rules
+            if "pattern" in pattern_info
+        ]
+        self.stem_matcher = StemMatcher([
+            (risk_level, pattern_info)
+            for risk_level, pattern_info in rules
+            if "phrases" in pattern_info
+        ])
 
 class AIAnalyzer:
     """Service for analyzing legal documents and identifying risks"""
     
     def __init__(self):
-        # Define risk patterns and rules
+        # Define risk patterns and rules: "pattern" is a regular expression,
+        # "phrases" are matched on word stems (see app.services.stem_matcher).
+        # Rules with "contract_types" only run on documents of those types
+        # (app.services.contract_classifier); the others run on every document.
         self.risk_patterns = {
             RiskLevel.HIGH: [
                 {
-                    "pattern": r"(?i)(без\s+возврата|не\s+возвращается|не\s+подлежит\s+возврату)",
+                    "id": "non_refundable",
+                    "version": 2,
+                    "phrases": ["без возврата", "не возвращается", "не подлежит|подлежат ~1 возврату", "невозвратный"],
                     "explanation": "Условие о невозврате средств может быть незаконным"
                 },
                 {
-                    "pattern": r"(?i)(односторонний\s+отказ|в\s+одностороннем\s+порядке)",
+                    "id": "unilateral_refusal",
+                    "version": 2,
+                    "phrases": ["односторонний ~1 отказ", "одностороннем ~1 порядке"],
                     "explanation": "Односторонний отказ от договора может нарушать права сторон"
                 },
                 {
+                    "id": "high_penalty",
+                    "version": 1,
                     "pattern": r"(?i)(штраф\s+в\s+размере\s+\d+%|\d+%\s+штраф)",
                     "explanation": "Высокие штрафы могут быть признаны несоразмерными"
                 },
                 {
-                    "pattern": r"(?i)(ответственность\s+не\s+ограничена|неограниченная\s+ответственность)",
+                    "id": "unlimited_liability",
+                    "version": 2,
+                    "phrases": ["ответственность ~2 не ограничена|ограничивается", "неограниченная ответственность"],
                     "explanation": "Неограниченная ответственность может быть незаконной"
+                },
+                {
+                    "id": "license_exclusive_transfer",
+                    "version": 1,
+                    "contract_types": ["license"],
+                    "phrases": ["отчуждение исключительного права", "исключительное право ~3 переходит|передается"],
+                    "explanation": "Вместо предоставления лицензии отчуждается исключительное право"
                 }
             ],
             RiskLevel.MEDIUM: [
                 {
-                    "pattern": r"(?i)(срок\s+действия\s+договора\s+не\s+определен|бессрочный)",
+                    "id": "indefinite_term",
+                    "version": 2,
+                    "phrases": ["срок действия договора не определен", "бессрочный"],
                     "explanation": "Неопределенный срок договора может создавать неопределенность"
                 },
                 {
-                    "pattern": r"(?i)(изменение\s+условий\s+без\s+согласия)",
+                    "id": "unilateral_change",
+                    "version": 2,
+                    "phrases": ["изменение ~2 условий ~2 без согласия"],
                     "explanation": "Изменение условий без согласия может нарушать права"
                 },
                 {
-                    "pattern": r"(?i)(конфиденциальность\s+не\s+ограничена)",
+                    "id": "unlimited_confidentiality",
+                    "version": 2,
+                    "phrases": ["конфиденциальность ~2 не ограничена|ограничивается"],
                     "explanation": "Неограниченная конфиденциальность может быть избыточной"
+                },
+                {
+                    "id": "lease_rent_increase",
+                    "version": 1,
+                    "contract_types": ["lease"],
+                    "phrases": ["арендодатель ~3 вправе ~3 увеличить|изменить|пересмотреть ~2 арендную плату"],
+                    "explanation": "Арендодатель может повышать арендную плату по своему усмотрению"
+                },
+                {
+                    "id": "supply_deemed_acceptance",
+                    "version": 1,
+                    "contract_types": ["supply", "sale"],
+                    "phrases": ["товар ~3 считается принятым"],
+                    "explanation": "Товар считается принятым без проверки, претензии по качеству могут быть утрачены"
+                },
+                {
+                    "id": "services_deemed_acceptance",
+                    "version": 1,
+                    "contract_types": ["services"],
+                    "phrases": ["работы|услуги ~3 считаются принятыми|оказанными|выполненными", "акт ~3 считается подписанным"],
+                    "explanation": "Работы считаются принятыми при молчании заказчика"
+                },
+                {
+                    "id": "loan_early_repayment_ban",
+                    "version": 1,
+                    "contract_types": ["loan"],
+                    "phrases": ["досрочный|досрочное ~1 возврат|погашение ~3 не допускается|запрещается"],
+                    "explanation": "Запрет досрочного возврата займа ограничивает права заемщика"
                 }
             ],
             RiskLevel.LOW: [
                 {
-                    "pattern": r"(?i)(форс-мажор\s+не\s+предусмотрен)",
+                    "id": "no_force_majeure",
+                    "version": 2,
+                    "phrases": ["форс-мажор ~1 не предусмотрен", "форс-мажорные обстоятельства ~1 не предусмотрены"],
                     "explanation": "Отсутствие форс-мажорных обстоятельств может быть рискованным"
                 },
                 {
-                    "pattern": r"(?i)(спорные\s+вопросы\s+решаются\s+в\s+одностороннем\s+порядке)",
+                    "id": "unilateral_disputes",
+                    "version": 2,
+                    "phrases": ["спорные вопросы ~1 решаются ~1 в одностороннем порядке"],
                     "explanation": "Одностороннее решение споров может быть несправедливым"
+                },
+                {
+                    "id": "employment_unpaid_overtime",
+                    "version": 1,
+                    "contract_types": ["employment"],
+                    "phrases": ["сверхурочная работа ~3 не оплачивается|компенсируется"],
+                    "explanation": "Сверхурочная работа без оплаты противоречит трудовому законодательству"
                 }
             ]
         }
+        self.compile_rules()
     
-    def analyze_document(self, content: str) -> List[Dict[str, Any]]:
-        """Analyze document content and return list of identified risks"""
-        risks = []
+    def compile_rules(self):
+        """Build the scanners from risk_patterns: one per contract type plus the general one"""
+        rules = [
+            (risk_level, pattern_info)
+            for risk_level, patterns in self.risk_patterns.items()
+            for pattern_info in patterns
+        ]
+        self.scanners = {GENERAL: RuleScanner(rules)}
+        for contract_type in CONTRACT_TYPES:
+            self.scanners[contract_type] = RuleScanner([
+                (risk_level, pattern_info)
+                for risk_level, pattern_info in rules
+                if contract_type in pattern_info.get("contract_types", (contract_type,))
+            ])
+        _rule_counts.update({contract_type: len(scanner.rule_ids) for contract_type, scanner in self.scanners.items()})
         
-        for risk_level, patterns in self.risk_patterns.items():
-            for pattern_info in patterns:
-                matches = re.finditer(pattern_info["pattern"], content)
-                
-                for match in matches:
-                    risk = {
-                        "level": risk_level,
-                        "text": match.group(0),
-                        "explanation": pattern_info["explanation"],
-                        "start_position": match.start(),
-                        "end_position": match.end(),
-                        "confidence": self._calculate_confidence(match.group(0), risk_level)
-                    }
-                    risks.append(risk)
+        # Every rule, for callers that do not know the contract type
+        self.compiled_patterns = self.scanners[GENERAL].compiled_patterns
+        self.stem_matcher = self.scanners[GENERAL].stem_matcher
+        
+        # Bump a rule's "version" whenever its pattern, level, explanation or contract types change:
+        # documents analyzed with an older ruleset are then patched by the re-analysis job
+        self.rule_versions = {
+            pattern_info["id"]: pattern_info["version"]
+            for patterns in self.risk_patterns.values()
+            for pattern_info in patterns
+        }
+        self.ruleset_version = ruleset_version(self.rule_versions)
+    
+    @traced("AIAnalyzer.analyze_document")
+    def analyze_document(
+        self,
+        content: str,
+        rule_timings: Optional[Dict[str, Dict[str, float]]] = None,
+        score: bool = True,
+        contract_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Analyze document content and return list of identified risks
+        
+        When ``rule_timings`` is given, it is filled with the scan time and
+        match count of every rule (used by the profiler to spot slow regexes).
+        With ``score`` the learned scorer, if one is deployed, replaces the
+        heuristic confidence of all matches in one batch. ``contract_type``
+        restricts the scan to the rules of that type (default: every rule).
+        """
+        risks = self.scan_rules(content, rule_timings=rule_timings, contract_type=contract_type)
         
         # Remove duplicates and sort by position
         risks = self._remove_duplicates(risks)
         risks.sort(key=lambda x: x["start_position"])
         
+        clause_index = get_clause_index()
+        if clause_index is not None:
+            risks = self._add_clause_matches(clause_index, content, risks, rule_timings)
+        
+        if score:
+            self.score_confidence(content, risks)
+        return risks
+    
+    def scan_rules(
+        self,
+        content: str,
+        rule_ids: Optional[Set[str]] = None,
+        rule_timings: Optional[Dict[str, Dict[str, float]]] = None,
+        contract_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Raw matches of the rules (all, or only ``rule_ids``) of the contract type's scanner, before de-duplication"""
+        scanner = self.scanners.get(contract_type or GENERAL, self.scanners[GENERAL])
+        scan_started = time.perf_counter()
+        risks = []
+        
+        for risk_level, compiled_pattern, pattern_info in scanner.compiled_patterns:
+            if rule_ids is not None and pattern_info["id"] not in rule_ids:
+                continue
+            started = time.perf_counter() if rule_timings is not None else 0.0
+            matches_before = len(risks)
+            
+            for match in compiled_pattern.finditer(content):
+                risk = {
+                    "rule_id": pattern_info["id"],
+                    "level": risk_level,
+                    "text": match.group(0),
+                    "explanation": pattern_info["explanation"],
+                    "start_position": match.start(),
+                    "end_position": match.end(),
+                    "confidence": self._calculate_confidence(match.group(0), risk_level)
+                }
+                risks.append(risk)
+            
+            if rule_timings is not None:
+                timing = rule_timings.setdefault(pattern_info["id"], {"seconds": 0.0, "matches": 0})
+                timing["seconds"] += time.perf_counter() - started
+                timing["matches"] += len(risks) - matches_before
+        
+        # All phrase rules share one pass over the token stream, timed as a whole
+        started = time.perf_counter() if rule_timings is not None else 0.0
+        matches_before = len(risks)
+        for risk_level, pattern_info, start, end in scanner.stem_matcher.match(content, rule_ids):
+            text = content[start:end]
+            risks.append({
+                "rule_id": pattern_info["id"],
+                "level": risk_level,
+                "text": text,
+                "explanation": pattern_info["explanation"],
+                "start_position": start,
+                "end_position": end,
+                "confidence": self._calculate_confidence(text, risk_level)
+            })
+        if rule_timings is not None:
+            timing = rule_timings.setdefault(STEM_RULES_ID, {"seconds": 0.0, "matches": 0})
+            timing["seconds"] += time.perf_counter() - started
+            timing["matches"] += len(risks) - matches_before
+        
+        if rule_ids is None:
+            label = contract_type if contract_type in self.scanners else GENERAL
+            rule_scan_duration.observe(time.perf_counter() - scan_started, contract_type=label)
+            skipped = len(self.scanners[GENERAL].rule_ids) - len(scanner.rule_ids)
+            if skipped:
+                rule_scans_skipped.inc(skipped, contract_type=label)
         return risks
     
+    def _add_clause_matches(self, clause_index, content: str, risks: List[Dict[str, Any]],
+                            rule_timings: Optional[Dict[str, Dict[str, float]]]) -> List[Dict[str, Any]]:
+        """Add sentences similar to known risky clauses that no regex rule covered"""
+        started = time.perf_counter()
+        matches = clause_index.detect(content)
+        
+        covered = [(risk["start_position"], risk["end_position"]) for risk in risks]
+        added = [
+            match for match in matches
+            if not any(start < match["end_position"] and match["start_position"] < end for start, end in covered)
+        ]
+        
+        if rule_timings is not None:
+            timing = rule_timings.setdefault(CLAUSE_RULE_ID, {"seconds": 0.0, "matches": 0})
+            timing["seconds"] += time.perf_counter() - started
+            timing["matches"] += len(added)
+        
+        if not added:
+            return risks
+        risks = risks + added
+        risks.sort(key=lambda x: x["start_position"])
+        return risks
+    
+    def score_confidence(self, content: str, risks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rescore matches with the learned scorer; keeps the heuristic without one"""
+        scorer = get_risk_scorer()
+        if scorer is not None:
+            scorer.score(content, risks)
+        return risks
+    
+    def rule_id_for(self, explanation: str) -> Optional[str]:
+        """Rule id of a stored finding that predates rule ids"""
+        for patterns in self.risk_patterns.values():
+            for pattern_info in patterns:
+                if pattern_info["explanation"] == explanation:
+                    return pattern_info["id"]
+        return None
+    
     def _calculate_confidence(self, text: str, risk_level: RiskLevel) -> int:
-        """Calculate confidence score for identified risk"""
+        """Heuristic confidence, used for de-duplication and when no scorer is deployed"""
         base_confidence = {
             RiskLevel.HIGH: 85,
             RiskLevel.MEDIUM: 70,
@@ -130,3 +376,13 @@ class AIAnalyzer:
             "low": len([r for r in risks if r["level"] == RiskLevel.LOW])
         }
         return summary
+
+def ruleset_version(rule_versions: Dict[str, int]) -> str:
+    """Short stable identifier of a set of rule versions"""
+    canonical = json.dumps(rule_versions, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+@lru_cache(maxsize=1)
+def get_analyzer() -> AIAnalyzer:
+    """Process-wide analyzer instance with precompiled rules"""
+    return AIAnalyzer()
@@ -0,0 +1,244 @@
+"""
+Similar-clause retrieval: a library of known risky clauses as an L2-normalized
+character n-gram TF-IDF matrix, searched by sparse matrix product.
+
+Search runs in two steps. Candidates come from a product with a pruned,
+feature-major copy of the library that keeps only rare n-grams, so common
+n-grams (which would make the product nearly dense) cost nothing. Candidates
+are then rescored with their full TF-IDF vectors.
+
+The index is built offline (``python -m app.cli.build_clause_index``) into a
+directory of .npy arrays plus a JSON manifest. Workers open the arrays with
+``mmap_mode="r"`` so the library is shared through the page cache instead of
+being copied into every process.
+"""
+
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.document import RiskLevel
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+RULE_ID = "clause_index"
+CANDIDATES_PER_QUERY = 20
+
+_SENTENCE = re.compile(r"[^\n.!?;]+(?:[.!?;]+|$)", re.MULTILINE)
+
+
+def _vectorizer(n_features: int, ngram_range: Tuple[int, int]):
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        analyzer="char_wb",
+        ngram_range=ngram_range,
+        n_features=n_features,
+        alternate_sign=False,
+        norm=None,
+        lowercase=True,
+        dtype=np.float32
+    )
+
+
+def _normalize_rows(matrix):
+    from sklearn.preprocessing import normalize
+
+    return normalize(matrix, norm="l2", copy=False)
+
+
+def split_sentences(content: str, min_chars: int = 20) -> List[Tuple[int, int]]:
+    """(start, end) of sentences long enough to be worth matching"""
+    spans = []
+    for match in _SENTENCE.finditer(content):
+        start, end = match.span()
+        while start < end and content[start].isspace():
+            start += 1
+        if end - start >= min_chars:
+            spans.append((start, end))
+    return spans
+
+
+def _save_csr(output_dir: str, name: str, matrix):
+    np.save(os.path.join(output_dir, f"{name}_data.npy"), matrix.data.astype(np.float32))
+    np.save(os.path.join(output_dir, f"{name}_indices.npy"), matrix.indices.astype(np.int32))
+    np.save(os.path.join(output_dir, f"{name}_indptr.npy"), matrix.indptr.astype(np.int64))
+
+
+def _load_csr(index_dir: str, name: str, shape: Tuple[int, int]):
+    from scipy.sparse import csr_matrix
+
+    return csr_matrix(
+        tuple(np.load(os.path.join(index_dir, f"{name}_{part}.npy"), mmap_mode="r") for part in ("data", "indices", "indptr")),
+        shape=shape,
+        copy=False
+    )
+
+
+def build_index(
+    clauses: Iterable[Dict[str, Any]],
+    output_dir: str,
+    n_features: int = 2 ** 20,
+    ngram_range: Tuple[int, int] = (3, 5),
+    candidate_max_df: float = 0.01
+) -> Dict[str, Any]:
+    """Vectorize a clause library and write it to ``output_dir``
+
+    Each clause is a dict with "text", "risk_level" and "explanation" (and an
+    optional "id"). Only n-grams found in at most ``candidate_max_df`` of the
+    clauses take part in candidate generation.
+    """
+    clauses = list(clauses)
+    if not clauses:
+        raise ValueError("Clause library is empty")
+
+    counts = _vectorizer(n_features, ngram_range).transform(clause["text"] for clause in clauses).tocsc()
+    document_frequency = np.diff(counts.indptr)
+    idf = (np.log((1 + len(clauses)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    library = counts.tocsr()
+    library.data *= idf[library.indices]
+    library = _normalize_rows(library)
+
+    # Feature-major copy restricted to rare n-grams: query @ candidates is a plain CSR product
+    rare = document_frequency <= max(1, candidate_max_df * len(clauses))
+    candidates = library.T.tocsr()
+    candidates.data[~np.repeat(rare, np.diff(candidates.indptr))] = 0
+    candidates.eliminate_zeros()
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "idf.npy"), idf)
+    _save_csr(output_dir, "library", library)
+    _save_csr(output_dir, "candidates", candidates)
+
+    manifest = {
+        "format": INDEX_FORMAT,
+        "n_features": n_features,
+        "ngram_range": list(ngram_range),
+        "clauses": [
+            {
+                "id": str(clause.get("id", number)),
+                "text": clause["text"],
+                "risk_level": RiskLevel(clause["risk_level"]).value,
+                "explanation": clause["explanation"],
+            }
+            for number, clause in enumerate(clauses)
+        ],
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False)
+    return {"clauses": len(clauses), "nonzeros": int(library.nnz), "candidate_nonzeros": int(candidates.nnz)}
+
+
+def _top(scores: np.ndarray, columns: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        return scores[best], columns[best]
+    return scores, columns
+
+
+class ClauseIndex:
+    """Memory-mapped clause library with batched top-k search"""
+
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, "manifest.json"), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported clause index format: {manifest.get('format')}")
+
+        self.clauses = manifest["clauses"]
+        self.n_features = manifest["n_features"]
+        self.vectorizer = _vectorizer(self.n_features, tuple(manifest["ngram_range"]))
+        self.idf = np.load(os.path.join(index_dir, "idf.npy"), mmap_mode="r")
+        self.library = _load_csr(index_dir, "library", (len(self.clauses), self.n_features))
+        self.candidates = _load_csr(index_dir, "candidates", (self.n_features, len(self.clauses)))
+
+    def vectorize(self, texts: List[str]):
+        queries = self.vectorizer.transform(texts)
+        queries.data *= self.idf[queries.indices]
+        queries.eliminate_zeros()
+        return _normalize_rows(queries)
+
+    def search(self, texts: List[str], top_k: int = 1, threshold: float = 0.0,
+               batch_size: int = 256) -> List[List[Tuple[int, float]]]:
+        """Top-k (clause number, cosine similarity) per text, best first, above ``threshold``"""
+        results: List[List[Tuple[int, float]]] = []
+        candidates_per_query = max(top_k, CANDIDATES_PER_QUERY)
+        for offset in range(0, len(texts), batch_size):
+            queries = self.vectorize(texts[offset:offset + batch_size])
+            
+            # Step 1: candidates sharing rare n-grams, best partial scores first
+            partial = queries @ self.candidates
+            per_query = [
+                _top(partial.data[start:end], partial.indices[start:end], candidates_per_query)[1]
+                for start, end in zip(partial.indptr[:-1], partial.indptr[1:])
+            ]
+            
+            # Step 2: exact cosine against the candidates' full vectors
+            clauses = np.unique(np.concatenate(per_query)) if any(len(c) for c in per_query) else np.empty(0, dtype=np.int64)
+            exact = (queries @ self.library[clauses].T).toarray() if len(clauses) else None
+            for row, candidates in enumerate(per_query):
+                if not len(candidates):
+                    results.append([])
+                    continue
+                columns = np.searchsorted(clauses, candidates)
+                scores = exact[row, columns]
+                keep = scores >= threshold
+                scores, candidates = _top(scores[keep], candidates[keep], top_k)
+                order = np.argsort(-scores)
+                results.append([(int(candidates[i]), float(scores[i])) for i in order])
+        return results
+
+    def detect(self, content: str, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Sentences of ``content`` close to a known risky clause, as analyzer risks"""
+        threshold = settings.clause_index_threshold if threshold is None else threshold
+        spans = split_sentences(content)
+        if not spans:
+            return []
+
+        risks = []
+        hits = self.search([content[start:end] for start, end in spans], top_k=1, threshold=threshold)
+        for (start, end), matches in zip(spans, hits):
+            if not matches:
+                continue
+            number, similarity = matches[0]
+            clause = self.clauses[number]
+            # One explanation per clause: packed storage keeps each distinct explanation as a
+            # rules row, and re-analysis rewrites findings whose explanation changed.
+            # The similarity goes into the confidence instead.
+            risks.append({
+                "rule_id": RULE_ID,
+                "level": RiskLevel(clause["risk_level"]),
+                "text": content[start:end],
+                "explanation": f"{clause['explanation']} (похоже на: «{clause['text']}»)",
+                "start_position": start,
+                "end_position": end,
+                "confidence": int(round(similarity * 100)),
+            })
+        return risks
+
+
+@lru_cache(maxsize=1)
+def get_clause_index() -> Optional[ClauseIndex]:
+    """Process-wide clause index, or None when disabled or not built"""
+    index_dir = settings.clause_index_dir
+    if not settings.clause_index_enabled or not os.path.exists(os.path.join(index_dir, "manifest.json")):
+        return None
+    try:
+        return ClauseIndex(index_dir)
+    except Exception as e:
+        logger.warning("Could not load clause index %s: %s", index_dir, e)
+        return None
+
+
+def load_library(path: str) -> List[Dict[str, Any]]:
+    """Clause library in JSON Lines: one {"id", "text", "risk_level", "explanation"} per line"""
+    with open(path, encoding="utf-8") as library_file:
+        return [json.loads(line) for line in library_file if line.strip()]
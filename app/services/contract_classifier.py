@@ -0,0 +1,78 @@
+"""
+First-pass contract type detection from the title and the first pages.
+
+Keyword scoring on word stems: every type has a handful of characteristic
+words; words of the title (the file name and the first non-empty line of the
+text) count TITLE_WEIGHT times. The best type wins if it scores at least
+MIN_SCORE and clearly beats the runner-up, otherwise the document is
+GENERAL and is checked with every rule. The analyzer uses the type to pick a
+scanner with only the applicable rules (see AIAnalyzer.scanners).
+"""
+
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from app.core import metrics
+from app.services.russian_stemmer import stem
+
+GENERAL = "general"
+HEAD_CHARS = 6000  # about the first two pages
+TITLE_WEIGHT = 5
+MIN_SCORE = 4
+MIN_MARGIN = 1.5  # best score must exceed the runner-up by this factor
+
+CONTRACT_TYPES: Dict[str, Tuple[str, ...]] = {
+    "supply": ("поставка", "поставщик", "отгрузка", "спецификация", "партия"),
+    "sale": ("купля", "продажа", "продавец", "покупатель"),
+    "lease": ("аренда", "арендатор", "арендодатель", "арендный", "помещение"),
+    "services": ("услуга", "исполнитель", "заказчик", "подряд", "подрядчик", "работа"),
+    "license": ("лицензия", "лицензионный", "лицензиар", "лицензиат", "сублицензия"),
+    "loan": ("займ", "займодавец", "заемщик", "кредит", "кредитор", "проценты"),
+    "employment": ("трудовой", "работник", "работодатель", "должность", "оклад"),
+}
+
+_WORD = re.compile(r"\w+")
+
+classified_documents = metrics.counter(
+    "contract_types_total",
+    "Documents by detected contract type",
+    ("contract_type",)
+)
+
+
+def _stems(text: str):
+    return (stem(word.lower().replace("ё", "е")) for word in _WORD.findall(text))
+
+
+_KEYWORDS: Dict[str, str] = {}
+for _contract_type, _words in CONTRACT_TYPES.items():
+    for _word in _words:
+        _KEYWORDS.setdefault(next(_stems(_word)), _contract_type)
+
+
+def _title(content: str, filename: Optional[str]) -> str:
+    first_line = next((line for line in content[:HEAD_CHARS].splitlines() if line.strip()), "")
+    name = os.path.splitext(os.path.basename(filename))[0].replace("_", " ") if filename else ""
+    return f"{name}\n{first_line}"
+
+
+def score_types(content: str, filename: Optional[str] = None) -> Dict[str, int]:
+    """Keyword score of every contract type"""
+    scores = dict.fromkeys(CONTRACT_TYPES, 0)
+    for weight, text in ((TITLE_WEIGHT, _title(content, filename)), (1, content[:HEAD_CHARS])):
+        for word_stem in _stems(text):
+            contract_type = _KEYWORDS.get(word_stem)
+            if contract_type is not None:
+                scores[contract_type] += weight
+    return scores
+
+
+def classify(content: str, filename: Optional[str] = None) -> str:
+    """Contract type of the document, or GENERAL if no type is clearly indicated"""
+    scores = score_types(content, filename)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, best_score), (_, second_score) = ranked[0], ranked[1]
+    contract_type = best if best_score >= MIN_SCORE and best_score >= MIN_MARGIN * second_score else GENERAL
+    classified_documents.inc(contract_type=contract_type)
+    return contract_type
@@ -1,25 +1,108 @@
 import os
+import zipfile
 from typing import Optional
-from docx import Document as DocxDocument
-import PyPDF2
-import pypdf
+
+from app.core.tracing import traced
+from app.services.text_formats import detect_format, iter_doc_text, iter_rtf_text, iter_txt_text
+
+# Extraction backends (python-docx, pypdf, PyPDF2) are imported lazily inside
+# the extractors so that importing the API does not pay for them.
+
+class ExtractionError(Exception):
+    """Extraction refused or aborted; ``reason`` is a short machine-readable code"""
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
 
 class DocumentProcessor:
-    """Service for extracting text from various document formats"""
+    """Service for extracting text from various document formats
     
-    def extract_text(self, file_path: str) -> str:
-        """Extract text from document based on file extension"""
-        file_extension = os.path.splitext(file_path)[1].lower()
+    ``max_pages`` bounds PDF page counts; ``max_unzipped_bytes`` and
+    ``max_compression_ratio`` reject DOCX archives that would inflate far
+    beyond their size (zip bombs) before they are parsed.
+    """
+    
+    def __init__(self, max_pages: Optional[int] = None, max_unzipped_bytes: Optional[int] = None,
+                 max_compression_ratio: Optional[float] = None):
+        self.max_pages = max_pages
+        self.max_unzipped_bytes = max_unzipped_bytes
+        self.max_compression_ratio = max_compression_ratio
+    
+    @staticmethod
+    def preload_backends():
+        """Import extraction backends ahead of the first request (used by warm-up)"""
+        import docx
+        import pypdf
+        import PyPDF2
+    
+    @traced("DocumentProcessor.extract_text")
+    def extract_text(self, file_path: str, file_extension: Optional[str] = None) -> str:
+        """Extract text from document based on its format
+        
+        The format is detected from the file's first bytes; the extension
+        (content-addressed blobs have none, so callers pass the one of the
+        original filename) is only used in error messages.
+        """
+        file_extension = (file_extension or os.path.splitext(file_path)[1]).lower()
+        detected = detect_format(file_path)
         
-        if file_extension == '.docx':
+        if detected == '.docx':
             return self._extract_from_docx(file_path)
-        elif file_extension == '.pdf':
+        elif detected == '.pdf':
             return self._extract_from_pdf(file_path)
+        elif detected in self.STREAMING_EXTRACTORS:
+            return self._extract_streaming(file_path, detected)
         else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
+            raise ValueError(f"Unsupported file format: {file_extension or 'unknown'}")
+    
+    def _check_archive(self, file_path: str):
+        """Reject archives whose declared content exceeds the limits"""
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                entries = archive.infolist()
+        except zipfile.BadZipFile:
+            return  # python-docx reports the malformed file
+        total = sum(entry.file_size for entry in entries)
+        if self.max_unzipped_bytes is not None and total > self.max_unzipped_bytes:
+            raise ExtractionError(
+                "archive_limit", f"Archive unpacks to {total} bytes (limit {self.max_unzipped_bytes})"
+            )
+        if self.max_compression_ratio is not None:
+            for entry in entries:
+                # Small XML parts legitimately compress very well
+                if entry.file_size > 1024 * 1024 and entry.file_size > self.max_compression_ratio * max(entry.compress_size, 1):
+                    raise ExtractionError(
+                        "archive_limit",
+                        f"Archive entry {entry.filename} is compressed {entry.file_size / max(entry.compress_size, 1):.0f}:1"
+                    )
+    
+    def _check_pages(self, page_count: int):
+        if self.max_pages is not None and page_count > self.max_pages:
+            raise ExtractionError("page_limit", f"Document has {page_count} pages (limit {self.max_pages})")
+    
+    STREAMING_EXTRACTORS = {
+        '.txt': iter_txt_text,
+        '.rtf': iter_rtf_text,
+        '.doc': iter_doc_text,
+    }
+    
+    def _extract_streaming(self, file_path: str, file_format: str) -> str:
+        """Extract text from TXT, RTF or DOC with the streaming extractors of text_formats"""
+        try:
+            text = ''.join(self.STREAMING_EXTRACTORS[file_format](file_path))
+        except (ExtractionError, MemoryError, ValueError):
+            raise
+        except Exception as e:
+            raise Exception(f"Error extracting text from {file_format.lstrip('.').upper()}: {str(e)}")
+        # Same shape as the other extractors: stripped, non-empty paragraphs
+        return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
     
     def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
+        from docx import Document as DocxDocument
+        
+        self._check_archive(file_path)
         try:
             doc = DocxDocument(file_path)
             text_parts = []
@@ -29,11 +112,16 @@ class DocumentProcessor:
                     text_parts.append(paragraph.text.strip())
             
             return '\n'.join(text_parts)
+        except (ExtractionError, MemoryError):
+            raise
         except Exception as e:
             raise Exception(f"Error extracting text from DOCX: {str(e)}")
     
     def _extract_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
+        import pypdf
+        import PyPDF2
+        
         try:
             text_parts = []
             
@@ -41,20 +129,27 @@ class DocumentProcessor:
             try:
                 with open(file_path, 'rb') as file:
                     pdf_reader = pypdf.PdfReader(file)
+                    self._check_pages(len(pdf_reader.pages))
                     for page in pdf_reader.pages:
                         text = page.extract_text()
                         if text.strip():
                             text_parts.append(text.strip())
+            except (ExtractionError, MemoryError):
+                raise
             except Exception:
                 # Fallback to PyPDF2
+                text_parts = []
                 with open(file_path, 'rb') as file:
                     pdf_reader = PyPDF2.PdfReader(file)
+                    self._check_pages(len(pdf_reader.pages))
                     for page in pdf_reader.pages:
                         text = page.extract_text()
                         if text.strip():
                             text_parts.append(text.strip())
             
             return '\n'.join(text_parts)
+        except (ExtractionError, MemoryError):
+            raise
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
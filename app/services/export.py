@@ -0,0 +1,326 @@
+"""
+Streaming export of analysis results (CSV, JSON Lines, XLSX).
+
+Rows are read with ``yield_per`` (a server-side cursor on PostgreSQL) and
+encoded batch by batch, so memory use does not depend on the number of rows.
+Documents with packed risks (app.services.risk_storage) follow the rows, one
+document at a time; their result_id is the finding's ordinal in the document.
+The XLSX writer produces the workbook with zipfile in streaming mode: sheet
+rows use inline strings and nothing is buffered beyond the current batch.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+from app.core import metrics
+from app.models.document import AnalysisResult, Document, DocumentRisks, DocumentStatus, RiskLevel
+from app.services.risk_storage import packed_export_rows
+
+EXPORT_BATCH = 1000
+PACKED_EXPORT_BATCH = 20  # documents, read with their content
+XLSX_MAX_ROWS = 1048576  # per sheet, header included
+
+COLUMNS = (
+    "result_id",
+    "document_id",
+    "filename",
+    "document_status",
+    "uploaded_at",
+    "rule_id",
+    "risk_level",
+    "confidence",
+    "start_position",
+    "end_position",
+    "text_fragment",
+    "explanation",
+)
+
+exported_rows = metrics.counter(
+    "export_rows_total",
+    "Analysis results written by streaming exports, by format",
+    ("format",)
+)
+
+
+def export_query(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    statuses: Optional[Sequence[DocumentStatus]] = None,
+    risk_levels: Optional[Sequence[RiskLevel]] = None
+):
+    """Results of the user's documents uploaded in [date_from, date_to), oldest first"""
+    query = (
+        select(
+            AnalysisResult.id,
+            AnalysisResult.document_id,
+            Document.original_filename,
+            Document.status,
+            Document.created_at,
+            AnalysisResult.rule_id,
+            AnalysisResult.risk_level,
+            AnalysisResult.confidence_score,
+            AnalysisResult.start_position,
+            AnalysisResult.end_position,
+            AnalysisResult.text_fragment,
+            AnalysisResult.explanation
+        )
+        .join(Document, AnalysisResult.document_id == Document.id)
+        .where(Document.user_id == user_id)
+        .order_by(AnalysisResult.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    if date_from is not None:
+        query = query.where(Document.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(Document.created_at < date_to)
+    if statuses:
+        query = query.where(Document.status.in_(statuses))
+    if risk_levels:
+        query = query.where(AnalysisResult.risk_level.in_(risk_levels))
+    return query
+
+
+def packed_export_query(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    statuses: Optional[Sequence[DocumentStatus]] = None
+):
+    """Packed risk records of the user's documents, filtered like export_query"""
+    query = (
+        select(
+            Document.id,
+            Document.original_filename,
+            Document.status,
+            Document.created_at,
+            Document.content,
+            DocumentRisks.data
+        )
+        .join(DocumentRisks, DocumentRisks.document_id == Document.id)
+        .where(Document.user_id == user_id)
+        .order_by(Document.id)
+        .execution_options(yield_per=PACKED_EXPORT_BATCH)
+    )
+    if date_from is not None:
+        query = query.where(Document.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(Document.created_at < date_to)
+    if statuses:
+        query = query.where(Document.status.in_(statuses))
+    return query
+
+
+def _packed_batches(db, query, risk_levels: Optional[Sequence[RiskLevel]]) -> Iterator[List[tuple]]:
+    for partition in db.execute(query).partitions():
+        for document_id, filename, document_status, created_at, content, data in partition:
+            batch = [
+                (ordinal, document_id, filename, document_status, created_at, rule_id, level, confidence,
+                 start, end, fragment, explanation)
+                for ordinal, rule_id, level, confidence, start, end, fragment, explanation
+                in packed_export_rows(db, data, content)
+                if not risk_levels or level in risk_levels
+            ]
+            if batch:
+                yield batch
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def _records(batches: Iterable[Sequence]) -> Iterator[List[list]]:
+    for batch in batches:
+        yield [[_plain(value) for value in row] for row in batch]
+
+
+# Encoders: batches of plain rows in, bytes out ------------------------------
+
+def csv_chunks(batches: Iterable[List[list]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so that Excel detects UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def jsonl_chunks(batches: Iterable[List[list]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n" for row in batch
+        ).encode("utf-8")
+
+
+# Characters not allowed in XML 1.0
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _cell(reference: str, value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(_XML_INVALID.sub("", str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_COLUMN_LETTERS = [chr(ord("A") + number) for number in range(len(COLUMNS))]
+
+
+def _sheet_row(number: int, values: Sequence) -> str:
+    cells = "".join(_cell(f"{letter}{number}", value) for letter, value in zip(_COLUMN_LETTERS, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+class _Chunks:
+    """Write-only, non-seekable file: zipfile then streams with data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _workbook_parts(sheets: int) -> Dict[str, str]:
+    header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for number in range(1, sheets + 1)
+    )
+    sheet_entries = "".join(
+        f'<sheet name="Risks{"" if number == 1 else f" {number}"}" sheetId="{number}" r:id="rId{number}"/>'
+        for number in range(1, sheets + 1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{number}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{number}.xml"/>'
+        for number in range(1, sheets + 1)
+    )
+    return {
+        "[Content_Types].xml": (
+            f'{header}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>'
+        ),
+        "_rels/.rels": (
+            f'{header}<Relationships xmlns="{_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'{header}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>{sheet_entries}</sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{header}<Relationships xmlns="{_PACKAGE_REL_NS}">{sheet_rels}</Relationships>'
+        ),
+    }
+
+
+def xlsx_chunks(batches: Iterable[List[list]]) -> Iterator[bytes]:
+    """Workbook with one sheet per XLSX_MAX_ROWS rows
+
+    Sheets are written first and the workbook parts that list them last; zip
+    readers locate members through the central directory, so order is free.
+    """
+    sink = _Chunks()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        sheets = 0
+        sheet = None
+        row_number = XLSX_MAX_ROWS
+        for batch in batches:
+            for values in batch:
+                if row_number == XLSX_MAX_ROWS:
+                    if sheet is not None:
+                        sheet.write(_SHEET_END.encode("utf-8"))
+                        sheet.close()
+                    sheets += 1
+                    sheet = archive.open(f"xl/worksheets/sheet{sheets}.xml", "w", force_zip64=True)
+                    sheet.write((_SHEET_START + _sheet_row(1, COLUMNS)).encode("utf-8"))
+                    row_number = 1
+                row_number += 1
+                sheet.write(_sheet_row(row_number, values).encode("utf-8"))
+            yield sink.drain()
+
+        if sheet is None:
+            sheets = 1
+            sheet = archive.open("xl/worksheets/sheet1.xml", "w")
+            sheet.write((_SHEET_START + _sheet_row(1, COLUMNS)).encode("utf-8"))
+        sheet.write(_SHEET_END.encode("utf-8"))
+        sheet.close()
+        for name, content in _workbook_parts(sheets).items():
+            archive.writestr(name, content)
+    yield sink.drain()
+
+
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "csv": ("text/csv", csv_chunks),
+    "jsonl": ("application/x-ndjson", jsonl_chunks),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", xlsx_chunks),
+}
+
+
+def stream_export(export_format: str, query, session_factory: Callable = None, packed_query=None,
+                  risk_levels: Optional[Sequence[RiskLevel]] = None) -> Iterator[bytes]:
+    """Encoded export of ``query`` (and of ``packed_query`` records) read through its own session
+
+    The session lives as long as the response body is being sent, independently
+    of the request's session.
+    """
+    if session_factory is None:
+        from app.database import SessionLocal as session_factory
+
+    encoder = EXPORT_FORMATS[export_format][1]
+    db = session_factory()
+    try:
+        def batches():
+            for partition in db.execute(query).partitions():
+                exported_rows.inc(len(partition), format=export_format)
+                yield partition
+            if packed_query is not None:
+                for batch in _packed_batches(db, packed_query, risk_levels):
+                    exported_rows.inc(len(batch), format=export_format)
+                    yield batch
+
+        yield from encoder(_records(batches()))
+    finally:
+        db.close()
@@ -0,0 +1,301 @@
+"""
+Text extraction in pooled worker processes with per-document budgets.
+
+A malformed or hostile PDF/DOCX must not pin the API at 100% CPU or exhaust
+its memory, so extraction runs in separate processes:
+
+- address space of each worker is capped with RLIMIT_AS (MemoryError inside),
+- every document gets settings.extraction_cpu_seconds of CPU time (soft
+  RLIMIT_CPU, SIGXCPU raised as an error in the worker),
+- the parent kills a worker that has not answered within
+  settings.extraction_timeout_seconds (also covers long calls in C code),
+- page counts and archive inflation are checked before parsing
+  (DocumentProcessor limits),
+- workers are replaced after settings.extraction_tasks_per_worker documents
+  to contain leaks, and immediately after a crash or kill.
+
+Every breach surfaces as ExtractionError with a ``reason`` code, which the
+caller records on the document.
+"""
+
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.tracing import current_traceparent, span
+from app.services.document_processor import DocumentProcessor, ExtractionError
+
+logger = logging.getLogger(__name__)
+
+extraction_failures = metrics.counter(
+    "extraction_failures_total",
+    "Documents whose text extraction was refused or aborted, by reason",
+    ("reason",)
+)
+worker_restarts = metrics.counter(
+    "extraction_worker_restarts_total",
+    "Extraction workers replaced, by cause",
+    ("cause",)
+)
+
+
+def extraction_limits() -> Dict:
+    """DocumentProcessor limits from settings"""
+    return {
+        "max_pages": settings.extraction_max_pages,
+        "max_unzipped_bytes": settings.extraction_max_unzipped_mb * 1024 * 1024,
+        "max_compression_ratio": settings.extraction_max_compression_ratio,
+    }
+
+
+# Budgets inside the process doing the extraction ---------------------------
+
+def _raise_cpu_limit(signum, frame):
+    raise ExtractionError("cpu_limit", "CPU time limit exceeded")
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionError("timeout", "Extraction time limit exceeded")
+
+
+@contextmanager
+def _cpu_budget(seconds: Optional[int]):
+    """Soft RLIMIT_CPU ``seconds`` above the CPU time used so far (main thread only)"""
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    limit = int(usage.ru_utime + usage.ru_stime) + int(seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    previous = signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        signal.signal(signal.SIGXCPU, previous)
+
+
+@contextmanager
+def _wall_clock_budget(seconds: Optional[float]):
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def guarded_extract(file_path: str, file_extension: Optional[str] = None, limits: Optional[Dict] = None,
+                    cpu_seconds: Optional[int] = None, wall_seconds: Optional[float] = None) -> str:
+    """Extract text within the budgets; any failure is raised as ExtractionError
+
+    CPU and wall-clock budgets need the main thread of a process that is
+    allowed to change its own limits (a worker, not the API process).
+    """
+    processor = DocumentProcessor(**(limits if limits is not None else extraction_limits()))
+    try:
+        with _cpu_budget(cpu_seconds), _wall_clock_budget(wall_seconds):
+            return processor.extract_text(file_path, file_extension)
+    except ExtractionError:
+        raise
+    except MemoryError:
+        raise ExtractionError("memory_limit", "Memory limit exceeded")
+    except ValueError as e:
+        raise ExtractionError("unsupported_format", str(e))
+    except Exception as e:
+        raise ExtractionError("extraction_failed", str(e))
+
+
+def _init_worker(memory_mb: int):
+    if memory_mb > 0:
+        import resource
+
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(connection, memory_mb: int, limits: Dict, cpu_seconds: int):
+    """Serve (path, extension, traceparent) requests until told to stop with None"""
+    _init_worker(memory_mb)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # shut down by the parent only
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        file_path, file_extension, traceparent = task
+        try:
+            # Spans of the worker continue the caller's trace
+            with span("extraction_worker", parent=traceparent):
+                reply = ("ok", guarded_extract(file_path, file_extension, limits, cpu_seconds))
+        except ExtractionError as e:
+            reply = ("error", e.reason, str(e))
+        try:
+            connection.send(reply)
+        except MemoryError:
+            connection.send(("error", "memory_limit", "Memory limit exceeded"))
+
+
+# Pool in the API process ---------------------------------------------------
+
+class _Worker:
+    def __init__(self, context, memory_mb: int, limits: Dict, cpu_seconds: int):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child, memory_mb, limits, cpu_seconds),
+            name="extraction-worker",
+            daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.connection.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class ExtractionSandbox:
+    """Bounded pool of extraction workers, started on demand
+
+    ``extract`` blocks the calling thread until the text is ready or the
+    budget is exhausted; at most ``workers`` documents are extracted at once.
+    Workers use "spawn" so they never inherit database connections.
+    """
+
+    def __init__(self, workers: int, tasks_per_worker: int, timeout_seconds: float,
+                 cpu_seconds: int, memory_mb: int, limits: Dict):
+        self.tasks_per_worker = tasks_per_worker
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.limits = limits
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._closed = False
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Extraction sandbox is shut down")
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self._context, self.memory_mb, self.limits, self.cpu_seconds)
+
+    def _release(self, worker: _Worker):
+        worker.tasks += 1
+        if self.tasks_per_worker and worker.tasks >= self.tasks_per_worker:
+            worker.stop()
+            worker_restarts.inc(cause="recycled")
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def extract(self, file_path: str, file_extension: Optional[str] = None) -> str:
+        with self._slots:
+            worker = self._acquire()
+            try:
+                worker.connection.send((file_path, file_extension, current_traceparent()))
+                if not worker.connection.poll(self.timeout_seconds):
+                    worker.kill()
+                    worker_restarts.inc(cause="timeout")
+                    raise ExtractionError("timeout", f"Extraction took longer than {self.timeout_seconds:g}s")
+                reply = worker.connection.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError, OSError):
+                worker.process.join(1)
+                exitcode = worker.process.exitcode
+                worker.kill()
+                # SIGKILL at the hard CPU limit, SIGXCPU if the soft limit was not handled
+                reason = "cpu_limit" if exitcode in (-signal.SIGXCPU, -signal.SIGKILL) else "worker_crashed"
+                worker_restarts.inc(cause=reason)
+                raise ExtractionError(reason, f"Extraction worker exited with code {exitcode}")
+            except BaseException:
+                if worker.process.is_alive():
+                    worker.kill()
+                raise
+            self._release(worker)
+        if reply[0] == "error":
+            raise ExtractionError(reply[1], reply[2])
+        return reply[1]
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_sandbox: Optional[ExtractionSandbox] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_extraction_sandbox() -> ExtractionSandbox:
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ExtractionSandbox(
+                workers=settings.extraction_workers,
+                tasks_per_worker=settings.extraction_tasks_per_worker,
+                timeout_seconds=settings.extraction_timeout_seconds,
+                cpu_seconds=settings.extraction_cpu_seconds,
+                memory_mb=settings.extraction_memory_mb,
+                limits=extraction_limits()
+            )
+        return _sandbox
+
+
+def shutdown_extraction_sandbox():
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is not None:
+            _sandbox.shutdown()
+            _sandbox = None
+
+
+def extract_text(file_path: str, file_extension: Optional[str] = None) -> str:
+    """Text of a stored document, extracted in the sandbox unless it is disabled"""
+    started = time.perf_counter()
+    try:
+        if settings.extraction_sandbox_enabled:
+            return get_extraction_sandbox().extract(file_path, file_extension)
+        return guarded_extract(file_path, file_extension)
+    except ExtractionError as e:
+        extraction_failures.inc(reason=e.reason)
+        logger.warning("Extraction of %s failed after %.1fs (%s): %s",
+                       file_path, time.perf_counter() - started, e.reason, e)
+        raise
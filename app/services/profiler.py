@@ -0,0 +1,255 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core import metrics
+
+PROFILE_MODES = ("cprofile", "sampling")
+_PROFILE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler for a single thread
+
+    A background thread wakes up every ``interval`` seconds and records the
+    target thread's current stack; the result is a collapsed-stack (flame graph)
+    profile. With a ``delay`` the first sample is taken only after that many
+    seconds, so short jobs are never sampled.
+    """
+
+    def __init__(self, thread_id: int, interval: float, delay: float = 0.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.delay = delay
+        self.samples: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        if self.delay and self._stop.wait(self.delay):
+            return
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def collapsed(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in sorted(self.samples.items(), key=lambda item: -item[1])]
+        return "\n".join(lines) + "\n"
+
+
+class ProfileCapture:
+    """Profile of one processing job
+
+    ``mode`` selects an explicitly requested profiler ("cprofile" or
+    "sampling"); without it a sampling profiler still runs when automatic
+    slow-job capture is enabled, and its result is only kept if the job
+    exceeds ``settings.profile_slow_job_seconds``.
+    """
+
+    def __init__(self, document_id: int, mode: Optional[str] = None, reason: str = "requested"):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.document_id = document_id
+        self.mode = mode
+        self.reason = reason
+        self.rule_timings: Dict[str, Dict[str, float]] = {}
+        self.stages: List[Dict[str, float]] = []
+        self.duration: Optional[float] = None
+        self.saved_as: Optional[str] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._started = 0.0
+        self._token = None
+
+    @property
+    def auto_capture(self) -> bool:
+        return self.mode is None and settings.profile_slow_job_seconds > 0
+
+    def __enter__(self) -> "ProfileCapture":
+        self._token = _current_capture.set(self)
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.mode == "sampling":
+            self._sampler = SamplingProfiler(threading.get_ident(), settings.profile_sampling_interval)
+            self._sampler.start()
+        elif self.auto_capture:
+            # Every job pays for this sampler, so it is coarse and armed late
+            self._sampler = SamplingProfiler(
+                threading.get_ident(),
+                settings.profile_auto_sampling_interval,
+                delay=settings.profile_slow_job_seconds * settings.profile_auto_start_fraction
+            )
+            self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        _current_capture.reset(self._token)
+
+        if self.mode is not None:
+            self.save(error=exc)
+        elif self.auto_capture and self.duration > settings.profile_slow_job_seconds:
+            self.reason = f"slow job: {self.duration:.1f}s > {settings.profile_slow_job_seconds:.1f}s budget"
+            self.save(error=exc)
+        return False
+
+    def record_stage(self, stage: str, seconds: float):
+        self.stages.append({"stage": stage, "seconds": seconds})
+
+    def save(self, error: Optional[BaseException] = None) -> str:
+        """Write the profile next to the document's other profiles and return its name"""
+        directory = os.path.join(settings.profile_dir, str(self.document_id))
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+        summary = {
+            "document_id": self.document_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "reason": self.reason,
+            "mode": self.mode or "sampling",
+            "duration": self.duration,
+            "error": str(error) if error else None,
+            "stages": self.stages,
+            "rule_timings": dict(sorted(self.rule_timings.items(), key=lambda item: -item[1]["seconds"])),
+            "files": [],
+        }
+
+        if self._profiler is not None:
+            stats_file = f"{name}.prof"
+            self._profiler.dump_stats(os.path.join(directory, stats_file))
+            text = io.StringIO()
+            pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(30)
+            with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8") as report:
+                report.write(text.getvalue())
+            summary["files"] += [stats_file, f"{name}.txt"]
+        if self._sampler is not None:
+            with open(os.path.join(directory, f"{name}.folded"), "w", encoding="utf-8") as folded:
+                folded.write(self._sampler.collapsed())
+            summary["files"].append(f"{name}.folded")
+
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as summary_file:
+            json.dump(summary, summary_file, ensure_ascii=False, indent=2)
+
+        profiles_captured.inc(reason="requested" if self.mode else "slow_job")
+        self.saved_as = name
+        return name
+
+
+_current_capture: ContextVar[Optional[ProfileCapture]] = ContextVar("profile_capture", default=None)
+
+profiles_captured = metrics.counter(
+    "profiles_captured_total",
+    "Stored processing profiles by trigger",
+    ("reason",)
+)
+
+
+def current_capture() -> Optional[ProfileCapture]:
+    return _current_capture.get()
+
+
+def _record_stage(stage: str, seconds: float):
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.record_stage(stage, seconds)
+
+
+metrics.stage_listeners.append(_record_stage)
+
+
+class ProfilingSwitch:
+    """Admin flag: profile the next N processing jobs with the given mode"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._mode = "cprofile"
+
+    def arm(self, jobs: int, mode: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        with self._lock:
+            self._remaining = jobs
+            self._mode = mode
+
+    def take(self) -> Optional[str]:
+        with self._lock:
+            if self._remaining <= 0:
+                return None
+            self._remaining -= 1
+            return self._mode
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"remaining_jobs": self._remaining, "mode": self._mode}
+
+
+profiling_switch = ProfilingSwitch()
+
+
+def list_profiles(document_id: Optional[int] = None) -> List[dict]:
+    """Summaries of stored profiles, newest first"""
+    if not os.path.isdir(settings.profile_dir):
+        return []
+
+    if document_id is not None:
+        directories = [str(document_id)]
+    else:
+        directories = [name for name in os.listdir(settings.profile_dir) if name.isdigit()]
+
+    profiles = []
+    for directory in directories:
+        path = os.path.join(settings.profile_dir, directory)
+        if not os.path.isdir(path):
+            continue
+        for filename in os.listdir(path):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(path, filename), encoding="utf-8") as summary_file:
+                summary = json.load(summary_file)
+            summary["name"] = filename[:-len(".json")]
+            summary.pop("stages", None)
+            summary["rule_timings"] = dict(list(summary.get("rule_timings", {}).items())[:5])
+            profiles.append(summary)
+
+    profiles.sort(key=lambda profile: profile["created_at"], reverse=True)
+    return profiles
+
+
+def profile_file_path(document_id: int, filename: str) -> Optional[str]:
+    """Path of a stored profile file, or None if it does not exist"""
+    if not _PROFILE_NAME.match(filename):
+        return None
+    path = os.path.join(settings.profile_dir, str(document_id), filename)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,308 @@
+"""
+Re-analysis of stored documents after the rule set changed.
+
+Every document records the ruleset version that produced its findings; the
+rule versions behind each ruleset version are kept in the ``rulesets`` table.
+For a stale document only the added or changed rules are run first. When
+neither they nor the changed or removed rules have any match in the document
+(the common case), its findings are still valid and only the ruleset version
+is updated. Otherwise overlapping matches may resolve differently, so the
+document is analyzed again and its findings are patched in place: unchanged
+findings keep their rows (and reviewer feedback), others are updated, added
+or deleted; a packed risk record is rewritten as a whole.
+
+The job runs in a background thread of one API process, at most
+settings.reanalysis_max_docs_per_second documents per second, and backs off
+while uploads are being processed.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.metrics import processing_queue_depth
+from app.core.tracing import propagating, span
+from app.models.document import AnalysisResult, Document, DocumentStatus, Ruleset
+from app.services.ai_analyzer import AIAnalyzer, get_analyzer
+from app.services.risk_storage import write_packed
+
+logger = logging.getLogger(__name__)
+
+BATCH = 100
+
+reanalyzed_documents = metrics.counter(
+    "reanalysis_documents_total",
+    "Documents checked by the ruleset re-analysis job, by outcome",
+    ("outcome",)
+)
+
+_registered: Set[str] = set()
+_PENDING_KEY = "reanalysis_new_rulesets"
+
+
+def register_ruleset(db: Session, analyzer: AIAnalyzer) -> str:
+    """Make sure the analyzer's ruleset is stored and return its version (part of the caller's transaction)"""
+    version = analyzer.ruleset_version
+    if version not in _registered:
+        if db.get(Ruleset, version) is None:
+            try:
+                with db.begin_nested():
+                    db.add(Ruleset(version=version, rules=json.dumps(analyzer.rule_versions, sort_keys=True)))
+            except IntegrityError:
+                pass  # registered concurrently by another document being processed
+        # Remembered once committed: a rolled back insert is retried by the next document
+        db.info.setdefault(_PENDING_KEY, set()).add(version)
+    return version
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_rulesets(session):
+    _registered.update(session.info.pop(_PENDING_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rulesets(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def stale_rules(old: Dict[str, int], new: Dict[str, int]) -> Tuple[Set[str], Set[str]]:
+    """(added or changed rule ids, removed rule ids) between two rulesets"""
+    changed = {rule_id for rule_id, version in new.items() if old.get(rule_id) != version}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+def _result_key(rule_id, start, end) -> tuple:
+    return (rule_id, start, end)
+
+
+def patch_results(db: Session, document: Document, risks) -> int:
+    """Bring the stored findings in line with ``risks``; returns the number of rows touched"""
+    existing = {
+        _result_key(result.rule_id, result.start_position, result.end_position): result
+        for result in document.analysis_results
+    }
+    touched = 0
+    for risk in risks:
+        result = existing.pop(_result_key(risk["rule_id"], risk["start_position"], risk["end_position"]), None)
+        if result is None:
+            document.analysis_results.append(AnalysisResult(
+                rule_id=risk["rule_id"],
+                risk_level=risk["level"],
+                text_fragment=risk["text"],
+                explanation=risk["explanation"],
+                start_position=risk["start_position"],
+                end_position=risk["end_position"],
+                confidence_score=risk.get("confidence", 0)
+            ))
+            touched += 1
+            continue
+        values = {
+            "risk_level": risk["level"],
+            "text_fragment": risk["text"],
+            "explanation": risk["explanation"],
+            "confidence_score": risk.get("confidence", 0),
+        }
+        if any(getattr(result, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(result, name, value)
+            touched += 1
+    for result in existing.values():
+        document.analysis_results.remove(result)
+        touched += 1
+    return touched
+
+
+def reanalyze_document(db: Session, document: Document, analyzer: AIAnalyzer,
+                       rulesets: Dict[Optional[str], Dict[str, int]]) -> str:
+    """Update one document to the analyzer's ruleset: "unchanged" or "patched" """
+    if document.ruleset_version not in rulesets:
+        row = db.get(Ruleset, document.ruleset_version) if document.ruleset_version else None
+        rulesets[document.ruleset_version] = json.loads(row.rules) if row is not None else {}
+    changed, removed = stale_rules(rulesets[document.ruleset_version], analyzer.rule_versions)
+
+    stale = changed | removed
+    affected = any(result.rule_id in stale or result.rule_id is None for result in document.findings)
+    if not affected and changed:
+        affected = bool(analyzer.scan_rules(document.content, rule_ids=changed, contract_type=document.contract_type))
+
+    outcome = "unchanged"
+    if affected:
+        risks = analyzer.analyze_document(document.content, contract_type=document.contract_type)
+        if document.packed_risks is not None:
+            write_packed(db, document, risks)
+        else:
+            patch_results(db, document, risks)
+        outcome = "patched"
+    document.ruleset_version = analyzer.ruleset_version
+    return outcome
+
+
+class ReanalysisJob:
+    """Background re-analysis of documents with an outdated ruleset version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state = "idle"
+        self._progress: Dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, max_docs_per_second: Optional[float] = None, session_factory=None) -> dict:
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Re-analysis is already running")
+            if session_factory is None:
+                from app.database import SessionLocal as session_factory
+            self._cancel.clear()
+            self._resume.set()
+            self._state = "running"
+            self._progress = {
+                "ruleset_version": get_analyzer().ruleset_version,
+                "max_docs_per_second": max_docs_per_second or settings.reanalysis_max_docs_per_second,
+                "total": None,
+                "processed": 0,
+                "patched": 0,
+                "unchanged": 0,
+                "failed": 0,
+                "last_document_id": 0,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "finished_at": None,
+                "error": None,
+            }
+            self._thread = threading.Thread(
+                target=propagating(self._run), args=(session_factory,), name="reanalysis", daemon=True
+            )
+            self._thread.start()
+        return self.status()
+
+    def pause(self) -> dict:
+        with self._lock:
+            if self._state == "running":
+                self._resume.clear()
+                self._state = "paused"
+        return self.status()
+
+    def resume(self) -> dict:
+        with self._lock:
+            if self._state == "paused":
+                self._state = "running"
+                self._resume.set()
+        return self.status()
+
+    def cancel(self) -> dict:
+        with self._lock:
+            if self.running:
+                self._cancel.set()
+                self._resume.set()
+        return self.status()
+
+    def status(self) -> dict:
+        with self._lock:
+            progress = dict(self._progress)
+            state = self._state
+        if progress.get("started_at") and progress["processed"]:
+            started = datetime.fromisoformat(progress["started_at"])
+            end = datetime.fromisoformat(progress["finished_at"]) if progress["finished_at"] else datetime.now(timezone.utc)
+            elapsed = max((end - started).total_seconds(), 1e-9)
+            progress["docs_per_second"] = progress["processed"] / elapsed
+            if progress["total"] is not None and state in ("running", "paused"):
+                progress["eta_seconds"] = (progress["total"] - progress["processed"]) / progress["docs_per_second"]
+        return {"state": state, **progress}
+
+    def _update(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                self._progress[name] = value
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._progress["processed"] += 1
+            self._progress[outcome] += 1
+        reanalyzed_documents.inc(outcome=outcome)
+
+    def _wait_turn(self, not_before: float):
+        """Respect the rate limit, pause requests and live uploads"""
+        delay = not_before - time.perf_counter()
+        if delay > 0:
+            self._cancel.wait(delay)
+        while not self._cancel.is_set():
+            self._resume.wait()
+            if processing_queue_depth.value() <= 0 or self._cancel.is_set():
+                return
+            self._cancel.wait(settings.reanalysis_busy_backoff_seconds)
+
+    def _run(self, session_factory):
+        from app.services.response_cache import response_cache
+
+        analyzer = get_analyzer()
+        interval = 1.0 / self._progress["max_docs_per_second"]
+        rulesets: Dict[Optional[str], Dict[str, int]] = {}
+        db = session_factory()
+        try:
+            register_ruleset(db, analyzer)
+            db.commit()
+            stale = db.query(Document.id).filter(
+                Document.status == DocumentStatus.ANALYZED,
+                Document.content.isnot(None),
+                or_(Document.ruleset_version.is_(None), Document.ruleset_version != analyzer.ruleset_version)
+            )
+            self._update(total=stale.count())
+
+            last_id = 0
+            not_before = 0.0
+            while not self._cancel.is_set():
+                ids = [row.id for row in stale.filter(Document.id > last_id).order_by(Document.id).limit(BATCH)]
+                if not ids:
+                    break
+                for document_id in ids:
+                    self._wait_turn(not_before)
+                    if self._cancel.is_set():
+                        break
+                    not_before = time.perf_counter() + interval
+                    try:
+                        with span("reanalyze_document", document_id=document_id) as document_span:
+                            document = db.get(Document, document_id)
+                            outcome = reanalyze_document(db, document, analyzer, rulesets)
+                            db.commit()
+                            if document_span is not None:
+                                document_span.set(outcome=outcome)
+                        if outcome == "patched":
+                            response_cache.invalidate_document(document_id)
+                        self._count(outcome)
+                    except Exception as e:
+                        db.rollback()
+                        logger.warning("Re-analysis of document %s failed: %s", document_id, e)
+                        self._count("failed")
+                    finally:
+                        db.expunge_all()
+                    last_id = document_id
+                    self._update(last_document_id=document_id)
+            with self._lock:
+                self._state = "cancelled" if self._cancel.is_set() else "finished"
+        except Exception as e:
+            logger.exception("Re-analysis job failed")
+            with self._lock:
+                self._state = "failed"
+                self._progress["error"] = str(e)
+        finally:
+            db.close()
+            self._update(finished_at=datetime.now(timezone.utc).isoformat())
+
+
+reanalysis_job = ReanalysisJob()
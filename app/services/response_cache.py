@@ -0,0 +1,240 @@
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import metrics
+from app.models.document import Document, AnalysisResult, DocumentRisks
+
+
+class CacheBackend:
+    """Storage interface for rendered responses.
+
+    A backend stores opaque byte strings under string keys and groups them by
+    tag so that every response derived from a document can be dropped at once.
+    Each tag has a generation that is bumped on invalidation; ``set`` must be
+    ignored when the generation no longer matches. Shared (cross-worker)
+    backends implement the same methods on top of an external store.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, tag: str, generation: int) -> None:
+        raise NotImplementedError
+
+    def invalidate_tag(self, tag: str) -> None:
+        raise NotImplementedError
+
+    def get_generation(self, tag: str) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process LRU cache bounded by the total size of stored entries in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._size = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, tag: str, generation: int) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if self._generations.get(tag, 0) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, tag)
+            self._size += size
+            self._tags.setdefault(tag, set()).add(key)
+
+            while self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def invalidate_tag(self, tag: str) -> None:
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in self._tags.pop(tag, ()):
+                if key in self._entries:
+                    self._remove(key)
+
+    def get_generation(self, tag: str) -> int:
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, key: str) -> None:
+        value, tag = self._entries.pop(key)
+        self._size -= self._entry_size(key, value)
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        return len(key) + len(value)
+
+
+CACHE_BACKENDS: Dict[str, Callable[[int], CacheBackend]] = {
+    "local": LocalCacheBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[int], CacheBackend]) -> None:
+    """Register a cache backend factory selectable via settings.response_cache_backend"""
+    CACHE_BACKENDS[name] = factory
+
+
+class ResponseCache:
+    """Cache of rendered API responses keyed by (user, document, endpoint)"""
+
+    def __init__(self, backend: CacheBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _document_tag(document_id: int) -> str:
+        return f"document:{document_id}"
+
+    @staticmethod
+    def _key(user_id: int, document_id: int, endpoint: str) -> str:
+        return f"{user_id}:{document_id}:{endpoint}"
+
+    def generation(self, document_id: int) -> int:
+        """Current invalidation generation of a document, taken before rendering"""
+        return self.backend.get_generation(self._document_tag(document_id))
+
+    def get(self, user_id: int, document_id: int, endpoint: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+
+        value = self.backend.get(self._key(user_id, document_id, endpoint))
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, user_id: int, document_id: int, endpoint: str, value: bytes, generation: int) -> None:
+        """Store a rendered response unless the document changed while it was rendered"""
+        if not self.enabled:
+            return
+        self.backend.set(
+            self._key(user_id, document_id, endpoint),
+            value,
+            self._document_tag(document_id),
+            generation
+        )
+
+    def invalidate_document(self, document_id: int) -> None:
+        self.backend.invalidate_tag(self._document_tag(document_id))
+        with self._lock:
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses, invalidations = self._hits, self._misses, self._invalidations
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "invalidations": invalidations,
+            **self.backend.stats(),
+        }
+
+
+def create_response_cache() -> ResponseCache:
+    factory = CACHE_BACKENDS.get(settings.response_cache_backend)
+    if factory is None:
+        raise ValueError(f"Unknown response cache backend: {settings.response_cache_backend}")
+    return ResponseCache(factory(settings.response_cache_max_bytes), enabled=settings.response_cache_enabled)
+
+
+response_cache = create_response_cache()
+
+metrics.gauge(
+    "response_cache",
+    "Response cache counters (hits, misses, evictions, invalidations, entries, bytes)",
+    ("stat",),
+    callback=lambda: {
+        (name,): float(value)
+        for name, value in response_cache.stats().items()
+        if name not in ("enabled", "hit_ratio", "max_bytes")
+    }
+)
+metrics.gauge(
+    "response_cache_hit_ratio",
+    "Share of response cache lookups served from the cache",
+    callback=lambda: {(): response_cache.stats()["hit_ratio"]}
+)
+
+
+# Invalidation: collect documents touched by a flush and drop their cached
+# responses only once the transaction is committed, so readers never re-cache
+# state that could still be rolled back.
+_PENDING_KEY = "response_cache_invalidated_documents"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_documents(session, flush_context):
+    changed = session.info.setdefault(_PENDING_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Document):
+            changed.add(obj.id)
+        elif isinstance(obj, (AnalysisResult, DocumentRisks)):
+            changed.add(obj.document_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_documents(session):
+    for document_id in session.info.pop(_PENDING_KEY, ()):
+        if document_id is not None:
+            response_cache.invalidate_document(document_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_documents(session):
+    session.info.pop(_PENDING_KEY, None)
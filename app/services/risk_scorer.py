@@ -0,0 +1,198 @@
+import logging
+import math
+import os
+import re
+import shutil
+from bisect import bisect_right
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when feature extraction changes; artifacts built for another version are ignored
+FEATURE_VERSION = 1
+N_FEATURES = 2 ** 18
+CONTEXT_CHARS = 80
+
+_WORD = re.compile(r"\w+")
+_HEADING = re.compile(r"(?m)^[ \t]*(?:\d+(?:\.\d+)*\.?[ \t]+)?([А-ЯЁA-Z][^\n]{0,80})$")
+SECTION_KEYWORDS = [
+    ("subject", ("предмет",)),
+    ("payment", ("оплат", "расчет", "стоимость", "цена")),
+    ("term", ("срок", "действи")),
+    ("liability", ("ответственност", "штраф", "неустойк")),
+    ("confidentiality", ("конфиденциальн",)),
+    ("force_majeure", ("форс-мажор", "непреодолим")),
+    ("disputes", ("спор", "разногласи")),
+    ("termination", ("расторжени", "прекращени")),
+    ("final", ("заключительн", "прочие")),
+]
+
+
+class Sections:
+    """Section type of every position of a document, from its heading lines"""
+
+    def __init__(self, content: str):
+        self.starts: List[int] = [0]
+        self.types: List[str] = ["preamble"]
+        for match in _HEADING.finditer(content):
+            heading = match.group(1).lower()
+            if len(heading.split()) > 8:
+                continue
+            section = next((name for name, stems in SECTION_KEYWORDS if any(stem in heading for stem in stems)), None)
+            if section is not None:
+                self.starts.append(match.start())
+                self.types.append(section)
+
+    def at(self, position: int) -> str:
+        return self.types[bisect_right(self.starts, position) - 1]
+
+
+def _ngrams(text: str, prefix: str) -> Dict[str, float]:
+    words = _WORD.findall(text.lower())
+    features = {f"{prefix}={word}": 1.0 for word in words}
+    features.update({f"{prefix}={first}_{second}": 1.0 for first, second in zip(words, words[1:])})
+    return features
+
+
+def match_features(content: str, risks: Sequence[Dict[str, Any]]) -> List[Dict[str, float]]:
+    """One feature dict per match: rule, level, length, position, section and context n-grams"""
+    sections = Sections(content)
+    length = max(len(content), 1)
+    rows = []
+    for risk in risks:
+        start, end = risk["start_position"], risk["end_position"]
+        level = getattr(risk["level"], "value", risk["level"])
+        row = {
+            f"rule={risk['rule_id']}": 1.0,
+            f"level={level}": 1.0,
+            f"section={sections.at(start)}": 1.0,
+            f"rule_section={risk['rule_id']}:{sections.at(start)}": 1.0,
+            "log_length": math.log1p(end - start),
+            "position": start / length,
+        }
+        row.update(_ngrams(content[max(0, start - CONTEXT_CHARS):start], "before"))
+        row.update(_ngrams(content[end:end + CONTEXT_CHARS], "after"))
+        rows.append(row)
+    return rows
+
+
+def build_pipeline():
+    from sklearn.feature_extraction import FeatureHasher
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    return make_pipeline(
+        FeatureHasher(n_features=N_FEATURES, input_type="dict", alternate_sign=False),
+        LogisticRegression(class_weight="balanced", max_iter=1000)
+    )
+
+
+class RiskScorer:
+    """Learned confidence model applied to all matches of a document at once"""
+
+    def __init__(self, pipeline, version: str, metadata: Optional[dict] = None):
+        self.pipeline = pipeline
+        self.version = version
+        self.metadata = metadata or {}
+
+    def score(self, content: str, risks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set each risk's "confidence" (0-100) from one vectorized predict_proba call"""
+        if not risks:
+            return risks
+        probabilities = self.pipeline.predict_proba(match_features(content, risks))[:, 1]
+        for risk, probability in zip(risks, probabilities):
+            risk["confidence"] = int(round(float(probability) * 100))
+        return risks
+
+    def save(self, path: str) -> str:
+        """Write the artifact as ``<name>-<version>.joblib`` and point ``path`` at it"""
+        import joblib
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        base, extension = os.path.splitext(os.path.basename(path))
+        versioned = os.path.join(directory, f"{base}-{self.version}{extension}")
+        artifact = {
+            "feature_version": FEATURE_VERSION,
+            "version": self.version,
+            "metadata": self.metadata,
+            "pipeline": self.pipeline,
+        }
+        joblib.dump(artifact, versioned)
+        # Atomic switch of the current model for processes started afterwards
+        staging = f"{path}.tmp"
+        shutil.copyfile(versioned, staging)
+        os.replace(staging, path)
+        return versioned
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RiskScorer"]:
+        import joblib
+
+        artifact = joblib.load(path)
+        if artifact.get("feature_version") != FEATURE_VERSION:
+            logger.warning(
+                "Ignoring risk scorer %s: feature version %s, expected %s",
+                path, artifact.get("feature_version"), FEATURE_VERSION
+            )
+            return None
+        return cls(artifact["pipeline"], artifact["version"], artifact.get("metadata"))
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+
+
+@lru_cache(maxsize=1)
+def get_risk_scorer() -> Optional[RiskScorer]:
+    """Process-wide scorer, or None when no usable artifact exists (heuristic fallback)"""
+    path = settings.risk_scorer_path
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return RiskScorer.load(path)
+    except Exception as e:
+        logger.warning("Could not load risk scorer %s: %s", path, e)
+        return None
+
+
+def training_rows(db) -> Tuple[List[Dict[str, float]], List[int]]:
+    """Features and labels from reviewer feedback on stored analysis results"""
+    from app.models.document import AnalysisResult, Document, RiskFeedback
+
+    rows = (
+        db.query(RiskFeedback.is_risk, AnalysisResult, Document.content)
+        .join(AnalysisResult, RiskFeedback.analysis_result_id == AnalysisResult.id)
+        .join(Document, AnalysisResult.document_id == Document.id)
+        .filter(
+            Document.content.isnot(None),
+            AnalysisResult.rule_id.isnot(None),
+            AnalysisResult.start_position.isnot(None),
+            AnalysisResult.end_position.isnot(None)
+        )
+        .order_by(AnalysisResult.document_id)
+    )
+    features: List[Dict[str, float]] = []
+    labels: List[int] = []
+    pending: List[Dict[str, Any]] = []
+    pending_content = None
+    pending_document = None
+    for is_risk, result, content in rows:
+        if result.document_id != pending_document and pending:
+            features.extend(match_features(pending_content, pending))
+            pending = []
+        pending_document, pending_content = result.document_id, content
+        pending.append({
+            "rule_id": result.rule_id,
+            "level": result.risk_level,
+            "start_position": result.start_position,
+            "end_position": result.end_position,
+        })
+        labels.append(1 if is_risk else 0)
+    if pending:
+        features.extend(match_features(pending_content, pending))
+    return features, labels
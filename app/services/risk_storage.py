@@ -0,0 +1,267 @@
+"""
+Storage of a document's risks: one ``analysis_results`` row per risk, or a
+single packed ``document_risks`` record (settings.risk_storage_mode = "packed").
+
+A packed record is a small header followed by fixed-size records:
+
+    header  <BIIIII  format, risk count, high, medium and low counts, overrides
+    record  <IIIB    rule reference, start, end, confidence  (13 bytes)
+    override <II     record index, byte length, then the UTF-8 fragment
+
+The rule reference points to a ``rules`` row holding the rule id, risk level
+and explanation, so the explanation text is stored once instead of once per
+risk. The text fragment is ``content[start:end]`` and is not stored; the rare
+fragment that differs from the document text at its position (findings
+carried over from an earlier version) is kept as an override.
+
+Records are decoded only when the results are read, and a result's fragment
+only when it is accessed. Rules never change once inserted, so they are
+cached for the life of the process (rules inserted by a transaction only once
+it is committed).
+"""
+
+import hashlib
+import struct
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.document import AnalysisResult, Document, DocumentRisks, RiskLevel, Rule
+
+FORMAT = 1
+HEADER = struct.Struct("<BIIIII")
+RECORD = struct.Struct("<IIIB")
+OVERRIDE = struct.Struct("<II")
+
+
+# Per database: rule key -> reference, reference -> (rule_id, level, explanation)
+_rule_refs: Dict[str, Dict[str, int]] = {}
+_rules: Dict[str, Dict[int, Tuple[str, RiskLevel, str]]] = {}
+_PENDING_KEY = "risk_storage_new_rules"
+
+
+def _database(db: Session) -> str:
+    return str(db.get_bind().url)
+
+
+def _rule_key(rule_id: str, level: RiskLevel, explanation: str) -> str:
+    return hashlib.sha1(f"{rule_id}\0{level.value}\0{explanation}".encode("utf-8")).hexdigest()
+
+
+def rule_ref(db: Session, rule_id: str, level: RiskLevel, explanation: str) -> int:
+    """Reference of the rule row, inserted on first use (part of the caller's transaction)"""
+    key = _rule_key(rule_id, level, explanation)
+    refs = _rule_refs.setdefault(_database(db), {})
+    pending = db.info.setdefault(_PENDING_KEY, {})
+    if key in refs:
+        return refs[key]
+    if key in pending:
+        return pending[key].id
+    for _ in range(2):
+        rule = db.query(Rule).filter(Rule.key == key).first()
+        if rule is None:
+            try:
+                with db.begin_nested():
+                    rule = Rule(key=key, rule_id=rule_id, risk_level=level, explanation=explanation)
+                    db.add(rule)
+            except IntegrityError:
+                # Inserted concurrently by another worker; read it back
+                continue
+            pending[key] = rule
+            return rule.id
+        refs[key] = rule.id
+        _rules.setdefault(_database(db), {})[rule.id] = (rule.rule_id, rule.risk_level, rule.explanation)
+        return rule.id
+    raise RuntimeError(f"Could not store rule {rule_id}")
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_new_rules(session):
+    new_rules = session.info.pop(_PENDING_KEY, None)
+    if new_rules:
+        database = _database(session)
+        for key, rule in new_rules.items():
+            _rule_refs.setdefault(database, {})[key] = rule.id
+            _rules.setdefault(database, {})[rule.id] = (rule.rule_id, rule.risk_level, rule.explanation)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_rules(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _load_rules(db: Session, refs) -> Dict[int, Tuple[str, RiskLevel, str]]:
+    rules = _rules.setdefault(_database(db), {})
+    missing = set(refs) - set(rules)
+    if missing:
+        for rule in db.query(Rule).filter(Rule.id.in_(missing)):
+            rules[rule.id] = (rule.rule_id, rule.risk_level, rule.explanation)
+    return rules
+
+
+def pack(db: Session, risks: Sequence[Dict[str, Any]], content: Optional[str]) -> bytes:
+    """Packed record of analyzer risk dicts found in ``content``"""
+    levels = Counter()
+    records = []
+    overrides = []
+    for index, risk in enumerate(risks):
+        level = RiskLevel(risk["level"])
+        levels[level] += 1
+        start, end = risk["start_position"], risk["end_position"]
+        records.append(RECORD.pack(
+            rule_ref(db, risk["rule_id"], level, risk["explanation"]), start, end, int(risk.get("confidence") or 0)
+        ))
+        if content is None or content[start:end] != risk["text"]:
+            fragment = risk["text"].encode("utf-8")
+            overrides.append(OVERRIDE.pack(index, len(fragment)) + fragment)
+    header = HEADER.pack(
+        FORMAT, len(records), levels[RiskLevel.HIGH], levels[RiskLevel.MEDIUM], levels[RiskLevel.LOW], len(overrides)
+    )
+    return b"".join([header, *records, *overrides])
+
+
+def unpack_header(data: bytes) -> Tuple[int, Dict[RiskLevel, int], int]:
+    """(risk count, risks by level, override count)"""
+    version, count, high, medium, low, overrides = HEADER.unpack_from(data)
+    if version != FORMAT:
+        raise ValueError(f"Unknown packed risk format: {version}")
+    return count, {RiskLevel.HIGH: high, RiskLevel.MEDIUM: medium, RiskLevel.LOW: low}, overrides
+
+
+def unpack(data: bytes) -> Tuple[List[Tuple[int, int, int, int]], Dict[int, str]]:
+    """(records as (rule reference, start, end, confidence), fragment overrides by index)"""
+    count, _, override_count = unpack_header(data)
+    end = HEADER.size + count * RECORD.size
+    records = list(RECORD.iter_unpack(memoryview(data)[HEADER.size:end]))
+    overrides = {}
+    position = end
+    for _ in range(override_count):
+        index, length = OVERRIDE.unpack_from(data, position)
+        position += OVERRIDE.size
+        overrides[index] = bytes(data[position:position + length]).decode("utf-8")
+        position += length
+    return records, overrides
+
+
+class PackedResult:
+    """One decoded risk with the attributes of an AnalysisResult row; ``id`` is its 1-based ordinal"""
+
+    __slots__ = (
+        "id", "document_id", "rule_id", "risk_level", "explanation",
+        "start_position", "end_position", "confidence_score", "created_at", "_fragment", "_document",
+    )
+
+    def __init__(self, ordinal, document, record, rule, fragment, created_at):
+        rule_ref, self.start_position, self.end_position, self.confidence_score = record
+        self.rule_id, self.risk_level, self.explanation = rule
+        self.id = ordinal
+        self.document_id = document.id
+        self.created_at = created_at
+        self._fragment = fragment
+        self._document = document
+
+    @property
+    def text_fragment(self) -> str:
+        if self._fragment is None:
+            self._fragment = (self._document.content or "")[self.start_position:self.end_position]
+        return self._fragment
+
+
+class PackedResults(Sequence):
+    """Lazily decoded results of a DocumentRisks record, in text order"""
+
+    def __init__(self, record: DocumentRisks, document: Document):
+        self.record = record
+        self.document = document
+        self.data = record.data
+        self._results: Optional[List[PackedResult]] = None
+
+    def _decode(self) -> List[PackedResult]:
+        if self._results is None:
+            records, overrides = unpack(self.data)
+            db = object_session(self.record)
+            rules = _load_rules(db, {record[0] for record in records}) if records else {}
+            self._results = [
+                PackedResult(index + 1, self.document, record, rules[record[0]], overrides.get(index),
+                             self.record.created_at)
+                for index, record in enumerate(records)
+            ]
+        return self._results
+
+    def __len__(self) -> int:
+        return self.record.risk_count
+
+    def __getitem__(self, index):
+        return self._decode()[index]
+
+    def __iter__(self) -> Iterator[PackedResult]:
+        return iter(self._decode())
+
+    def level_counts(self) -> Dict[RiskLevel, int]:
+        return unpack_header(self.data)[1]
+
+
+def level_counts(document: Document) -> Dict[RiskLevel, int]:
+    """Risks of the document by level; read from the header for packed records"""
+    if document.packed_risks is not None:
+        return document.findings.level_counts()
+    counts = Counter(result.risk_level for result in document.analysis_results)
+    return {level: counts[level] for level in (RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW)}
+
+
+def find_result(db: Session, document: Document, result_id: int):
+    """The document's finding ``result_id`` in either storage mode, or None"""
+    if document.packed_risks is not None:
+        return document.findings[result_id - 1] if 1 <= result_id <= len(document.findings) else None
+    return db.query(AnalysisResult).filter(
+        AnalysisResult.id == result_id,
+        AnalysisResult.document_id == document.id
+    ).first()
+
+
+def packed_record(db: Session, document_id: int, risks: Sequence[Dict[str, Any]],
+                  content: Optional[str]) -> DocumentRisks:
+    return DocumentRisks(document_id=document_id, risk_count=len(risks), data=pack(db, risks, content))
+
+
+def write_packed(db: Session, document: Document, risks: Sequence[Dict[str, Any]]) -> None:
+    """Create or replace the document's packed record"""
+    if document.packed_risks is None:
+        document.packed_risks = packed_record(db, document.id, risks, document.content)
+    else:
+        document.packed_risks.risk_count = len(risks)
+        document.packed_risks.data = pack(db, risks, document.content)
+
+
+def store_risks(db: Session, document: Document, risks: Sequence[Dict[str, Any]]) -> None:
+    """Save the analyzer's risks for a freshly analyzed document in the configured mode"""
+    if settings.risk_storage_mode not in ("rows", "packed"):
+        raise ValueError(f"Unknown risk storage mode: {settings.risk_storage_mode}")
+    if settings.risk_storage_mode == "packed":
+        write_packed(db, document, risks)
+        return
+    for risk in risks:
+        db.add(AnalysisResult(
+            document_id=document.id,
+            rule_id=risk["rule_id"],
+            risk_level=risk["level"],
+            text_fragment=risk["text"],
+            explanation=risk["explanation"],
+            start_position=risk.get("start_position"),
+            end_position=risk.get("end_position"),
+            confidence_score=risk.get("confidence", 0)
+        ))
+
+
+def packed_export_rows(db: Session, data: bytes, content: Optional[str]) -> Iterator[Tuple]:
+    """(ordinal, rule_id, level, confidence, start, end, fragment, explanation) of a packed record"""
+    records, overrides = unpack(data)
+    rules = _load_rules(db, {record[0] for record in records}) if records else {}
+    for index, (rule, start, end, confidence) in enumerate(records):
+        rule_id, level, explanation = rules[rule]
+        fragment = overrides[index] if index in overrides else (content or "")[start:end]
+        yield index + 1, rule_id, level, confidence, start, end, fragment, explanation
@@ -0,0 +1,119 @@
+"""
+Russian stemmer following the Snowball algorithm
+(https://snowballstem.org/algorithms/russian/stemmer.html).
+
+Pure Python and dependency-free. Endings are removed from the RV region only
+(everything after the first vowel); the derivational ending needs R2.
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+VOWELS = set("аеиоуыэюя")
+
+# (endings that must follow "а" or "я", endings allowed anywhere); longest first
+PERFECTIVE_GERUND = (("вшись", "вши", "в"), ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв"))
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+VERB = (
+    ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н"),
+    (
+        "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+        "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+    ),
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Start of RV and of R2"""
+    rv = next((index + 1 for index, char in enumerate(word) if char in VOWELS), len(word))
+
+    def after_vowel_consonant(start: int) -> int:
+        for index in range(start + 1, len(word)):
+            if word[index] not in VOWELS and word[index - 1] in VOWELS:
+                return index + 1
+        return len(word)
+
+    r1 = after_vowel_consonant(0)
+    return rv, after_vowel_consonant(r1) if r1 < len(word) else len(word)
+
+
+def _longest(rv: str, endings) -> Optional[str]:
+    for ending in sorted(endings, key=len, reverse=True):
+        if rv.endswith(ending):
+            return ending
+    return None
+
+
+def _grouped(rv: str, groups) -> Optional[str]:
+    """Longest ending of either group; group one endings need a preceding а or я in RV"""
+    after_a, anywhere = groups
+    candidates = [ending for ending in anywhere if rv.endswith(ending)]
+    candidates += [
+        ending for ending in after_a
+        if rv.endswith(ending) and len(rv) > len(ending) and rv[-len(ending) - 1] in "ая"
+    ]
+    return max(candidates, key=len) if candidates else None
+
+
+def _adjectival(rv: str) -> Optional[str]:
+    adjective = _longest(rv, ADJECTIVE)
+    if adjective is None:
+        return None
+    participle = _grouped(rv[:-len(adjective)], PARTICIPLE)
+    return participle + adjective if participle else adjective
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Stem of a lowercase Russian word; other words are returned unchanged"""
+    word = word.replace("ё", "е")
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Step 1
+    ending = _grouped(rv, PERFECTIVE_GERUND)
+    if ending:
+        rv = rv[:-len(ending)]
+    else:
+        ending = _longest(rv, REFLEXIVE)
+        if ending:
+            rv = rv[:-len(ending)]
+        ending = _adjectival(rv) or _grouped(rv, VERB) or _longest(rv, NOUN)
+        if ending:
+            rv = rv[:-len(ending)]
+
+    # Step 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Step 3: derivational ending within R2
+    r2 = rv[max(0, r2_start - rv_start):]
+    ending = _longest(r2, DERIVATIONAL)
+    if ending:
+        rv = rv[:-len(ending)]
+
+    # Step 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        ending = _longest(rv, SUPERLATIVE)
+        if ending:
+            rv = rv[:-len(ending)]
+            if rv.endswith("нн"):
+                rv = rv[:-1]
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
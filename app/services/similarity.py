@@ -0,0 +1,146 @@
+import hashlib
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import Document, DocumentSignature, DocumentStatus, LshBucket
+
+_TOKEN = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d")
+
+# Universal hashing (a * x + b) mod p, with the same fixed seed in every process
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BATCH = 8192
+
+
+def _permutations(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    generator = np.random.RandomState(1)
+    a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_PERMUTATIONS = {}
+
+
+def shingles(content: str, size: int) -> set:
+    """Word n-grams of the normalized text
+
+    Tokens are lowercased and digits collapsed, so contracts that differ only in
+    dates, amounts and reference numbers produce the same shingles.
+    """
+    tokens = [_NUMBER.sub("0", token) for token in _TOKEN.findall(content.lower())]
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[index:index + size]) for index in range(len(tokens) - size + 1)}
+
+
+def minhash(content: str, num_perm: Optional[int] = None, shingle_size: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """MinHash signature (uint32 array) of the text and its shingle count"""
+    num_perm = num_perm or settings.similarity_num_perm
+    shingle_size = shingle_size or settings.similarity_shingle_size
+    if num_perm not in _PERMUTATIONS:
+        _PERMUTATIONS[num_perm] = _permutations(num_perm)
+    a, b = _PERMUTATIONS[num_perm]
+
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(content, shingle_size)),
+        dtype=np.uint64
+    )
+    signature = np.full(num_perm, _MAX_HASH, dtype=np.uint64)
+    # uint64 overflow wraps around, as intended by the hashing scheme
+    with np.errstate(over="ignore"):
+        for start in range(0, len(hashes), _BATCH):
+            batch = hashes[start:start + _BATCH, np.newaxis]
+            values = ((batch * a + b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, values.min(axis=0), out=signature)
+    return signature.astype(np.uint32), len(hashes)
+
+
+def band_buckets(signature: np.ndarray, bands: Optional[int] = None) -> List[int]:
+    """One signed 64-bit bucket id per LSH band"""
+    bands = bands or settings.similarity_bands
+    rows = len(signature) // bands
+    buckets = []
+    for band in range(bands):
+        digest = hashlib.blake2b(
+            band.to_bytes(2, "little") + signature[band * rows:(band + 1) * rows].astype("<u4").tobytes(),
+            digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return float(np.mean(first == second))
+
+
+def _decode(signature: bytes) -> np.ndarray:
+    return np.frombuffer(signature, dtype="<u4")
+
+
+def index_document(db: Session, document: Document, content: str) -> np.ndarray:
+    """Store the document's signature and LSH buckets (part of the caller's transaction)"""
+    signature, shingle_count = minhash(content)
+    db.execute(delete(LshBucket).where(LshBucket.document_id == document.id))
+    db.execute(delete(DocumentSignature).where(DocumentSignature.document_id == document.id))
+    db.add(DocumentSignature(
+        document_id=document.id,
+        signature=signature.astype("<u4").tobytes(),
+        num_perm=len(signature),
+        shingle_count=shingle_count
+    ))
+    db.add_all(LshBucket(bucket=bucket, document_id=document.id) for bucket in set(band_buckets(signature)))
+    return signature
+
+
+def find_similar(
+    db: Session,
+    signature: np.ndarray,
+    user_id: int,
+    exclude_document_id: Optional[int] = None,
+    limit: int = 10,
+    analyzed_only: bool = False
+) -> List[Tuple[Document, float]]:
+    """The user's documents most similar to ``signature``, best first
+
+    Only documents sharing at least one LSH bucket are scored, so the cost
+    depends on the number of candidates rather than on the collection size.
+    """
+    candidates = (
+        select(LshBucket.document_id)
+        .where(LshBucket.bucket.in_(band_buckets(signature)))
+        .distinct()
+    )
+    query = (
+        db.query(Document, DocumentSignature.signature)
+        .join(DocumentSignature, DocumentSignature.document_id == Document.id)
+        .filter(
+            Document.id.in_(candidates),
+            Document.user_id == user_id,
+            DocumentSignature.num_perm == len(signature)
+        )
+    )
+    if exclude_document_id is not None:
+        query = query.filter(Document.id != exclude_document_id)
+    if analyzed_only:
+        query = query.filter(Document.status == DocumentStatus.ANALYZED)
+
+    scored = [
+        (document, estimated_similarity(signature, _decode(stored)))
+        for document, stored in query
+    ]
+    scored.sort(key=lambda item: (-item[1], -item[0].id))
+    return scored[:limit]
+
+
+def stored_signature(db: Session, document_id: int) -> Optional[np.ndarray]:
+    row = db.get(DocumentSignature, document_id)
+    return _decode(row.signature) if row is not None else None
@@ -0,0 +1,127 @@
+"""
+Phrase rules matched on stems, so one rule covers every inflected form.
+
+The text is tokenized once into a compact array of stem ids. Only stems that
+occur in some rule get an id; every other word is 0. Candidate positions are
+the tokens whose id starts some phrase (one vectorized table lookup over the
+whole array); only those are checked against the rest of their phrases, and
+character offsets are computed only for documents with hits.
+
+Phrase syntax: words separated by spaces, each stemmed when the rule is
+compiled; ``a|b`` accepts either word at that position and ``~N`` allows up
+to N other words before the next one. Example: ``не подлежит|подлежат ~1 возврату``.
+"""
+
+import re
+from itertools import islice
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.russian_stemmer import stem
+
+_TOKEN = re.compile(r"\w+(?:-\w+)*")
+_GAP = re.compile(r"~(\d+)$")
+_WORD_CACHE_LIMIT = 500000
+
+# One phrase element: (accepted stem ids, extra words allowed before it)
+Element = Tuple[FrozenSet[int], int]
+
+
+def _normalize(word: str) -> str:
+    return stem(word.lower().replace("ё", "е"))
+
+
+class StemMatcher:
+    """Compiled phrase rules: ``rules`` are (risk level, rule dict with "id" and "phrases")"""
+
+    def __init__(self, rules: Sequence[Tuple[Any, Dict[str, Any]]]):
+        self.rules = list(rules)
+        self.vocabulary: Dict[str, int] = {}
+        self.phrases: Dict[int, List[Tuple[int, Tuple[Element, ...]]]] = {}  # first stem id -> (rule, rest)
+        for number, (_, info) in enumerate(self.rules):
+            for phrase in info["phrases"]:
+                elements = self._compile(phrase)
+                first, rest = elements[0], tuple(elements[1:])
+                for stem_id in first[0]:
+                    self.phrases.setdefault(stem_id, []).append((number, rest))
+
+        self.starts_phrase = np.zeros(len(self.vocabulary) + 1, dtype=bool)
+        self.starts_phrase[list(self.phrases)] = True
+        self._word_ids: Dict[str, int] = {}
+
+    def _compile(self, phrase: str) -> List[Element]:
+        elements: List[Element] = []
+        gap = 0
+        for part in phrase.split():
+            match = _GAP.match(part)
+            if match:
+                gap = int(match.group(1))
+                continue
+            stems = {_normalize(word) for word in part.split("|")}
+            ids = frozenset(self.vocabulary.setdefault(stem_text, len(self.vocabulary) + 1) for stem_text in stems)
+            elements.append((ids, gap))
+            gap = 0
+        if not elements:
+            raise ValueError(f"Empty phrase: {phrase!r}")
+        return elements
+
+    def _word_id(self, word: str) -> int:
+        word_ids = self._word_ids
+        stem_id = word_ids.get(word)
+        if stem_id is None:
+            if len(word_ids) >= _WORD_CACHE_LIMIT:
+                # Replaced, not cleared: documents analyzed in other threads may be reading it
+                word_ids = self._word_ids = {}
+            stem_id = word_ids[word] = self.vocabulary.get(_normalize(word), 0)
+        return stem_id
+
+    def stem_ids(self, content: str) -> np.ndarray:
+        """Stem id of every token of ``content`` (0 for stems no rule uses)"""
+        words = _TOKEN.findall(content)
+        cached = self._word_ids.get
+        ids = np.fromiter((cached(word, -1) for word in words), dtype=np.int32, count=len(words))
+        for position in np.flatnonzero(ids < 0).tolist():
+            ids[position] = self._word_id(words[position])
+        return ids
+
+    @staticmethod
+    def _match_rest(ids: np.ndarray, position: int, rest: Tuple[Element, ...]) -> Optional[int]:
+        """Index of the last token of the phrase starting at ``position``, if it matches"""
+        if not rest:
+            return position
+        (accepted, gap), remaining = rest[0], rest[1:]
+        for candidate in range(position + 1, min(position + 2 + gap, len(ids))):
+            if ids[candidate] in accepted:
+                last = StemMatcher._match_rest(ids, candidate, remaining)
+                if last is not None:
+                    return last
+        return None
+
+    def match(self, content: str, rule_ids: Optional[Set[str]] = None) -> List[Tuple[Any, Dict[str, Any], int, int]]:
+        """(level, rule, start, end) of every phrase occurrence, in text order"""
+        if not self.phrases:
+            return []
+        ids = self.stem_ids(content)
+        hits: List[Tuple[int, int, int]] = []
+        for position in np.flatnonzero(self.starts_phrase[ids]).tolist():
+            for number, rest in self.phrases[int(ids[position])]:
+                if rule_ids is not None and self.rules[number][1]["id"] not in rule_ids:
+                    continue
+                last = self._match_rest(ids, position, rest)
+                if last is not None:
+                    hits.append((position, last, number))
+        if not hits:
+            return []
+
+        # Character offsets of the tokens up to the last hit
+        spans = [match.span() for match in islice(_TOKEN.finditer(content), max(last for _, last, _ in hits) + 1)]
+        results = []
+        seen = set()
+        for first, last, number in hits:
+            if (first, last, number) in seen:
+                continue
+            seen.add((first, last, number))
+            level, info = self.rules[number]
+            results.append((level, info, spans[first][0], spans[last][1]))
+        return results
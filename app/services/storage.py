@@ -0,0 +1,272 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import update, delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import StoredFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+class StorageBackend:
+    """Content-addressed blob storage: blobs are stored once under their SHA-256"""
+
+    def put(self, source_path: str, digest: str) -> None:
+        """Move a local file into storage under ``digest`` (no-op if already stored)"""
+        raise NotImplementedError
+
+    def exists(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, digest: str) -> None:
+        raise NotImplementedError
+
+    def location(self, digest: str) -> str:
+        """Human-readable location recorded in Document.file_path"""
+        raise NotImplementedError
+
+    @contextmanager
+    def local_path(self, digest: str) -> Iterator[str]:
+        """Yield a path on the local filesystem with the blob's content"""
+        raise NotImplementedError
+
+    @staticmethod
+    def shard(digest: str) -> str:
+        # Two levels of 256 directories keep each directory small
+        return os.path.join(digest[:2], digest[2:4], digest)
+
+
+class LocalDiskStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, self.shard(digest))
+
+    def put(self, source_path: str, digest: str) -> None:
+        target = self._path(digest)
+        if os.path.exists(target):
+            os.remove(source_path)
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Stage next to the target so the final rename is atomic
+        staging = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.move(source_path, staging)
+            os.replace(staging, target)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def location(self, digest: str) -> str:
+        return self._path(digest)
+
+    @contextmanager
+    def local_path(self, digest: str) -> Iterator[str]:
+        yield self._path(digest)
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (AWS S3, MinIO, ...); requires boto3"""
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = ""):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, digest: str) -> str:
+        key = self.shard(digest).replace(os.sep, "/")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, source_path: str, digest: str) -> None:
+        if not self.exists(digest):
+            self.client.upload_file(source_path, self.bucket, self._key(digest))
+        os.remove(source_path)
+
+    def exists(self, digest: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, digest: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(digest))
+
+    def location(self, digest: str) -> str:
+        return f"s3://{self.bucket}/{self._key(digest)}"
+
+    @contextmanager
+    def local_path(self, digest: str) -> Iterator[str]:
+        handle, path = tempfile.mkstemp(dir=settings.upload_dir)
+        os.close(handle)
+        try:
+            self.client.download_file(self.bucket, self._key(digest), path)
+            yield path
+        finally:
+            os.remove(path)
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Storage backend selected by settings.storage_backend"""
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "local":
+            _storage = LocalDiskStorage(settings.storage_dir)
+        elif settings.storage_backend == "s3":
+            _storage = S3Storage(settings.s3_bucket, settings.s3_endpoint_url, settings.s3_prefix)
+        else:
+            raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+    return _storage
+
+
+async def stage_upload(upload, max_size: int) -> Tuple[str, str, int]:
+    """Stream an upload into a staging file while hashing it
+
+    Returns (staging path, SHA-256 hex digest, size). The staging file lives
+    in settings.upload_dir and is removed if the upload is rejected.
+    """
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    handle, path = tempfile.mkstemp(dir=settings.upload_dir, suffix=".upload")
+    try:
+        with os.fdopen(handle, "wb") as staging:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(f"File too large. Maximum size: {max_size} bytes")
+                digest.update(chunk)
+                staging.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def add_reference(db: Session, digest: str, size: int) -> None:
+    """Count one more Document referencing the blob (part of the caller's transaction)"""
+    for _ in range(2):
+        updated = db.execute(
+            update(StoredFile)
+            .where(StoredFile.sha256 == digest)
+            .values(ref_count=StoredFile.ref_count + 1, orphaned_at=None)
+        ).rowcount
+        if updated:
+            return
+        try:
+            with db.begin_nested():
+                db.add(StoredFile(sha256=digest, size=size, ref_count=1))
+            return
+        except IntegrityError:
+            # Inserted concurrently by another upload; retry the increment
+            continue
+    raise RuntimeError(f"Could not reference stored file {digest}")
+
+
+def record_orphan(db: Session, digest: str, size: int) -> None:
+    """Let collect_garbage reclaim a blob stored by a transaction that was rolled back
+
+    Uploads store the blob before committing its reference, so a failed commit
+    leaves a blob no row points to. A row with no references makes it
+    collectable; an existing row (referenced or already orphaned) is left as is.
+    """
+    try:
+        with db.begin_nested():
+            db.add(StoredFile(sha256=digest, size=size, ref_count=0, orphaned_at=datetime.now(timezone.utc)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    except Exception:
+        db.rollback()
+        logger.warning("Could not record orphaned blob %s", digest, exc_info=True)
+
+
+def release_reference(db: Session, digest: str) -> None:
+    """Drop one reference; blobs without references are removed by collect_garbage"""
+    db.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == digest, StoredFile.ref_count > 0)
+        .values(ref_count=StoredFile.ref_count - 1)
+    )
+    db.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == digest, StoredFile.ref_count == 0, StoredFile.orphaned_at.is_(None))
+        .values(orphaned_at=datetime.now(timezone.utc))
+    )
+
+
+def collect_garbage(db: Session, storage: StorageBackend, batch_size: int = 500, grace_seconds: int = 3600) -> int:
+    """Delete unreferenced blobs in batches; returns the number of blobs removed
+
+    Only blobs orphaned for longer than ``grace_seconds`` are collected, which
+    keeps a blob that is being re-uploaded right now from being deleted under it.
+    Each blob is deleted while its row deletion is still uncommitted: an upload
+    of the same content waits for that row (add_reference) before it stores the
+    blob, so it always finds the blob gone and writes it again.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    removed = 0
+    while True:
+        digests = db.execute(
+            select(StoredFile.sha256)
+            .where(StoredFile.ref_count == 0, StoredFile.orphaned_at < cutoff)
+            .limit(batch_size)
+        ).scalars().all()
+        if not digests:
+            return removed
+
+        claimed = 0
+        try:
+            for digest in digests:
+                # Conditional delete: skipped if the blob was referenced again meanwhile
+                deleted = db.execute(
+                    delete(StoredFile).where(StoredFile.sha256 == digest, StoredFile.ref_count == 0)
+                ).rowcount
+                if deleted:
+                    storage.delete(digest)
+                    claimed += 1
+            db.commit()
+        except Exception:
+            # Rows of blobs already deleted come back as orphans; deleting them again is a no-op
+            db.rollback()
+            raise
+        removed += claimed
+        if len(digests) < batch_size:
+            return removed
@@ -0,0 +1,440 @@
+"""
+Format detection by content and streaming text extractors for TXT, RTF and
+legacy Word (DOC) files.
+
+The format is taken from the first bytes of the file, not from its name
+(a ".doc" that is really plain text is read as text). Every extractor is a
+generator yielding text pieces while reading the file in CHUNK-sized blocks,
+so memory use does not depend on the file size (DOC streams are read from
+the OLE container by olefile, which holds one stream at a time).
+"""
+
+import codecs
+import re
+import struct
+from typing import Dict, Iterator, List, Optional
+
+CHUNK = 64 * 1024
+SNIFF_BYTES = 4096
+
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGIC = b"PK\x03\x04"
+RTF_MAGIC = b"{\\rtf"
+
+
+def detect_format(file_path: str) -> Optional[str]:
+    """".pdf", ".docx", ".doc", ".rtf" or ".txt" by magic bytes; None if not recognized"""
+    with open(file_path, "rb") as source:
+        head = source.read(SNIFF_BYTES)
+    if b"%PDF-" in head[:1024]:
+        return ".pdf"
+    if head.startswith(ZIP_MAGIC):
+        return ".docx"
+    if head.startswith(OLE_MAGIC):
+        return ".doc"
+    if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(RTF_MAGIC):
+        return ".rtf"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) or b"\x00" not in head:
+        return ".txt"
+    return None
+
+
+# Plain text ----------------------------------------------------------------
+
+_CYRILLIC_LOWER = re.compile("[а-яё]")
+_CYRILLIC_UPPER = re.compile("[А-ЯЁ]")
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Encoding of a text sample: BOM, UTF-8 if it decodes, else CP1251 or KOI8-R
+
+    The two Cyrillic single-byte encodings map lower and upper case letters
+    to each other's positions, so the one giving mostly lower-case letters
+    (as in real text) wins.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    best, best_score = "cp1251", None
+    for encoding in ("cp1251", "koi8-r"):
+        text = sample.decode(encoding, errors="replace")
+        score = len(_CYRILLIC_LOWER.findall(text)) - len(_CYRILLIC_UPPER.findall(text))
+        if best_score is None or score > best_score:
+            best, best_score = encoding, score
+    return best
+
+
+def iter_txt_text(file_path: str) -> Iterator[str]:
+    """Text of a plain-text file with line endings normalized to \\n"""
+    with open(file_path, "rb") as source:
+        sample = source.read(CHUNK)
+    encoding = detect_encoding(sample)
+    with open(file_path, encoding=encoding, errors="replace", newline=None) as source:
+        for piece in iter(lambda: source.read(CHUNK), ""):
+            yield piece
+
+
+# RTF -----------------------------------------------------------------------
+
+# Control words, hex escapes, control symbols, group braces, runs of text, binary data is handled separately
+_RTF_TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?"
+    rb"|\\'([0-9a-fA-F]{2})"
+    rb"|\\([^a-zA-Z'])"
+    rb"|([{}])"
+    rb"|([^\\{}\r\n]+)"
+    rb"|[\r\n]+",
+    re.DOTALL
+)
+# Destinations without document text
+_RTF_SKIP_DESTINATIONS = {
+    b"fonttbl", b"colortbl", b"stylesheet", b"info", b"pict", b"object", b"themedata", b"colorschememapping",
+    b"datastore", b"latentstyles", b"listtable", b"listoverridetable", b"rsidtbl", b"generator", b"xmlnstbl",
+    b"mmathPr", b"fldinst", b"filetbl", b"revtbl", b"userprops", b"wgrffmtfilter", b"pgdsctbl", b"bkmkstart",
+    b"bkmkend", b"footnote", b"header", b"footer", b"headerl", b"headerr", b"headerf", b"footerl", b"footerr",
+    b"footerf", b"nonshppict", b"blipuid", b"xe", b"tc",
+}
+_RTF_SPECIAL = {
+    b"par": "\n", b"line": "\n", b"sect": "\n", b"page": "\n", b"row": "\n", b"cell": "\t", b"tab": "\t",
+    b"emdash": "\u2014", b"endash": "\u2013", b"lquote": "\u2018", b"rquote": "\u2019",
+    b"ldblquote": "\u201c", b"rdblquote": "\u201d", b"bullet": "\u2022", b"emspace": "\u2003",
+    b"enspace": "\u2002", b"qmspace": "\u2005",
+}
+_RTF_SYMBOLS = {b"~": "\u00a0", b"_": "\u2011", b"-": "", b"\\": "\\", b"{": "{", b"}": "}", b"\n": "\n", b"\r": "\n"}
+# \fcharset values and their code pages
+_RTF_CHARSETS = {
+    0: "cp1252", 128: "cp932", 129: "cp949", 134: "gbk", 136: "big5", 161: "cp1253", 162: "cp1254",
+    163: "cp1258", 177: "cp1255", 178: "cp1256", 186: "cp1257", 204: "cp1251", 222: "cp874", 238: "cp1250",
+}
+
+
+class _RtfState:
+    __slots__ = ("skip", "uc", "codepage", "destination")
+
+    def __init__(self, skip=False, uc=1, codepage="cp1252", destination=None):
+        self.skip = skip
+        self.uc = uc
+        self.codepage = codepage
+        self.destination = destination
+
+    def copy(self) -> "_RtfState":
+        return _RtfState(self.skip, self.uc, self.codepage, self.destination)
+
+
+def _codepage(number: int) -> str:
+    name = f"cp{number}"
+    try:
+        codecs.lookup(name)
+        return name
+    except LookupError:
+        return "cp1252"
+
+
+class _RtfReader:
+    """Single-pass RTF tokenizer producing the visible text"""
+
+    def __init__(self):
+        self.state = _RtfState()
+        self.stack: List[_RtfState] = []
+        self.default_codepage = "cp1252"
+        self.fonts: Dict[int, str] = {}
+        self.font: Optional[int] = None
+        self.pending = bytearray()  # 8-bit text bytes not decoded yet
+        self.pending_raw = False  # pending bytes came as raw bytes, not \'xx escapes
+        self.fallback = 0  # characters still to skip after \uN
+        self.high_surrogate: Optional[int] = None  # first half of a \uN pair (characters beyond the BMP)
+        self.binary = 0  # bytes of \binN data still to skip
+        self.ignorable = False  # \* seen: the next destination is optional
+        self.out: List[str] = []
+
+    def _flush(self):
+        if not self.pending:
+            return
+        data = bytes(self.pending)
+        self.pending.clear()
+        if self.pending_raw:
+            # Raw 8-bit bytes are not valid RTF, but writers emit UTF-8 this way
+            try:
+                self.out.append(data.decode("utf-8"))
+                return
+            except UnicodeDecodeError:
+                pass
+        self.out.append(data.decode(self.state.codepage, errors="replace"))
+
+    def _unpaired_surrogate(self):
+        if self.high_surrogate is not None:
+            self.high_surrogate = None
+            self.out.append("\ufffd")
+
+    def _emit(self, text: str):
+        self._flush()
+        self._unpaired_surrogate()
+        self.out.append(text)
+
+    def _emit_unicode(self, code: int):
+        if 0xD800 <= code < 0xDC00:
+            self._flush()
+            self._unpaired_surrogate()
+            self.high_surrogate = code
+        elif 0xDC00 <= code < 0xE000:
+            if self.high_surrogate is None:
+                self._emit("\ufffd")
+            else:
+                high, self.high_surrogate = self.high_surrogate, None
+                self._emit(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._emit(chr(code))
+
+    def _add_bytes(self, data: bytes, raw: bool):
+        if self.fallback:
+            dropped = min(self.fallback, len(data))
+            self.fallback -= dropped
+            data = data[dropped:]
+            if not data:
+                return
+        self._unpaired_surrogate()
+        if self.pending and self.pending_raw != raw:
+            self._flush()
+        self.pending_raw = raw
+        self.pending.extend(data)
+
+    def _control(self, word: bytes, parameter: Optional[int]):
+        state = self.state
+        if self.ignorable:
+            self.ignorable = False
+            if word not in _RTF_SPECIAL and word not in (b"u", b"uc", b"f", b"fcharset"):
+                state.skip = True
+                state.destination = word
+                return
+        if word in _RTF_SKIP_DESTINATIONS:
+            self._flush()
+            state.skip = True
+            state.destination = word
+            return
+        if state.destination == b"fonttbl":
+            # Font table: remember the code page of every font
+            if word == b"f" and parameter is not None:
+                self.font = parameter
+            elif word == b"fcharset" and parameter is not None and self.font is not None:
+                self.fonts[self.font] = _RTF_CHARSETS.get(parameter, self.default_codepage)
+            elif word == b"cpg" and parameter is not None and self.font is not None:
+                self.fonts[self.font] = _codepage(parameter)
+            return
+        if word == b"bin" and parameter:
+            self.binary = parameter
+            return
+        if state.skip:
+            return
+        if self.fallback:
+            self.fallback -= 1
+            return
+        if word == b"ansicpg" and parameter is not None:
+            self.default_codepage = state.codepage = _codepage(parameter)
+        elif word in (b"mac", b"pc", b"pca"):
+            self.default_codepage = state.codepage = {b"mac": "mac_roman", b"pc": "cp437", b"pca": "cp850"}[word]
+        elif word == b"f" and parameter is not None:
+            self._flush()
+            state.codepage = self.fonts.get(parameter, self.default_codepage)
+        elif word == b"uc" and parameter is not None:
+            state.uc = parameter
+        elif word == b"u" and parameter is not None:
+            # Word writes characters beyond the BMP as two \uN (a surrogate pair)
+            self._emit_unicode(parameter + 65536 if parameter < 0 else parameter)
+            self.fallback = state.uc
+        elif word in _RTF_SPECIAL:
+            self._emit(_RTF_SPECIAL[word])
+
+    def feed(self, buffer: bytes, final: bool) -> int:
+        """Consume complete tokens of ``buffer``; returns how many bytes were used"""
+        position = 0
+        length = len(buffer)
+        while position < length:
+            if self.binary:
+                skipped = min(self.binary, length - position)
+                self.binary -= skipped
+                position += skipped
+                continue
+            if not final and length - position < 48 and b"\\" in buffer[position:]:
+                break  # a control word may continue in the next block
+            match = _RTF_TOKEN.match(buffer, position)
+            if match is None:
+                position += 1
+                continue
+            if not final and match.end() == length and match.group(1) is not None:
+                break  # the control word or its parameter may be cut
+            position = match.end()
+            word, parameter, hex_byte, symbol, brace, text = match.groups()
+            if word is not None:
+                self._control(word, int(parameter) if parameter is not None else None)
+            elif hex_byte is not None:
+                if not self.state.skip:
+                    self._add_bytes(bytes((int(hex_byte, 16),)), raw=False)
+            elif symbol is not None:
+                if symbol == b"*":
+                    self.ignorable = True
+                elif not self.state.skip and symbol in _RTF_SYMBOLS:
+                    if self.fallback:
+                        self.fallback -= 1
+                    else:
+                        self._emit(_RTF_SYMBOLS[symbol])
+            elif brace == b"{":
+                self._flush()
+                self.stack.append(self.state)
+                self.state = self.state.copy()
+            elif brace == b"}":
+                self._flush()
+                if self.stack:
+                    self.state = self.stack.pop()
+                self.ignorable = False
+            elif text is not None:
+                if not self.state.skip:
+                    self._add_bytes(text, raw=True)
+        return position
+
+    def take(self, final: bool) -> str:
+        """Text decoded so far; raw bytes are kept back, a UTF-8 character may continue"""
+        if final or not self.pending_raw:
+            self._flush()
+            if final:
+                self._unpaired_surrogate()
+        elif len(self.pending) > CHUNK:
+            # Keep back the last character from its lead byte on: a cut between
+            # a lead byte and its continuation bytes would make the whole block
+            # fall back to the code page
+            cut = len(self.pending) - 1
+            while cut > len(self.pending) - 4 and self.pending[cut] & 0xC0 == 0x80:
+                cut -= 1
+            tail = bytes(self.pending[cut:])
+            del self.pending[cut:]
+            self._flush()
+            self.pending.extend(tail)
+        text = "".join(self.out)
+        self.out.clear()
+        return text
+
+
+def iter_rtf_text(file_path: str) -> Iterator[str]:
+    """Visible text of an RTF file (\\'xx escapes, \\uN and font code pages decoded)"""
+    reader = _RtfReader()
+    buffer = b""
+    with open(file_path, "rb") as source:
+        while True:
+            block = source.read(CHUNK)
+            final = not block
+            buffer += block
+            used = reader.feed(buffer, final)
+            buffer = buffer[used:]
+            text = reader.take(final)
+            if text:
+                yield text
+            if final:
+                break
+
+
+# Legacy Word (OLE compound file) -------------------------------------------
+
+_FIB_IDENT = 0xA5EC
+_FIB_FLAGS = 0x0A
+_F_ENCRYPTED = 0x0100
+_F_WHICH_TABLE = 0x0200
+_FC_CLX_INDEX = 33  # fcClx/lcbClx pair in FibRgFcLcb97
+
+# Word control characters in document text
+_DOC_TRANSLATE = {
+    0x0D: "\n", 0x0B: "\n", 0x0C: "\n", 0x0E: "\n", 0x07: "\t",
+    0x1E: "-", 0x1F: "", 0x01: "", 0x02: "", 0x05: "", 0x08: "",
+}
+_FIELD_BEGIN, _FIELD_SEPARATOR, _FIELD_END = "\x13", "\x14", "\x15"
+
+
+def _piece_table(word_document: bytes, table: bytes):
+    """(text length in characters, [(cp_start, cp_end, fc, compressed)]) from the FIB and the Clx"""
+    ident, = struct.unpack_from("<H", word_document, 0)
+    if ident != _FIB_IDENT:
+        raise ValueError("Not a Word 97-2003 document")
+    position = 32
+    csw, = struct.unpack_from("<H", word_document, position)
+    position += 2 + csw * 2
+    cslw, = struct.unpack_from("<H", word_document, position)
+    fib_rg_lw = position + 2
+    ccp_text, = struct.unpack_from("<i", word_document, fib_rg_lw + 12)
+    position = fib_rg_lw + cslw * 4
+    fc_clx, lcb_clx = struct.unpack_from("<II", word_document, position + 2 + _FC_CLX_INDEX * 8)
+
+    clx = table[fc_clx:fc_clx + lcb_clx]
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:  # Prc: property modifiers, not needed
+        size, = struct.unpack_from("<h", clx, position + 1)
+        position += 3 + size
+    if position >= len(clx) or clx[position] != 0x02:
+        raise ValueError("Word document has no piece table")
+    lcb, = struct.unpack_from("<I", clx, position + 1)
+    plc = clx[position + 5:position + 5 + lcb]
+    count = (lcb - 4) // 12
+    cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+    pieces = []
+    for number in range(count):
+        fc, = struct.unpack_from("<I", plc, (count + 1) * 4 + number * 8 + 2)
+        compressed = bool(fc & 0x40000000)
+        fc &= 0x3FFFFFFF
+        pieces.append((cps[number], cps[number + 1], fc // 2 if compressed else fc, compressed))
+    return ccp_text, pieces
+
+
+def iter_doc_text(file_path: str) -> Iterator[str]:
+    """Main document text of a Word 97-2003 file, read piece by piece through the piece table"""
+    import olefile
+
+    from app.services.document_processor import ExtractionError
+
+    with olefile.OleFileIO(file_path) as ole:
+        if not ole.exists("WordDocument"):
+            raise ValueError("OLE file is not a Word document")
+        word_document = ole.openstream("WordDocument").read()
+        flags, = struct.unpack_from("<H", word_document, _FIB_FLAGS)
+        if flags & _F_ENCRYPTED:
+            raise ExtractionError("encrypted", "Word document is password-protected")
+        table_name = "1Table" if flags & _F_WHICH_TABLE else "0Table"
+        if not ole.exists(table_name):
+            raise ValueError(f"Word document has no {table_name} stream")
+        text_length, pieces = _piece_table(word_document, ole.openstream(table_name).read())
+
+    field_depth = 0
+    hidden_depth = 0  # depth of the field whose instructions are being skipped
+    for cp_start, cp_end, fc, compressed in pieces:
+        if cp_start >= text_length:
+            break
+        characters = min(cp_end, text_length) - cp_start
+        for offset in range(0, characters, CHUNK):
+            count = min(CHUNK, characters - offset)
+            if compressed:
+                raw = word_document[fc + offset:fc + offset + count]
+                text = raw.decode("cp1252", errors="replace")
+            else:
+                raw = word_document[fc + offset * 2:fc + (offset + count) * 2]
+                text = raw.decode("utf-16-le", errors="replace")
+            if _FIELD_BEGIN in text or _FIELD_SEPARATOR in text or _FIELD_END in text or hidden_depth:
+                # Fields: keep the displayed result, drop the instructions (begin .. separator)
+                visible = []
+                for character in text:
+                    if character == _FIELD_BEGIN:
+                        field_depth += 1
+                        if not hidden_depth:
+                            hidden_depth = field_depth
+                    elif character == _FIELD_SEPARATOR:
+                        if hidden_depth == field_depth:
+                            hidden_depth = 0
+                    elif character == _FIELD_END:
+                        if hidden_depth == field_depth:
+                            hidden_depth = 0
+                        field_depth = max(field_depth - 1, 0)
+                    elif not hidden_depth:
+                        visible.append(character)
+                text = "".join(visible)
+            yield text.translate(_DOC_TRANSLATE)
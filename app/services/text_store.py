@@ -0,0 +1,126 @@
+"""
+Extracted text of every document as a UTF-8 file plus a sparse offset index.
+
+``<id>.txt`` holds the text, ``<id>.idx`` the byte offset of every
+settings.text_index_step-th character. A character position is translated to
+a byte offset with one index lookup and a decode of at most one step of
+bytes, so any window of a huge document is read from the memory-mapped file
+without loading the rest of it.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+_MAGIC = b"TXI1"
+_HEADER = struct.Struct("<4sIQ")  # magic, step, character count; then little-endian uint64 offsets
+
+
+class TextStore:
+    def __init__(self, root: str, step: int):
+        self.root = root
+        self.step = step
+
+    def _paths(self, document_id: int) -> Tuple[str, str]:
+        base = os.path.join(self.root, str(document_id // 1000), str(document_id))
+        return f"{base}.txt", f"{base}.idx"
+
+    def exists(self, document_id: int) -> bool:
+        return all(os.path.exists(path) for path in self._paths(document_id))
+
+    def write(self, document_id: int, content: str) -> None:
+        """Store ``content``, replacing earlier text of the document atomically"""
+        text_path, index_path = self._paths(document_id)
+        directory = os.path.dirname(text_path)
+        os.makedirs(directory, exist_ok=True)
+
+        offsets = array("Q")
+        position = 0
+        handle, text_staging = tempfile.mkstemp(dir=directory, suffix=".txt.tmp")
+        with os.fdopen(handle, "wb") as text_file:
+            for start in range(0, len(content), self.step):
+                offsets.append(position)
+                chunk = content[start:start + self.step].encode("utf-8")
+                text_file.write(chunk)
+                position += len(chunk)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        handle, index_staging = tempfile.mkstemp(dir=directory, suffix=".idx.tmp")
+        with os.fdopen(handle, "wb") as index_file:
+            index_file.write(_HEADER.pack(_MAGIC, self.step, len(content)))
+            index_file.write(offsets.tobytes())
+
+        # Index last: a reader never sees an index without its text
+        os.replace(text_staging, text_path)
+        os.replace(index_staging, index_path)
+
+    def delete(self, document_id: int) -> None:
+        for path in self._paths(document_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def open(self, document_id: int) -> Optional["MappedText"]:
+        text_path, index_path = self._paths(document_id)
+        if not (os.path.exists(text_path) and os.path.exists(index_path)):
+            return None
+        return MappedText(text_path, index_path)
+
+
+class MappedText:
+    """Read-only, memory-mapped view of one stored text; use as a context manager"""
+
+    def __init__(self, text_path: str, index_path: str):
+        with open(index_path, "rb") as index_file:
+            magic, self.step, self.length = _HEADER.unpack(index_file.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Not a text index: {index_path}")
+            self.offsets = array("Q")
+            self.offsets.frombytes(index_file.read())
+        if sys.byteorder != "little":
+            self.offsets.byteswap()
+
+        self._file = open(text_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._view = memoryview(self._map)
+
+    def byte_offset(self, position: int) -> int:
+        """Byte offset of character ``position`` (0 <= position <= length)"""
+        if position >= self.length:
+            return self.size
+        block, remainder = divmod(position, self.step)
+        start = self.offsets[block]
+        if not remainder:
+            return start
+        # A character takes at most 4 bytes; a cut multi-byte tail is ignored
+        prefix = str(self._view[start:min(start + 4 * remainder, self.size)], "utf-8", "ignore")[:remainder]
+        return start + len(prefix.encode("utf-8"))
+
+    def slice(self, start: int, end: int) -> str:
+        """Characters [start, end) clamped to the text"""
+        start = max(0, min(start, self.length))
+        end = max(start, min(end, self.length))
+        return str(self._view[self.byte_offset(start):self.byte_offset(end)], "utf-8")
+
+    def close(self):
+        self._view.release()
+        if self.size:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "MappedText":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+text_store = TextStore(settings.text_store_dir, settings.text_index_step)
@@ -0,0 +1,357 @@
+import difflib
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.models.document import RiskLevel
+
+# Regions without unique anchors fall back to difflib only while it stays cheap
+SMALL_REGION = 250_000
+
+_WORD = re.compile(r"\S+")
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _unique_positions(items: Sequence[Hashable], lo: int, hi: int) -> Dict[Hashable, int]:
+    positions: Dict[Hashable, int] = {}
+    duplicates = set()
+    for index in range(lo, hi):
+        item = items[index]
+        if item in positions:
+            duplicates.add(item)
+        else:
+            positions[item] = index
+    for item in duplicates:
+        del positions[item]
+    return positions
+
+
+def _longest_increasing(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Longest subsequence of (i, j) pairs (sorted by i) increasing in j: patience sorting"""
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous: List[int] = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+        previous[index] = tail_index[pile - 1] if pile else -1
+
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index != -1:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def patience_matches(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Tuple[int, int]]:
+    """Matching (i, j) index pairs of two sequences using patience diff
+
+    Lines unique in both regions anchor the alignment and the gaps between
+    anchors are diffed recursively, which keeps the cost near O(n log n) for
+    long documents instead of the quadratic worst case of difflib.
+    """
+    matches: List[Tuple[int, int]] = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        unique_a = _unique_positions(a, alo, ahi)
+        unique_b = _unique_positions(b, blo, bhi)
+        candidates = sorted((i, unique_b[item]) for item, i in unique_a.items() if item in unique_b)
+        anchors = _longest_increasing(candidates)
+
+        if anchors:
+            previous_i, previous_j = alo, blo
+            for i, j in anchors:
+                matches.append((i, j))
+                regions.append((previous_i, i, previous_j, j))
+                previous_i, previous_j = i + 1, j + 1
+            regions.append((previous_i, ahi, previous_j, bhi))
+        elif (ahi - alo) * (bhi - blo) <= SMALL_REGION:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(size))
+
+    matches.sort()
+    return matches
+
+
+def patience_opcodes(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """difflib-style opcodes ("equal", "replace", "delete", "insert") from patience_matches"""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for match_i, match_j in patience_matches(a, b) + [(len(a), len(b))]:
+        if i < match_i or j < match_j:
+            tag = "replace" if i < match_i and j < match_j else ("delete" if i < match_i else "insert")
+            opcodes.append((tag, i, match_i, j, match_j))
+        if match_i < len(a):
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = (tag, i1, match_i + 1, j1, match_j + 1)
+            else:
+                opcodes.append(("equal", match_i, match_i + 1, match_j, match_j + 1))
+        i, j = match_i + 1, match_j + 1
+    return opcodes
+
+
+class ParagraphIndex:
+    """Paragraphs (lines) of a document with their character offsets
+
+    Paragraph texts are interned to integers so the diff compares ints, not strings.
+    """
+
+    def __init__(self, text: str, interned: Dict[str, int]):
+        self.text = text
+        self.paragraphs = text.split("\n")
+        self.starts: List[int] = []
+        offset = 0
+        for paragraph in self.paragraphs:
+            self.starts.append(offset)
+            offset += len(paragraph) + 1
+        self.ids = [interned.setdefault(paragraph, len(interned)) for paragraph in self.paragraphs]
+
+    def __len__(self) -> int:
+        return len(self.paragraphs)
+
+    def start(self, paragraph: int) -> int:
+        return self.starts[paragraph] if paragraph < len(self.starts) else len(self.text)
+
+    def end(self, paragraph: int) -> int:
+        """End offset (exclusive, before the newline) of the paragraph before ``paragraph``"""
+        return self.starts[paragraph - 1] + len(self.paragraphs[paragraph - 1]) if paragraph else 0
+
+    def paragraph_at(self, position: int) -> int:
+        return max(0, bisect_left(self.starts, position + 1) - 1)
+
+
+def diff_paragraphs(base_text: str, new_text: str) -> Tuple[ParagraphIndex, ParagraphIndex, List[Opcode]]:
+    interned: Dict[str, int] = {}
+    base = ParagraphIndex(base_text, interned)
+    new = ParagraphIndex(new_text, interned)
+    return base, new, patience_opcodes(base.ids, new.ids)
+
+
+def diff_words(base_text: str, new_text: str) -> List[Dict[str, str]]:
+    """Word-level changes between two paragraphs (equal runs omitted)"""
+    base_words = _WORD.findall(base_text)
+    new_words = _WORD.findall(new_text)
+    return [
+        {"op": tag, "base": " ".join(base_words[i1:i2]), "new": " ".join(new_words[j1:j2])}
+        for tag, i1, i2, j1, j2 in patience_opcodes(base_words, new_words)
+        if tag != "equal"
+    ]
+
+
+def _shift_map(opcodes: List[Opcode], base: ParagraphIndex, new: ParagraphIndex) -> List[Tuple[int, int, int]]:
+    """(base start, base end, offset) of every unchanged region"""
+    return [
+        (base.start(i1), base.end(i2), new.start(j1) - base.start(i1))
+        for tag, i1, i2, j1, j2 in opcodes
+        if tag == "equal"
+    ]
+
+
+def _map_position(shifts: List[Tuple[int, int, int]], start: int, end: int) -> Optional[int]:
+    """Offset moving a base span into the new text, or None if the span was changed"""
+    index = bisect_left(shifts, (start + 1,)) - 1
+    if index >= 0:
+        region_start, region_end, offset = shifts[index]
+        if region_start <= start and end <= region_end:
+            return offset
+    return None
+
+
+def _changed_windows(opcodes: List[Opcode], new: ParagraphIndex) -> List[Tuple[int, int]]:
+    """Character ranges of the new text that must be rescanned
+
+    Each changed region is widened by one paragraph on both sides so matches
+    spanning a paragraph break next to an edit are found again.
+    """
+    windows: List[Tuple[int, int]] = []
+    for tag, _, _, j1, j2 in opcodes:
+        if tag == "equal":
+            continue
+        start = new.start(max(0, j1 - 1))
+        end = new.end(min(len(new), j2 + 1))
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def reanalyze_changes(analyzer, base_text: str, base_risks: List[Dict[str, Any]], new_text: str,
+                      rule_timings: Optional[Dict[str, Dict[str, float]]] = None,
+                      contract_type: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """Analyze a new version of a document, rescanning only what changed
+
+    Risks of the base version inside unchanged paragraphs are reused with
+    shifted positions; changed paragraphs are scanned by ``analyzer`` with the
+    rules of ``contract_type`` (the base must have been analyzed with the same).
+    Returns the risks and the number of characters actually scanned.
+    """
+    base, new, opcodes = diff_paragraphs(base_text, new_text)
+    shifts = _shift_map(opcodes, base, new)
+    windows = _changed_windows(opcodes, new)
+
+    risks = []
+    for risk in base_risks:
+        offset = _map_position(shifts, risk["start_position"], risk["end_position"])
+        if offset is None:
+            continue
+        start, end = risk["start_position"] + offset, risk["end_position"] + offset
+        if any(start < window_end and window_start < end for window_start, window_end in windows):
+            continue
+        risks.append(dict(risk, start_position=start, end_position=end))
+
+    scanned = 0
+    for window_start, window_end in windows:
+        scanned += window_end - window_start
+        for risk in analyzer.analyze_document(new_text[window_start:window_end], rule_timings=rule_timings, score=False,
+                                              contract_type=contract_type):
+            risk["start_position"] += window_start
+            risk["end_position"] += window_start
+            risks.append(risk)
+
+    risks = analyzer._remove_duplicates(risks)
+    risks.sort(key=lambda x: x["start_position"])
+    # Scoring needs the whole document (position, section), so it runs once at the end
+    analyzer.score_confidence(new_text, risks)
+    return risks, scanned
+
+
+def _risk_key(risk: Dict[str, Any]) -> Tuple[str, str]:
+    return risk["rule_id"], " ".join(risk["text"].lower().split())
+
+
+def _block_of(opcodes: List[Opcode], paragraph: int, side: int) -> int:
+    for index, opcode in enumerate(opcodes):
+        lo, hi = opcode[1 + 2 * side], opcode[2 + 2 * side]
+        if lo <= paragraph < hi or (lo == hi == paragraph):
+            return index
+    return len(opcodes)
+
+
+def compare_versions(base_text: str, base_risks: List[Dict[str, Any]],
+                     new_text: str, new_risks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Paragraph/word diff of two versions and the delta of their risks
+
+    A risk is "unchanged" when the same rule matched the same text at the
+    position the diff maps it to, "moved" when it is found elsewhere in the new
+    version, and otherwise "added" or "removed".
+    """
+    base, new, opcodes = diff_paragraphs(base_text, new_text)
+    shifts = _shift_map(opcodes, base, new)
+
+    changes = []
+    stats = {"equal": 0, "replace": 0, "delete": 0, "insert": 0}
+    for tag, i1, i2, j1, j2 in opcodes:
+        stats[tag] += max(i2 - i1, j2 - j1)
+        if tag == "equal":
+            continue
+        change = {
+            "op": tag,
+            "base_paragraphs": [i1, i2],
+            "new_paragraphs": [j1, j2],
+            "base_text": "\n".join(base.paragraphs[i1:i2]),
+            "new_text": "\n".join(new.paragraphs[j1:j2]),
+            "words": [],
+        }
+        if tag == "replace":
+            change["words"] = diff_words(change["base_text"], change["new_text"])
+        changes.append(change)
+
+    remaining_new: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for risk in new_risks:
+        remaining_new.setdefault(_risk_key(risk), []).append(risk)
+
+    delta = {"added": [], "removed": [], "moved": [], "unchanged": []}
+    unmatched_base = []
+    for risk in base_risks:
+        candidates = remaining_new.get(_risk_key(risk), [])
+        offset = _map_position(shifts, risk["start_position"], risk["end_position"])
+        same = next((c for c in candidates if offset is not None and c["start_position"] == risk["start_position"] + offset), None)
+        if same is not None:
+            candidates.remove(same)
+            delta["unchanged"].append(_delta_entry(risk, risk, same))
+        else:
+            unmatched_base.append(risk)
+
+    for risk in unmatched_base:
+        candidates = remaining_new.get(_risk_key(risk), [])
+        if not candidates:
+            delta["removed"].append(_delta_entry(risk, risk, None))
+            continue
+        match = candidates.pop(0)
+        base_block = _block_of(opcodes, base.paragraph_at(risk["start_position"]), 0)
+        new_block = _block_of(opcodes, new.paragraph_at(match["start_position"]), 1)
+        delta["moved" if base_block != new_block else "unchanged"].append(_delta_entry(risk, risk, match))
+
+    for candidates in remaining_new.values():
+        for risk in candidates:
+            delta["added"].append(_delta_entry(risk, None, risk))
+
+    for entries in delta.values():
+        entries.sort(key=lambda entry: (entry["new_position"] is None, entry["new_position"] or entry["base_position"] or 0))
+
+    return {
+        "paragraphs": stats,
+        "changes": changes,
+        "risks": delta,
+    }
+
+
+def _delta_entry(risk: Dict[str, Any], base_risk: Optional[Dict[str, Any]], new_risk: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    level = risk["level"]
+    return {
+        "rule_id": risk["rule_id"],
+        "risk_level": level.value if isinstance(level, RiskLevel) else level,
+        "text_fragment": risk["text"],
+        "explanation": risk["explanation"],
+        "base_position": base_risk["start_position"] if base_risk else None,
+        "new_position": new_risk["start_position"] if new_risk else None,
+    }
+
+
+def risks_from_results(analyzer, results, require_positions: bool = True) -> Optional[List[Dict[str, Any]]]:
+    """Analyzer-style risk dicts from stored AnalysisResults
+
+    Returns None if ``require_positions`` is set and a result has no position
+    (such results cannot be reused by reanalyze_changes).
+    """
+    risks = []
+    for result in results:
+        if result.start_position is None or result.end_position is None:
+            if require_positions:
+                return None
+            continue
+        risks.append({
+            "rule_id": result.rule_id or analyzer.rule_id_for(result.explanation),
+            "level": result.risk_level,
+            "text": result.text_fragment,
+            "explanation": result.explanation,
+            "start_position": result.start_position,
+            "end_position": result.end_position,
+            "confidence": result.confidence_score or 0,
+        })
+    risks.sort(key=lambda x: x["start_position"])
+    return risks
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from app.services.ai_analyzer import get_analyzer
+from app.services.document_processor import DocumentProcessor
+from app.services.risk_scorer import get_risk_scorer
+from app.services.clause_index import get_clause_index
+
+
+class WarmupState:
+    """Progress of the background warm-up, consulted by the readiness probe"""
+
+    def __init__(self):
+        self.enabled = False
+        self.completed = False
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return not self.enabled or self.completed
+
+    def as_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "completed": self.completed,
+            "error": self.error,
+            "duration": self.duration,
+        }
+
+
+warmup_state = WarmupState()
+
+# Steps run in order; heavier stages (ML models) append their own loaders here.
+warmup_steps: List[Callable[[], None]] = [
+    get_analyzer,
+    get_risk_scorer,
+    get_clause_index,
+    DocumentProcessor.preload_backends,
+]
+
+
+def register_warmup_step(step: Callable[[], None]) -> Callable[[], None]:
+    """Add a preload step; usable as a decorator"""
+    warmup_steps.append(step)
+    return step
+
+
+def run_warmup():
+    """Run all warm-up steps in the current thread"""
+    started = time.perf_counter()
+    try:
+        for step in warmup_steps:
+            step()
+        warmup_state.completed = True
+    except Exception as e:
+        warmup_state.error = str(e)
+    finally:
+        warmup_state.duration = time.perf_counter() - started
+
+
+def start_warmup() -> threading.Thread:
+    """Preload compiled rules and extraction backends without blocking startup"""
+    warmup_state.enabled = True
+    thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+    thread.start()
+    return thread
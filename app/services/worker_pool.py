@@ -0,0 +1,162 @@
+"""
+Analyzer workers forked from a warmed-up parent.
+
+A spawned worker imports the application and rebuilds the analyzer state on
+its own: compiled rule scanners and stem tables, the risk scorer model, the
+clause index and the extraction backends. Every worker pays for that, and pays
+again each time it is recycled. ``warm_executor`` instead runs the warm-up
+steps (app.services.warmup, where future model loaders register) once in the
+calling process and forks the workers from it, so they start ready and share
+the loaded state copy-on-write:
+
+- numpy arrays of at least SHARE_MIN_BYTES held by that state are moved into
+  a shared anonymous mapping and made read-only, so they exist once however
+  many workers run and a stray write fails instead of copying the pages
+  (arrays memory-mapped from files, like the clause index, already are);
+- gc.freeze() moves the loaded objects out of the collector's reach; otherwise
+  the first collection in every worker writes to their headers and turns the
+  shared pages into private copies.
+
+Forking is only safe from a process without other threads, so this is meant
+for the batch CLI, not the API (whose extraction sandbox keeps "spawn").
+Database connections inherited from the parent are disowned in the workers.
+"""
+
+import gc
+import logging
+import mmap
+import multiprocessing
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHARE_MIN_BYTES = 1024 * 1024
+
+
+def fork_available() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _shared_copy(array: np.ndarray) -> np.ndarray:
+    """Read-only copy of ``array`` in a MAP_SHARED anonymous mapping"""
+    buffer = mmap.mmap(-1, max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=buffer)
+    shared[...] = array
+    shared.flags.writeable = False
+    return shared
+
+
+def share_arrays(state: Any, min_bytes: int = SHARE_MIN_BYTES) -> int:
+    """Move the large numpy arrays reachable from ``state`` into shared memory; bytes moved
+
+    Follows object attributes, dicts and lists (e.g. a scikit-learn pipeline
+    and its steps). Views and memory-mapped arrays are left alone.
+    """
+    moved = 0
+    seen = set()
+    pending = [state]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, dict):
+            container, keys = current, list(current)
+        elif isinstance(current, list):
+            container, keys = current, range(len(current))
+        elif isinstance(current, tuple):
+            pending.extend(current)
+            continue
+        elif hasattr(current, "__dict__") and not isinstance(current, (type, types.ModuleType)):
+            container, keys = vars(current), list(vars(current))
+        else:
+            continue
+        for key in keys:
+            value = container[key]
+            if isinstance(value, np.ndarray):
+                if value.nbytes >= min_bytes and value.flags.owndata and value.dtype != object:
+                    container[key] = _shared_copy(value)
+                    moved += value.nbytes
+            elif isinstance(value, (dict, list, tuple)) or hasattr(value, "__dict__"):
+                pending.append(value)
+    return moved
+
+
+class PreloadedState:
+    """Result of the one-time preload in the parent"""
+
+    def __init__(self):
+        self.loaded = False
+        self.seconds: Optional[float] = None
+        self.shared_bytes = 0
+
+    def as_dict(self) -> Dict:
+        return {"loaded": self.loaded, "seconds": self.seconds, "shared_bytes": self.shared_bytes}
+
+
+preloaded = PreloadedState()
+_preload_lock = threading.Lock()
+
+
+def preload_state() -> PreloadedState:
+    """Run the warm-up steps in this process, share their arrays and freeze the heap (once)"""
+    from app.services.warmup import warmup_steps
+
+    with _preload_lock:
+        if preloaded.loaded:
+            return preloaded
+        started = time.perf_counter()
+        for step in warmup_steps:
+            state = step()
+            if state is not None:
+                preloaded.shared_bytes += share_arrays(state)
+        gc.collect()
+        gc.freeze()
+        preloaded.seconds = time.perf_counter() - started
+        preloaded.loaded = True
+        logger.info("Preloaded worker state in %.2fs (%d bytes of arrays shared)",
+                    preloaded.seconds, preloaded.shared_bytes)
+        return preloaded
+
+
+def _disown_connections():
+    """Forget database connections inherited from the parent without closing them"""
+    database = sys.modules.get("app.database")
+    if database is not None:
+        database.engine.dispose(close=False)
+        for replica in database.read_replicas.engines:
+            replica.dispose(close=False)
+
+
+def _init_forked_worker(initializer: Optional[Callable], initargs: tuple):
+    _disown_connections()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def warm_executor(max_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """Process pool forked from this process after preload_state()
+
+    Falls back to cold "spawn" workers where fork is not available.
+    """
+    if not fork_available():
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs
+        )
+    preload_state()
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_forked_worker,
+        initargs=(initializer, initargs)
+    )
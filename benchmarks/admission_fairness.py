@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Fairness check of upload processing (app.services.admission).
+
+Runs the API in-process against a temporary SQLite database. User A uploads
+--heavy-uploads large TXT contracts at once; shortly after, user B uploads one
+small contract while /health is polled. Processing runs outside the event loop
+on settings.processing_slots slots handed out round-robin per user, so B's
+upload must finish before A's last one and /health must stay responsive.
+Fails (exit code 1) otherwise.
+
+Usage: python benchmarks/admission_fairness.py [--heavy-uploads 4] [--heavy-mb 4] [--max-health-ms 500]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+SAMPLE = os.path.join(BASE_DIR, "test_document.txt")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-uploads", type=int, default=4, help="uploads of user A, sent at once")
+    parser.add_argument("--heavy-mb", type=float, default=4.0, help="size of each of user A's documents")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before user B uploads")
+    parser.add_argument("--max-health-ms", type=float, default=500.0, help="budget of the slowest /health call")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="admission-fairness-")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'fairness.db')}",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "UPLOAD_DIR": os.path.join(scratch, "uploads"),
+        "STORAGE_DIR": os.path.join(scratch, "storage"),
+        "TEXT_STORE_DIR": os.path.join(scratch, "texts"),
+        "PROFILE_DIR": os.path.join(scratch, "profiles"),
+        "MAX_FILE_SIZE": str(int(args.heavy_mb * 1024 * 1024) + 1024 * 1024),
+    })
+    from fastapi.testclient import TestClient
+
+    import main as api
+    from app.core.config import settings
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with open(SAMPLE, "rb") as sample_file:
+        sample = sample_file.read()
+    heavy = sample * max(1, int(args.heavy_mb * 1024 * 1024 / len(sample)))
+
+    finished = {}
+    health = []
+    try:
+        with TestClient(api.app) as client:
+            headers = {}
+            for user in ("a", "b"):
+                credentials = {"email": f"{user}@example.com", "password": "fairness-check"}
+                client.post("/auth/register", json={**credentials, "full_name": user.upper()})
+                token = client.post("/auth/login", json=credentials).json()["access_token"]
+                headers[user] = {"Authorization": f"Bearer {token}"}
+
+            def upload(user: str, number: int, content: bytes):
+                response = client.post(
+                    "/documents/upload",
+                    files={"file": (f"{user}{number}.txt", content + f"\n{user}{number}".encode())},
+                    headers=headers[user]
+                )
+                finished[(user, number)] = (time.perf_counter(), response.status_code)
+                if response.status_code != 200:
+                    print(f"  {user}{number}: {response.text[:300]}")
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=upload, args=("a", number, heavy)) for number in range(args.heavy_uploads)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.delay)
+            light = threading.Thread(target=upload, args=("b", 0, sample))
+            light.start()
+            threads.append(light)
+            while any(thread.is_alive() for thread in threads):
+                call = time.perf_counter()
+                client.get("/health")
+                health.append(time.perf_counter() - call)
+                time.sleep(0.05)
+            for thread in threads:
+                thread.join()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{settings.processing_slots} processing slots; user A: {args.heavy_uploads} x {len(heavy) / 1024 / 1024:.1f} MB, "
+          f"user B: 1 x {len(sample) / 1024:.1f} KB after {args.delay:.1f}s")
+    for (user, number), (at, status_code) in sorted(finished.items(), key=lambda item: item[1][0]):
+        print(f"  {user}{number}: HTTP {status_code} after {at - started:6.2f}s")
+    slowest_health = max(health) * 1000 if health else 0.0
+    print(f"  /health: {len(health)} calls, slowest {slowest_health:.0f} ms")
+
+    failed = False
+    if any(status_code != 200 for _, status_code in finished.values()):
+        print("FAIL: an upload was not processed")
+        failed = True
+    last_heavy = max(at for (user, _), (at, _) in finished.items() if user == "a")
+    if finished[("b", 0)][0] >= last_heavy:
+        print("FAIL: user B's upload waited for all of user A's uploads")
+        failed = True
+    if slowest_health > args.max_health_ms:
+        print(f"FAIL: /health took {slowest_health:.0f} ms during processing (budget {args.max_health_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the API entry point.
+
+Imports ``main`` in fresh interpreters, reports the best wall time and fails
+(exit code 1) when it exceeds the budget or when a heavy backend that must be
+loaded lazily ends up in ``sys.modules``.
+
+Usage: python benchmarks/check_import_time.py [--budget-ms 1500] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use or by the warm-up
+LAZY_MODULES = ["docx", "pypdf", "PyPDF2", "torch", "transformers", "spacy", "sklearn"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "elapsed_ms": elapsed * 1000,
+    "loaded_lazy_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+def measure_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Maximum allowed import time of main")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to measure")
+    args = parser.parse_args()
+    
+    samples = [measure_once() for _ in range(args.runs)]
+    best = min(sample["elapsed_ms"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded_lazy_modules"]})
+    
+    print(f"import main: best {best:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    
+    failed = False
+    if best > args.budget_ms:
+        print("FAIL: import time budget exceeded")
+        failed = True
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}")
+        failed = True
+    
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Round-trip check of the streaming TXT and RTF extractors (app.services.text_formats).
+
+Writes contracts in several encodings to a temporary directory and compares
+the extracted text with the original. The texts are longer than the 64 KB
+read chunk and are shifted by a few bytes between variants, so chunk and
+flush boundaries fall inside multi-byte characters and escapes. Fails (exit
+code 1) on the first mismatch of every case.
+
+Usage: python benchmarks/check_text_formats.py [--size-kb 280]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.services.text_formats import iter_rtf_text, iter_txt_text  # noqa: E402
+
+# Two- and three-byte UTF-8 characters (Cyrillic, em dash, euro sign)
+PHRASE = "Договор аренды № 5 — неустойка 1 000 € в день. "
+
+
+def rtf_raw_utf8(text: str) -> bytes:
+    # Raw UTF-8 instead of escapes, as some writers emit it; the declared code page is 1251
+    return b"{\\rtf1\\ansi\\ansicpg1251 " + text.encode("utf-8") + b"}"
+
+
+def rtf_hex_escapes(text: str) -> bytes:
+    body = "".join(f"\\'{byte:02x}" if byte > 127 else chr(byte)
+                   for byte in text.encode("cp1251", errors="replace"))
+    return b"{\\rtf1\\ansi\\ansicpg1251 " + body.encode("ascii") + b"}"
+
+
+def rtf_unicode_escapes(text: str) -> bytes:
+    # Signed 16-bit \uN; characters beyond the BMP as a surrogate pair, the way Word writes them
+    units = text.encode("utf-16-le")
+    body = []
+    for index in range(0, len(units), 2):
+        unit = int.from_bytes(units[index:index + 2], "little")
+        body.append(f"\\u{unit - 65536 if unit > 32767 else unit}?" if unit > 127 else chr(unit))
+    return b"{\\rtf1\\ansi\\uc1 " + "".join(body).encode("ascii") + b"}"
+
+
+CASES = [
+    ("txt utf-8", ".txt", iter_txt_text, lambda text: text.encode("utf-8"), PHRASE),
+    ("txt utf-8 bom", ".txt", iter_txt_text, lambda text: text.encode("utf-8-sig"), PHRASE),
+    ("txt cp1251", ".txt", iter_txt_text, lambda text: text.encode("cp1251"), PHRASE.replace("€", "EUR")),
+    ("txt koi8-r", ".txt", iter_txt_text, lambda text: text.encode("koi8-r"), PHRASE.replace("—", "-").replace("€", "EUR").replace("№", "N")),
+    ("rtf raw utf-8", ".rtf", iter_rtf_text, rtf_raw_utf8, PHRASE),
+    ("rtf \\'hh cp1251", ".rtf", iter_rtf_text, rtf_hex_escapes, PHRASE.replace("€", "EUR")),
+    ("rtf \\uN", ".rtf", iter_rtf_text, rtf_unicode_escapes, PHRASE),
+    ("rtf \\uN surrogate pairs", ".rtf", iter_rtf_text, rtf_unicode_escapes, PHRASE + "Подпись ✍️ 😀 𝄞. "),
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=280, help="approximate size of every text")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="text-formats-check-")
+    failed = False
+    try:
+        for name, extension, extract, encode, phrase in CASES:
+            repeats = args.size_kb * 1024 // len(phrase.encode("utf-8")) + 1
+            mismatches = []
+            for shift in range(4):
+                text = "x" * shift + phrase * repeats
+                path = os.path.join(directory, f"case{extension}")
+                with open(path, "wb") as target:
+                    target.write(encode(text))
+                extracted = "".join(extract(path))
+                if extracted != text:
+                    position = next((index for index, (left, right) in enumerate(zip(extracted, text)) if left != right),
+                                    min(len(extracted), len(text)))
+                    mismatches.append(f"shift {shift}: first difference at character {position} "
+                                      f"({extracted[position:position + 20]!r} instead of {text[position:position + 20]!r})")
+            if mismatches:
+                failed = True
+                print(f"FAIL {name}: {mismatches[0]}")
+            else:
+                print(f"ok   {name}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
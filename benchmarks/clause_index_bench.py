@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the similar-clause index (app.services.clause_index).
+
+Builds a synthetic clause library (100k clauses by default) into a temporary
+directory, opens it memory-mapped the way the API does and reports build time,
+index size, load time, search throughput in sentences per second and how many
+paraphrased library clauses are found.
+
+Usage: python benchmarks/clause_index_bench.py [--clauses 100000] [--sentences 2000] [--batch-size 256]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.clause_index import ClauseIndex, build_index
+
+SYLLABLES = [
+    "ко", "ра", "то", "ни", "ст", "ве", "об", "за", "пре", "до", "ли", "ска", "ме",
+    "ть", "ова", "ени", "при", "су", "дог", "пла", "ус", "ло", "ви", "ем", "ак", "тор",
+]
+LEVELS = ["low", "medium", "high"]
+
+
+class SyntheticLibrary:
+    """Clauses of Zipf-distributed pseudo-words, like word frequencies in real contracts"""
+
+    def __init__(self, seed: int = 42, vocabulary: int = 20000):
+        self.generator = random.Random(seed)
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(self.generator.choice(SYLLABLES) for _ in range(self.generator.randint(1, 4))))
+        self.words = sorted(words)
+        self.weights = [1 / (rank + 1) ** 1.05 for rank in range(len(self.words))]
+
+    def clause(self) -> str:
+        return " ".join(self.generator.choices(self.words, self.weights, k=self.generator.randint(12, 25))) + "."
+
+    def paraphrase(self, clause: str, edits: int = 2) -> str:
+        """The clause with a few words replaced, as in a reworded contract"""
+        words = clause.split()
+        for _ in range(edits):
+            words[self.generator.randrange(len(words))] = self.generator.choice(self.words)
+        return " ".join(words)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clauses", type=int, default=100_000)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    synthetic = SyntheticLibrary()
+    library = [
+        {"id": str(number), "text": synthetic.clause(), "risk_level": synthetic.generator.choice(LEVELS), "explanation": "synthetic"}
+        for number in range(args.clauses)
+    ]
+    # Half the queries are paraphrases of library clauses, half are unrelated sentences
+    sources = synthetic.generator.sample(range(args.clauses), args.sentences // 2)
+    sentences = [synthetic.paraphrase(library[number]["text"]) for number in sources]
+    sentences += [synthetic.clause() for _ in range(args.sentences - len(sources))]
+
+    directory = tempfile.mkdtemp(prefix="clause_index_")
+    try:
+        started = time.perf_counter()
+        stats = build_index(library, directory)
+        build_seconds = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        started = time.perf_counter()
+        index = ClauseIndex(directory)
+        load_seconds = time.perf_counter() - started
+
+        index.search(sentences[:args.batch_size], threshold=args.threshold, batch_size=args.batch_size)  # warm page cache
+        started = time.perf_counter()
+        hits = index.search(sentences, threshold=args.threshold, batch_size=args.batch_size)
+        search_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    recalled = sum(1 for number, result in zip(sources, hits) if result and result[0][0] == number)
+    false_hits = sum(1 for result in hits[len(sources):] if result)
+    print(f"Library:    {stats['clauses']} clauses, {stats['nonzeros']} non-zeros "
+          f"({stats['candidate_nonzeros']} for candidates), {size / 1e6:.1f} MB on disk")
+    print(f"Build:      {build_seconds:.1f} s")
+    print(f"Load:       {load_seconds * 1000:.1f} ms (memory-mapped)")
+    print(f"Search:     {len(sentences)} sentences in {search_seconds:.2f} s "
+          f"= {len(sentences) / search_seconds:.0f} sentences/s (batch {args.batch_size}, top-1)")
+    print(f"Recall@1:   {recalled}/{len(sources)} paraphrased clauses found above threshold {args.threshold}")
+    print(f"False hits: {false_hits}/{len(sentences) - len(sources)} unrelated sentences")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Contract-type scanners (app.services.contract_classifier, AIAnalyzer.scanners):
+classification accuracy and cost, rules per type and rule-scan time with the
+rules of the document's type against every rule.
+
+The rulebook can be grown with --synthetic-rules type-specific regular
+expressions (spread evenly over the types) to see the saving once it has
+hundreds of rules.
+
+Usage: python benchmarks/contract_types_bench.py [--paragraphs 2000] [--synthetic-rules 300] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.document import RiskLevel
+from app.services.ai_analyzer import AIAnalyzer
+from app.services.contract_classifier import CONTRACT_TYPES, GENERAL, classify
+
+OPENINGS = {
+    "supply": ("ДОГОВОР ПОСТАВКИ № 17", "Поставщик обязуется поставить, а Покупатель принять и оплатить товар "
+               "партиями согласно спецификации. Отгрузка товара производится со склада Поставщика."),
+    "sale": ("ДОГОВОР КУПЛИ-ПРОДАЖИ КВАРТИРЫ", "Продавец продает, а Покупатель покупает квартиру. "
+             "Цена продажи определена соглашением сторон."),
+    "lease": ("ДОГОВОР АРЕНДЫ НЕЖИЛОГО ПОМЕЩЕНИЯ", "Арендодатель передает, а Арендатор принимает во временное "
+              "владение помещение. Арендная плата вносится ежемесячно."),
+    "services": ("ДОГОВОР ВОЗМЕЗДНОГО ОКАЗАНИЯ УСЛУГ", "Исполнитель обязуется оказать услуги, а Заказчик "
+                 "оплатить их. Услуги оказываются в сроки, согласованные сторонами."),
+    "license": ("ЛИЦЕНЗИОННЫЙ ДОГОВОР", "Лицензиар предоставляет Лицензиату право использования программы "
+                "для ЭВМ на условиях простой (неисключительной) лицензии."),
+    "loan": ("ДОГОВОР ЗАЙМА", "Займодавец передает Заемщику денежные средства, а Заемщик обязуется вернуть "
+             "сумму займа и уплатить проценты."),
+    "employment": ("ТРУДОВОЙ ДОГОВОР", "Работодатель принимает Работника на должность менеджера. "
+                   "Работнику устанавливается должностной оклад."),
+    GENERAL: ("СОГЛАШЕНИЕ", "Стороны договорились о нижеследующем."),
+}
+FILLER = (
+    "Стороны обязуются исполнять принятые на себя обязательства надлежащим образом, "
+    "своевременно уведомлять друг друга об изменении реквизитов и сохранять переписку."
+)
+SYNTHETIC_WORDS = ("неустойка", "уведомление", "гарантия", "приемка", "оплата", "претензия", "расторжение", "залог")
+
+
+def document(contract_type: str, paragraphs: int) -> str:
+    title, opening = OPENINGS[contract_type]
+    return "\n".join([title, opening] + [FILLER] * paragraphs)
+
+
+def add_synthetic_rules(analyzer: AIAnalyzer, count: int):
+    types = list(CONTRACT_TYPES)
+    for number in range(count):
+        word = SYNTHETIC_WORDS[number % len(SYNTHETIC_WORDS)]
+        analyzer.risk_patterns[RiskLevel.LOW].append({
+            "id": f"synthetic_{number}",
+            "version": 1,
+            "contract_types": [types[number % len(types)]],
+            "pattern": rf"(?i){word}\w*\s+(?:\w+\s+){{0,2}}условие\s+{number}\b",
+            "explanation": f"Синтетическое правило {number}",
+        })
+    analyzer.compile_rules()
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--synthetic-rules", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = {contract_type: document(contract_type, args.paragraphs) for contract_type in OPENINGS}
+    correct = sum(classify(text) == contract_type for contract_type, text in documents.items())
+    classify_seconds = best_of(args.repeat, lambda: [classify(text) for text in documents.values()]) / len(documents)
+    print(f"classifier: {correct}/{len(documents)} correct, {classify_seconds * 1000:.2f} ms per document")
+
+    for synthetic in sorted({0, args.synthetic_rules}):
+        analyzer = AIAnalyzer()
+        if synthetic:
+            add_synthetic_rules(analyzer, synthetic)
+        print(f"\nrulebook with {len(analyzer.scanners[GENERAL].rule_ids)} rules ({synthetic} synthetic), "
+              f"{len(documents[GENERAL]) / 1e3:.0f}k characters per document")
+        total_all = total_typed = 0.0
+        for contract_type, text in documents.items():
+            if contract_type == GENERAL:
+                continue
+            all_rules = best_of(args.repeat, lambda: analyzer.scan_rules(text))
+            typed = best_of(args.repeat, lambda: analyzer.scan_rules(text, contract_type=contract_type))
+            total_all += all_rules
+            total_typed += typed
+            print(f"  {contract_type:>10}: {len(analyzer.scanners[contract_type].rule_ids):4d} rules, "
+                  f"scan {typed * 1000:7.1f} ms vs {all_rules * 1000:7.1f} ms with every rule")
+        print(f"  total: {total_typed * 1000:.1f} ms vs {total_all * 1000:.1f} ms "
+              f"({(1 - total_typed / total_all) * 100:.0f}% saved)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
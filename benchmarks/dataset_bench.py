@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Latency and query plans of the read endpoints and key ORM queries on a large
+dataset (see benchmarks/seed_dataset.py).
+
+Every endpoint is called through the application (TestClient, response cache
+off) as the heaviest user, a typical (median) user and a light user; every
+ORM query is run directly. For each one the report gives the median and p95
+latency and the EXPLAIN plan (EXPLAIN QUERY PLAN on SQLite) of every SQL
+statement it issued, so full scans and missing indexes stand out.
+
+--indexes absent drops the query indexes from the dataset (and present
+recreates them) before measuring, to compare runs with and without them.
+
+Usage: python benchmarks/dataset_bench.py --database-url sqlite:///dataset.db [--repeat 20]
+           [--indexes present|absent] [--output run.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY_INDEXES = ("ix_analysis_results_document_id", "ix_documents_user_id_created_at")
+
+
+def set_indexes(engine, state: str):
+    from app.database import Base
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in QUERY_INDEXES:
+                if state == "present":
+                    index.create(bind=engine, checkfirst=True)
+                else:
+                    index.drop(bind=engine, checkfirst=True)
+
+
+@contextmanager
+def captured_statements(engine):
+    """SQL statements (with their DBAPI parameters) executed on ``engine`` inside the block"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def explain(engine, statement: str, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    finally:
+        connection.close()
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def measure(engine, repeat: int, function):
+    """Timings of ``repeat`` calls and the plans of the statements of the first one"""
+    with captured_statements(engine) as statements:
+        function()
+    distinct = list({statement: parameters for statement, parameters in statements}.items())
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "statements": [
+            {"sql": " ".join(statement.split()), "plan": explain(engine, statement, parameters)}
+            for statement, parameters in distinct
+        ],
+    }
+
+
+def pick_users(db):
+    """(label, user id) of the heaviest, the median and the lightest user with documents"""
+    from sqlalchemy import func
+
+    from app.models.document import Document
+
+    counts = (
+        db.query(Document.user_id, func.count(Document.id).label("documents"))
+        .group_by(Document.user_id)
+        .order_by(func.count(Document.id).desc())
+        .all()
+    )
+    if not counts:
+        raise SystemExit("The dataset has no documents; fill it with benchmarks/seed_dataset.py")
+    picked = [("heaviest", counts[0]), ("median", counts[len(counts) // 2]), ("lightest", counts[-1])]
+    return [(label, user_id, documents) for label, (user_id, documents) in picked]
+
+
+def largest_document(db, user_id: int):
+    from sqlalchemy import func
+
+    from app.models.document import AnalysisResult, Document
+
+    row = (
+        db.query(AnalysisResult.document_id)
+        .join(Document, Document.id == AnalysisResult.document_id)
+        .filter(Document.user_id == user_id)
+        .group_by(AnalysisResult.document_id)
+        .order_by(func.count(AnalysisResult.id).desc())
+        .first()
+    )
+    if row is None:
+        row = db.query(Document.id).filter(Document.user_id == user_id).first()
+    return row[0]
+
+
+def orm_queries(session_factory, user_id: int, document_id: int, since: datetime):
+    from sqlalchemy import func
+
+    from app.models.document import AnalysisResult, Document
+    from app.services.export import export_query
+
+    def run(query_function):
+        def call():
+            db = session_factory()
+            try:
+                query_function(db)
+            finally:
+                db.close()
+        return call
+
+    return {
+        "documents of user": run(lambda db: db.query(Document).filter(Document.user_id == user_id).all()),
+        "recent documents of user": run(lambda db: (
+            db.query(Document.id, Document.original_filename, Document.status, Document.created_at)
+            .filter(Document.user_id == user_id, Document.created_at >= since)
+            .order_by(Document.created_at.desc())
+            .limit(50)
+            .all()
+        )),
+        "results of document": run(lambda db: (
+            db.query(AnalysisResult).filter(AnalysisResult.document_id == document_id).all()
+        )),
+        "risk counts of document": run(lambda db: (
+            db.query(AnalysisResult.risk_level, func.count(AnalysisResult.id))
+            .filter(AnalysisResult.document_id == document_id)
+            .group_by(AnalysisResult.risk_level)
+            .all()
+        )),
+        "export query (30 days)": run(lambda db: db.execute(export_query(user_id, date_from=since)).all()),
+    }
+
+
+def endpoints(client, headers, document_id: int, since: datetime):
+    def get(path, **params):
+        def call():
+            response = client.get(path, headers=headers, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text[:200]}")
+            response.content
+        return call
+
+    return {
+        "GET /auth/me": get("/auth/me"),
+        "GET /documents/": get("/documents/"),
+        "GET /documents/{id}": get(f"/documents/{document_id}"),
+        "GET /documents/{id}/analysis": get(f"/documents/{document_id}/analysis"),
+        "GET /documents/export (30 days)": get("/documents/export", format="jsonl", date_from=since.isoformat()),
+    }
+
+
+def print_result(name: str, result: dict, plans: bool):
+    print(f"  {name:<34} median {result['median_ms']:9.2f} ms   p95 {result['p95_ms']:9.2f} ms")
+    if plans:
+        for statement in result["statements"]:
+            print(f"      {statement['sql'][:140]}")
+            for line in statement["plan"]:
+                print(f"        {line}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), required="DATABASE_URL" not in os.environ)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--indexes", choices=("present", "absent"), help="create or drop the query indexes first")
+    parser.add_argument("--no-plans", action="store_true", help="print latencies only")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="dataset-bench-")
+    os.environ.update({
+        "DATABASE_URL": args.database_url,
+        "RESPONSE_CACHE_ENABLED": "false",
+        "UPLOAD_DIR": os.path.join(scratch, "uploads"),
+        "STORAGE_DIR": os.path.join(scratch, "storage"),
+        "TEXT_STORE_DIR": os.path.join(scratch, "texts"),
+        "PROFILE_DIR": os.path.join(scratch, "profiles"),
+    })
+    from fastapi.testclient import TestClient
+
+    import main as api
+    from app.core.security import create_access_token
+    from app.database import SessionLocal, engine
+    from app.models.user import User
+
+    if args.indexes:
+        set_indexes(engine, args.indexes)
+    since = datetime.now(timezone.utc) - timedelta(days=30)
+
+    report = {"database": engine.dialect.name, "indexes": args.indexes or "as found", "users": {}}
+    with TestClient(api.app) as client:
+        db = SessionLocal()
+        users = pick_users(db)
+        for label, user_id, documents in users:
+            email = db.get(User, user_id).email
+            document_id = largest_document(db, user_id)
+            print(f"\n{label} user {user_id}: {documents} documents, document {document_id}")
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+            results = {}
+            for group in (orm_queries(SessionLocal, user_id, document_id, since),
+                          endpoints(client, headers, document_id, since)):
+                for name, function in group.items():
+                    results[name] = measure(engine, args.repeat, function)
+                    print_result(name, results[name], plans=not args.no_plans)
+            report["users"][label] = {"user_id": user_id, "documents": documents,
+                                      "document_id": document_id, "results": results}
+        db.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
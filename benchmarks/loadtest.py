@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the API (main.py) or mock_backend.py.
+
+Each virtual user runs the journey a reviewer goes through:
+register -> login -> upload -> poll status -> list documents -> fetch analysis.
+Journeys start at a fixed arrival rate (open model) and run on a bounded
+pool of concurrent workers. The report contains throughput, latency
+percentiles and error rates per step and can be compared with an earlier
+run to catch capacity regressions before deployment.
+
+Journey latency is measured from the scheduled arrival, not from the moment a
+worker picks the journey up: when all --concurrency workers are busy, the
+time an arrival waits for one is part of what its user experiences
+(otherwise the report suffers from coordinated omission). That wait is also
+reported on its own as the start lag, with the number of late starts.
+
+Examples:
+    python benchmarks/loadtest.py --base-url http://localhost:8000 \
+        --arrival-rate 5 --duration 60 --concurrency 20 --file contract.docx \
+        --output run.json
+    python benchmarks/loadtest.py ... --compare baseline.json --max-regression-pct 15
+"""
+
+import argparse
+import http.client
+import json
+import mimetypes
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+STEPS = ["register", "login", "upload", "poll", "list", "analysis", "journey"]
+FINAL_STATUSES = ("analyzed", "error")
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Recorder:
+    """Thread-safe collection of latency samples and errors per step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, Dict[str, int]] = {step: {} for step in STEPS}
+        self.start_lags: List[float] = []
+
+    def started(self, lag: float):
+        with self._lock:
+            self.start_lags.append(lag)
+
+    def success(self, step: str, seconds: float):
+        with self._lock:
+            self.latencies[step].append(seconds)
+
+    def failure(self, step: str, reason: str):
+        with self._lock:
+            self.errors[step][reason] = self.errors[step].get(reason, 0) + 1
+
+
+class ApiClient:
+    """Minimal keep-alive HTTP client; one instance per worker thread"""
+
+    def __init__(self, base_url: str, timeout: float):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self.timeout = timeout
+        self.token: Optional[str] = None
+        self._connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self._connection = connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None) -> Tuple[int, bytes]:
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(2):
+            if self._connection is None:
+                self._connect()
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Stale keep-alive connection: reconnect once
+                self._connection.close()
+                self._connection = None
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def json_request(self, method: str, path: str, payload=None) -> Tuple[int, object]:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        status, data = self.request(method, path, body, {"Content-Type": "application/json"} if body else None)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+
+def multipart_body(filename: str, content: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return head + content + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def default_document() -> Tuple[str, bytes]:
+    """Small DOCX contract with a few risky clauses (requires python-docx)"""
+    import io
+    from docx import Document as DocxDocument
+
+    document = DocxDocument()
+    document.add_paragraph("ДОГОВОР ПОСТАВКИ")
+    for index in range(40):
+        document.add_paragraph(f"{index + 1}. Стороны согласовали условия поставки и порядок приемки товара.")
+    document.add_paragraph("Аванс оплачивается без возврата.")
+    document.add_paragraph("Поставщик вправе в одностороннем порядке изменить цену.")
+    document.add_paragraph("За просрочку начисляется штраф в размере 10% от суммы.")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return "contract.docx", buffer.getvalue()
+
+
+class Journey:
+    def __init__(self, args, documents: List[Tuple[str, bytes]], recorder: Recorder):
+        self.args = args
+        self.documents = documents
+        self.recorder = recorder
+        self._local = threading.local()
+
+    def client(self) -> ApiClient:
+        if not hasattr(self._local, "client"):
+            self._local.client = ApiClient(self.args.base_url, self.args.timeout)
+        return self._local.client
+
+    def step(self, name: str, func):
+        started = time.perf_counter()
+        try:
+            result = func()
+        except StepFailed as e:
+            self.recorder.failure(name, str(e))
+            raise
+        except Exception as e:
+            self.recorder.failure(name, type(e).__name__)
+            raise StepFailed(type(e).__name__)
+        self.recorder.success(name, time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def expect(status: int, expected: int = 200):
+        if status != expected:
+            raise StepFailed(f"HTTP {status}")
+
+    def run(self, index: int, scheduled: float):
+        """One journey; ``scheduled`` is its arrival time (perf_counter), the origin of its latency"""
+        self.recorder.started(time.perf_counter() - scheduled)
+        client = self.client()
+        client.token = None
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        password = "load-test-password"
+
+        try:
+            def register():
+                status, _ = client.json_request("POST", "/auth/register", {
+                    "email": email, "full_name": f"Load User {index}", "password": password
+                })
+                self.expect(status)
+
+            def login():
+                status, data = client.json_request("POST", "/auth/login", {"email": email, "password": password})
+                self.expect(status)
+                client.token = data["access_token"]
+
+            def upload():
+                filename, content = random.choice(self.documents)
+                body, content_type = multipart_body(filename, content)
+                status, data = client.request("POST", "/documents/upload", body, {"Content-Type": content_type})
+                self.expect(status)
+                return json.loads(data)
+
+            def poll(document_id: int, status_value: str):
+                deadline = time.perf_counter() + self.args.poll_timeout
+                while status_value not in FINAL_STATUSES:
+                    if time.perf_counter() > deadline:
+                        raise StepFailed("poll timeout")
+                    time.sleep(self.args.poll_interval)
+                    status, data = client.json_request("GET", f"/documents/{document_id}")
+                    self.expect(status)
+                    status_value = data["status"]
+                if status_value == "error":
+                    raise StepFailed("document status error")
+
+            def list_documents():
+                status, _ = client.json_request("GET", "/documents/")
+                self.expect(status)
+
+            def analysis(document_id: int):
+                status, _ = client.json_request("GET", f"/documents/{document_id}/analysis")
+                self.expect(status)
+
+            if not self.args.skip_auth:
+                self.step("register", register)
+                self.step("login", login)
+            else:
+                client.token = self.args.token
+            uploaded = self.step("upload", upload)
+            self.step("poll", lambda: poll(uploaded["document_id"], uploaded["status"]))
+            self.step("list", list_documents)
+            self.step("analysis", lambda: analysis(uploaded["document_id"]))
+        except StepFailed as e:
+            self.recorder.failure("journey", str(e))
+            return
+        self.recorder.success("journey", time.perf_counter() - scheduled)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def build_report(args, recorder: Recorder, wall_time: float, started_journeys: int) -> dict:
+    steps = {}
+    for step in STEPS:
+        values = sorted(recorder.latencies[step])
+        errors = sum(recorder.errors[step].values())
+        total = len(values) + errors
+        steps[step] = {
+            "requests": total,
+            "errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "error_reasons": recorder.errors[step],
+            "throughput_rps": len(values) / wall_time if wall_time else 0.0,
+            "latency_ms": {
+                name: (value * 1000 if value is not None else None)
+                for name, value in (
+                    ("p50", percentile(values, 0.50)),
+                    ("p90", percentile(values, 0.90)),
+                    ("p95", percentile(values, 0.95)),
+                    ("p99", percentile(values, 0.99)),
+                    ("max", values[-1] if values else None),
+                    ("mean", sum(values) / len(values) if values else None),
+                )
+            },
+        }
+    lags = sorted(recorder.start_lags)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "base_url": args.base_url,
+            "arrival_rate": args.arrival_rate,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "journeys": args.journeys,
+            "files": args.file,
+        },
+        "wall_time_seconds": wall_time,
+        "journeys_started": started_journeys,
+        "start_lag_ms": {
+            name: (value * 1000 if value is not None else None)
+            for name, value in (
+                ("p50", percentile(lags, 0.50)),
+                ("p95", percentile(lags, 0.95)),
+                ("p99", percentile(lags, 0.99)),
+                ("max", lags[-1] if lags else None),
+            )
+        },
+        "late_starts": sum(lag * 1000 > args.late_start_ms for lag in lags),
+        "steps": steps,
+    }
+
+
+def print_report(report: dict):
+    print(f"\nWall time {report['wall_time_seconds']:.1f}s, journeys started: {report['journeys_started']}")
+    lag = report["start_lag_ms"]
+    if lag["max"] is not None:
+        print(f"Start lag behind schedule: p50 {lag['p50']:.1f} ms, p99 {lag['p99']:.1f} ms, max {lag['max']:.1f} ms; "
+              f"{report['late_starts']} late starts (all workers busy; included in journey latency)")
+    print(f"{'step':<10}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for step, data in report["steps"].items():
+        latency = data["latency_ms"]
+        cells = "".join(f"{latency[key]:9.1f}" if latency[key] is not None else f"{'-':>9}" for key in ("p50", "p90", "p95", "p99", "max"))
+        print(f"{step:<10}{data['requests']:7d}{data['error_rate'] * 100:7.1f}{data['throughput_rps']:8.2f}{cells}")
+
+
+def compare_reports(
+    baseline: dict,
+    current: dict,
+    max_regression_pct: float,
+    max_error_rate_increase: float,
+    min_latency_delta_ms: float
+) -> List[str]:
+    """Regressions of p95 latency, throughput or error rate against the baseline"""
+    regressions = []
+    for step, now in current["steps"].items():
+        before = baseline.get("steps", {}).get(step)
+        if not before:
+            continue
+        before_p95, now_p95 = before["latency_ms"]["p95"], now["latency_ms"]["p95"]
+        if (
+            before_p95 and now_p95
+            and now_p95 - before_p95 > min_latency_delta_ms
+            and (now_p95 - before_p95) / before_p95 * 100 > max_regression_pct
+        ):
+            regressions.append(f"{step}: p95 {before_p95:.1f} ms -> {now_p95:.1f} ms")
+        if before["throughput_rps"] and (before["throughput_rps"] - now["throughput_rps"]) / before["throughput_rps"] * 100 > max_regression_pct:
+            regressions.append(f"{step}: throughput {before['throughput_rps']:.2f} -> {now['throughput_rps']:.2f} rps")
+        if now["error_rate"] - before["error_rate"] > max_error_rate_increase:
+            regressions.append(f"{step}: error rate {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--arrival-rate", type=float, default=2.0, help="New journeys per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep starting journeys")
+    parser.add_argument("--journeys", type=int, default=0, help="Stop after this many journeys (0 = duration only)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum journeys in flight")
+    parser.add_argument("--late-start-ms", type=float, default=10.0,
+                        help="A journey starting later than this after its arrival counts as a late start")
+    parser.add_argument("--file", action="append", default=[], help="Document(s) to upload; a generated DOCX if omitted")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--poll-timeout", type=float, default=120.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request socket timeout")
+    parser.add_argument("--skip-auth", action="store_true", help="Use --token instead of register/login")
+    parser.add_argument("--token", default="mock_token_demo_12345")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--max-regression-pct", type=float, default=10.0)
+    parser.add_argument("--max-error-rate-increase", type=float, default=0.01)
+    parser.add_argument("--min-latency-delta-ms", type=float, default=5.0, help="Ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.file:
+        documents = []
+        for path in args.file:
+            with open(path, "rb") as document_file:
+                documents.append((os.path.basename(path), document_file.read()))
+    else:
+        documents = [default_document()]
+
+    recorder = Recorder()
+    journey = Journey(args, documents, recorder)
+    interval = 1.0 / args.arrival_rate
+    started_journeys = 0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        next_start = started
+        while True:
+            now = time.perf_counter()
+            if now - started >= args.duration or (args.journeys and started_journeys >= args.journeys):
+                break
+            if now < next_start:
+                time.sleep(next_start - now)
+            pool.submit(journey.run, started_journeys, next_start)
+            started_journeys += 1
+            next_start += interval
+    wall_time = time.perf_counter() - started
+
+    report = build_report(args, recorder, wall_time, started_journeys)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_reports(
+            baseline, report, args.max_regression_pct, args.max_error_rate_increase, args.min_latency_delta_ms
+        )
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
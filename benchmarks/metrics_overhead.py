@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Overhead check for the pipeline instrumentation in app.core.metrics.
+
+Runs the analysis stage on a synthetic contract with and without the metrics
+that the upload pipeline records (stage timer, bytes counter, per-rule risk
+counter) and fails (exit code 1) when the relative overhead exceeds the limit.
+
+Usage: python benchmarks/metrics_overhead.py [--max-overhead-pct 3] [--rounds 7]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.metrics import stage_timer, pipeline_bytes, count_risks, http_request_duration
+from app.services.ai_analyzer import AIAnalyzer
+
+CLAUSES = [
+    "Аванс оплачивается без возврата в течение 5 дней.",
+    "Поставщик вправе в одностороннем порядке изменить цену.",
+    "За просрочку начисляется штраф в размере 10% от суммы.",
+    "Стороны согласовали порядок приемки товара по количеству и качеству.",
+    "Срок действия договора не определен.",
+]
+
+def build_document(paragraphs: int) -> str:
+    return "\n".join(CLAUSES[i % len(CLAUSES)] for i in range(paragraphs))
+
+def run_plain(analyzer: AIAnalyzer, content: str):
+    analyzer.analyze_document(content)
+
+def run_instrumented(analyzer: AIAnalyzer, content: str):
+    with stage_timer("analyze_document"):
+        risks = analyzer.analyze_document(content)
+    pipeline_bytes.inc(len(content), stage="extract_text")
+    count_risks(risks)
+    http_request_duration.observe(0.01, method="POST", route="/documents/upload", status=200)
+
+def best_time(func, analyzer, content, iterations: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(analyzer, content)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-overhead-pct", type=float, default=3.0)
+    parser.add_argument("--paragraphs", type=int, default=200, help="Size of the synthetic document")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+    
+    analyzer = AIAnalyzer()
+    content = build_document(args.paragraphs)
+    
+    # Interleave to spread noise evenly between both variants
+    plain = instrumented = float("inf")
+    for _ in range(args.rounds):
+        plain = min(plain, best_time(run_plain, analyzer, content, args.iterations, 1))
+        instrumented = min(instrumented, best_time(run_instrumented, analyzer, content, args.iterations, 1))
+    
+    overhead_pct = (instrumented - plain) / plain * 100
+    print(f"analyze_document: {plain * 1000:.3f} ms plain, {instrumented * 1000:.3f} ms instrumented")
+    print(f"overhead: {overhead_pct:.2f}% (limit {args.max_overhead_pct:.2f}%)")
+    
+    if overhead_pct > args.max_overhead_pct:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
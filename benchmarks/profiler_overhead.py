@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Overhead check for automatic slow-job capture in app.services.profiler.
+
+Every processing job runs inside a ProfileCapture; with automatic capture
+enabled (PROFILE_SLOW_JOB_SECONDS > 0) it starts a sampling profiler whose
+thread holds the GIL while it records a stack, i.e. takes that time from the
+job. Runs a job of repeated analyze_document calls under ProfileCapture and
+measures the CPU time of the sampler thread relative to the job:
+
+- default: the sampler is armed after PROFILE_AUTO_START_FRACTION of the
+  budget, so a short job is never sampled,
+- sampling: a job past that point, sampled every PROFILE_AUTO_SAMPLING_INTERVAL,
+- fine sampling: the same at PROFILE_SAMPLING_INTERVAL, as explicitly
+  requested profiles do (reported only).
+
+The end-to-end slowdown against a plain job is printed as well, but not
+checked: on a shared machine it is noisier than the limit. Fails (exit code 1)
+when the sampler's share of the default or sampling job exceeds the limit.
+
+Usage: python benchmarks/profiler_overhead.py [--max-overhead-pct 3] [--rounds 9]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services import profiler
+from app.services.ai_analyzer import AIAnalyzer
+from app.services.profiler import ProfileCapture
+
+CLAUSES = [
+    "Аванс оплачивается без возврата в течение 5 дней.",
+    "Поставщик вправе в одностороннем порядке изменить цену.",
+    "За просрочку начисляется штраф в размере 10% от суммы.",
+    "Стороны согласовали порядок приемки товара по количеству и качеству.",
+    "Срок действия договора не определен.",
+]
+
+class RecordingSampler(profiler.SamplingProfiler):
+    """SamplingProfiler that records the CPU time of its own thread"""
+
+    cpu_seconds = 0.0
+
+    def _run(self):
+        started = time.thread_time()
+        try:
+            super()._run()
+        finally:
+            RecordingSampler.cpu_seconds += time.thread_time() - started
+
+def build_document(paragraphs: int) -> str:
+    return "\n".join(CLAUSES[i % len(CLAUSES)] for i in range(paragraphs))
+
+def run_job(analyzer: AIAnalyzer, content: str, iterations: int, depth: int = 0) -> float:
+    # Sampling cost grows with stack depth; the API's worker threads sit ~40 frames deep
+    if depth > 0:
+        return run_job(analyzer, content, iterations, depth - 1)
+    # CPU time of the whole process: the job plus the sampler thread, whatever else runs on the machine
+    started = time.process_time()
+    for _ in range(iterations):
+        analyzer.analyze_document(content)
+    return time.process_time() - started
+
+def run_captured(analyzer: AIAnalyzer, content: str, iterations: int, depth: int, configure):
+    """(job seconds, sampler CPU seconds) of one job under automatic capture"""
+    saved = (settings.profile_slow_job_seconds, settings.profile_auto_start_fraction, settings.profile_auto_sampling_interval)
+    configure()
+    RecordingSampler.cpu_seconds = 0.0
+    try:
+        with ProfileCapture(0):
+            seconds = run_job(analyzer, content, iterations, depth)
+        return seconds, RecordingSampler.cpu_seconds
+    finally:
+        (settings.profile_slow_job_seconds, settings.profile_auto_start_fraction,
+         settings.profile_auto_sampling_interval) = saved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-overhead-pct", type=float, default=3.0)
+    parser.add_argument("--paragraphs", type=int, default=200, help="Size of the synthetic document")
+    parser.add_argument("--iterations", type=int, default=500, help="analyze_document calls per job")
+    parser.add_argument("--stack-depth", type=int, default=40, help="Frames above the analyzer, as in a worker thread")
+    parser.add_argument("--rounds", type=int, default=9)
+    args = parser.parse_args()
+
+    profiler.SamplingProfiler = RecordingSampler
+    analyzer = AIAnalyzer()
+    content = build_document(args.paragraphs)
+    default_budget = settings.profile_slow_job_seconds or 30.0
+    fine_interval = settings.profile_sampling_interval
+
+    def default():
+        settings.profile_slow_job_seconds = default_budget
+
+    def sampling():
+        # A budget the job never reaches, so nothing is saved, and the sampler armed from the start
+        settings.profile_slow_job_seconds = 3600.0
+        settings.profile_auto_start_fraction = 0.0
+
+    def fine_sampling():
+        sampling()
+        settings.profile_auto_sampling_interval = fine_interval
+
+    variants = {"default": default, "sampling": sampling, "fine sampling": fine_sampling}
+
+    # Interleave and compare within each round, so drift and outliers cancel out
+    plain = []
+    ratios = {name: [] for name in variants}
+    shares = {name: [] for name in variants}
+    for _ in range(args.rounds):
+        plain.append(run_job(analyzer, content, args.iterations, args.stack_depth))
+        for name, configure in variants.items():
+            seconds, sampler_seconds = run_captured(analyzer, content, args.iterations, args.stack_depth, configure)
+            ratios[name].append(seconds / plain[-1])
+            shares[name].append(sampler_seconds / seconds)
+
+    print(f"job of {args.iterations} x analyze_document: {statistics.median(plain) * 1000:.1f} ms CPU plain (median)")
+    intervals = {
+        "default": f"armed after {default_budget * settings.profile_auto_start_fraction:.1f}s",
+        "sampling": f"every {settings.profile_auto_sampling_interval * 1000:.0f} ms",
+        "fine sampling": f"every {fine_interval * 1000:.0f} ms",
+    }
+    failed = False
+    print(f"{'':<14} {'sampler CPU':>12} {'slowdown':>9}   (medians of {args.rounds} rounds)")
+    for name in variants:
+        overhead_pct = statistics.median(shares[name]) * 100
+        slowdown_pct = (statistics.median(ratios[name]) - 1) * 100
+        print(f"{name:<14} {overhead_pct:11.2f}% {slowdown_pct:8.2f}%   {intervals[name]}")
+        if name != "fine sampling" and overhead_pct > args.max_overhead_pct:
+            failed = True
+    print(f"limit {args.max_overhead_pct:.2f}%")
+
+    if failed:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Storage size and read latency of the two risk storage modes
+(settings.risk_storage_mode): one analysis_results row per risk against one
+packed document_risks record per document (app.services.risk_storage).
+
+Each mode gets its own SQLite database with --documents boilerplate-heavy
+documents of about --risks findings each. Reads go through the API path:
+load a document, count its risks by level and serialize it with its results.
+
+Usage: python benchmarks/risk_storage_bench.py [--documents 200] [--risks 2000] [--reads 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database import Base
+from app.models.document import Document, DocumentStatus
+from app.models.user import User
+from app.schemas.document import Document as DocumentSchema
+from app.services.ai_analyzer import AIAnalyzer
+from app.services.risk_storage import level_counts, store_risks
+
+CLAUSES = [
+    "Аванс перечисляется без возврата.",
+    "Исполнитель вправе заявить односторонний отказ от договора.",
+    "Ответственность Исполнителя не ограничена.",
+    "Договор является бессрочным.",
+    "Форс-мажор договором не предусмотрен.",
+    "За просрочку начисляется штраф 5% в день.",
+]
+FILLER = "Стороны обязуются исполнять принятые на себя обязательства надлежащим образом."
+
+
+def contract(risks: int, seed: int) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(risks):
+        paragraphs.append(rng.choice(CLAUSES))
+        paragraphs.extend([FILLER] * rng.randint(0, 2))
+    return "\n".join(paragraphs)
+
+
+def build(path: str, mode: str, contents, analyzer: AIAnalyzer):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    settings.risk_storage_mode = mode
+    db = session_factory()
+    user = User(email=f"{mode}@example.com", hashed_password="-", full_name=mode)
+    db.add(user)
+    db.flush()
+    findings = 0
+    started = time.perf_counter()
+    for number, content in enumerate(contents):
+        document = Document(
+            filename=f"{number}.docx", original_filename=f"{number}.docx", file_path="-", file_size=len(content),
+            content=content, user_id=user.id, status=DocumentStatus.ANALYZED
+        )
+        db.add(document)
+        db.flush()
+        risks = analyzer.analyze_document(content)
+        findings += len(risks)
+        store_risks(db, document, risks)
+        db.commit()
+    write_seconds = time.perf_counter() - started
+    db.close()
+    with engine.connect() as connection:
+        connection.execute(text("VACUUM"))
+    engine.dispose()
+    return session_factory, findings, write_seconds
+
+
+def read(session_factory, document_ids, reads: int):
+    rng = random.Random(1)
+    timings = []
+    for _ in range(reads):
+        document_id = rng.choice(document_ids)
+        db = session_factory()
+        started = time.perf_counter()
+        document = db.get(Document, document_id)
+        level_counts(document)
+        DocumentSchema.model_validate(document).model_dump_json()
+        timings.append(time.perf_counter() - started)
+        db.close()
+    return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--risks", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    analyzer = AIAnalyzer()
+    contents = [contract(args.risks, seed) for seed in range(args.documents)]
+    text_bytes = sum(len(content.encode("utf-8")) for content in contents)
+    print(f"{args.documents} documents, {text_bytes / 1e6:.1f} MB of text")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("rows", "packed"):
+            path = os.path.join(directory, f"{mode}.db")
+            session_factory, findings, write_seconds = build(path, mode, contents, analyzer)
+            # The document text is the same in both modes; report what the risks add to it
+            risk_bytes = os.path.getsize(path) - text_bytes
+            median, p95 = read(session_factory, list(range(1, args.documents + 1)), args.reads)
+            print(f"{mode:>6}: {findings} findings, database {os.path.getsize(path) / 1e6:.1f} MB "
+                  f"(~{max(risk_bytes, 0) / findings:.0f} B per finding beyond the text), "
+                  f"write {write_seconds:.1f}s, read median {median * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
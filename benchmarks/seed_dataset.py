@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Fill a database with a large synthetic dataset in the real schema
+(users, documents, analysis_results) for benchmarks/dataset_bench.py.
+
+Volumes are configurable and skewed like production: documents are spread
+over users by a Zipf law (--skew; the first few users hold most documents),
+upload times over the last --days days, risks per document vary around
+--risks-per-document with a long tail, and statuses are mostly "analyzed".
+Rows are written with bulk inserts; the same --seed gives the same data.
+
+The target database must have the current schema (alembic upgrade head), or
+pass --create-schema for an empty SQLite file.
+
+Usage: python benchmarks/seed_dataset.py --database-url sqlite:///dataset.db --create-schema \
+           [--users 1000] [--documents 100000] [--risks-per-document 20] [--skew 1.1] [--seed 1]
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BATCH = 5000
+STATUSES = (("analyzed", 0.92), ("error", 0.03), ("processing", 0.02), ("uploaded", 0.03))
+CONTRACT_TYPES = ("general", "supply", "sale", "lease", "services", "license", "loan", "employment")
+FRAGMENTS = (
+    "Аванс перечисляется без возврата.",
+    "Исполнитель вправе заявить односторонний отказ от договора.",
+    "Ответственность Исполнителя не ограничена.",
+    "Договор является бессрочным.",
+    "За просрочку начисляется штраф 5% в день.",
+    "Споры рассматриваются в суде по месту нахождения Исполнителя.",
+)
+FILLER = "Стороны обязуются исполнять принятые на себя обязательства надлежащим образом."
+
+
+def zipf_cumulative(count: int, exponent: float):
+    weights = [1 / (rank + 1) ** exponent for rank in range(count)]
+    return list(itertools.accumulate(weights))
+
+
+def weighted(rng: random.Random, cumulative):
+    return bisect.bisect(cumulative, rng.random() * cumulative[-1])
+
+
+def rule_catalog():
+    from app.services.ai_analyzer import AIAnalyzer
+
+    analyzer = AIAnalyzer()
+    return [
+        (rule["id"], level.name, rule["explanation"])
+        for level, rules in analyzer.risk_patterns.items()
+        for rule in rules
+    ]
+
+
+def risk_count(rng: random.Random, mean: float) -> int:
+    # Exponential around the mean: most documents have a few risks, some have hundreds
+    return min(int(rng.expovariate(1 / mean)) if mean > 0 else 0, int(mean * 20))
+
+
+def insert_batches(connection, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), required="DATABASE_URL" not in os.environ)
+    parser.add_argument("--create-schema", action="store_true", help="create the tables from the models first")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--risks-per-document", type=float, default=20.0)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of documents per user")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--content-paragraphs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import create_engine, func, select, text
+
+    from app.core.security import get_password_hash
+    from app.database import Base
+    from app.models.document import AnalysisResult, Document
+    from app.models.user import User
+
+    engine = create_engine(args.database_url)
+    if args.create_schema:
+        Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(args.seed)
+    rules = rule_catalog()
+    status_cumulative = list(itertools.accumulate(share for _, share in STATUSES))
+    user_cumulative = zipf_cumulative(args.users, args.skew)
+    now = datetime.now(timezone.utc)
+    password = get_password_hash("password")
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        first_user = (connection.execute(select(func.max(User.id))).scalar() or 0) + 1
+        first_document = (connection.execute(select(func.max(Document.id))).scalar() or 0) + 1
+        first_result = (connection.execute(select(func.max(AnalysisResult.id))).scalar() or 0) + 1
+
+        insert_batches(connection, User.__table__, (
+            {
+                "id": first_user + number,
+                "email": f"seed-{args.seed}-{first_user + number}@example.com",
+                "hashed_password": password,
+                "full_name": f"Пользователь {first_user + number}",
+                "is_active": True,
+                "created_at": now - timedelta(days=args.days + 1),
+            }
+            for number in range(args.users)
+        ))
+
+        counts = {"results": 0}
+        analyzed = bytearray(args.documents)  # results are generated for analyzed documents only
+
+        def documents():
+            for number in range(args.documents):
+                document_id = first_document + number
+                user_id = first_user + weighted(rng, user_cumulative)
+                status = STATUSES[bisect.bisect(status_cumulative, rng.random() * status_cumulative[-1])][0]
+                analyzed[number] = status == "analyzed"
+                paragraphs = [rng.choice(FRAGMENTS) if rng.random() < 0.3 else FILLER
+                              for _ in range(args.content_paragraphs)]
+                yield {
+                    "id": document_id,
+                    "filename": f"{document_id}.docx",
+                    "original_filename": f"Договор {document_id}.docx",
+                    "file_path": f"seed/{document_id}.docx",
+                    "file_size": rng.randint(20_000, 2_000_000),
+                    "content": "\n".join(paragraphs) if status == "analyzed" else None,
+                    "contract_type": rng.choice(CONTRACT_TYPES),
+                    "status": status.upper(),
+                    "error_reason": "extraction_failed" if status == "error" else None,
+                    "user_id": user_id,
+                    "created_at": now - timedelta(seconds=rng.uniform(0, args.days * 86400)),
+                }
+
+        def results():
+            result_id = first_result
+            for number in range(args.documents):
+                if not analyzed[number]:
+                    continue
+                document_id = first_document + number
+                for _ in range(risk_count(rng, args.risks_per_document)):
+                    rule_id, level, explanation = rng.choice(rules)
+                    start = rng.randint(0, 50_000)
+                    yield {
+                        "id": result_id,
+                        "document_id": document_id,
+                        "rule_id": rule_id,
+                        "risk_level": level,
+                        "text_fragment": rng.choice(FRAGMENTS),
+                        "explanation": explanation,
+                        "start_position": start,
+                        "end_position": start + rng.randint(20, 200),
+                        "confidence_score": rng.randint(40, 99),
+                        "created_at": now,
+                    }
+                    result_id += 1
+                    counts["results"] += 1
+
+        insert_batches(connection, Document.__table__, documents())
+        insert_batches(connection, AnalysisResult.__table__, results())
+
+        if connection.dialect.name == "postgresql":
+            for table in ("users", "documents", "analysis_results"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))  # planner statistics for the new volumes
+
+    top_share = user_cumulative[min(3, args.users) - 1] / user_cumulative[-1]
+    print(f"{args.users} users, {args.documents} documents, {counts['results']} analysis results "
+          f"in {time.perf_counter() - started:.1f}s; the top 3 users hold ~{top_share:.0%} of the documents")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Recall and scan cost of the stem-based phrase rules (app.services.stem_matcher)
+against the regular expressions they replaced.
+
+Recall is measured on inflected and reworded variants of each risky phrase;
+cost on a synthetic contract of --paragraphs paragraphs (regular expressions
+and phrase rules scan the same text).
+
+Usage: python benchmarks/stem_matcher_bench.py [--paragraphs 40000] [--repeat 3]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ai_analyzer import AIAnalyzer
+
+# The regular expressions of the rules that are now phrase rules (ruleset before stems)
+REGEX_BANK = {
+    "non_refundable": r"(?i)(без\s+возврата|не\s+возвращается|не\s+подлежит\s+возврату)",
+    "unilateral_refusal": r"(?i)(односторонний\s+отказ|в\s+одностороннем\s+порядке)",
+    "unlimited_liability": r"(?i)(ответственность\s+не\s+ограничена|неограниченная\s+ответственность)",
+    "indefinite_term": r"(?i)(срок\s+действия\s+договора\s+не\s+определен|бессрочный)",
+    "unilateral_change": r"(?i)(изменение\s+условий\s+без\s+согласия)",
+    "unlimited_confidentiality": r"(?i)(конфиденциальность\s+не\s+ограничена)",
+    "no_force_majeure": r"(?i)(форс-мажор\s+не\s+предусмотрен)",
+    "unilateral_disputes": r"(?i)(спорные\s+вопросы\s+решаются\s+в\s+одностороннем\s+порядке)",
+}
+
+VARIANTS = {
+    "non_refundable": [
+        "Аванс перечисляется без возврата.",
+        "Уплаченные суммы не подлежат возврату.",
+        "Задаток не подлежит никакому возврату.",
+        "Взнос является невозвратным.",
+        "Предоплата не возвращается.",
+    ],
+    "unilateral_refusal": [
+        "Исполнитель вправе заявить односторонний отказ от договора.",
+        "Допускается односторонний внесудебный отказ от исполнения.",
+        "В случае одностороннего отказа Заказчика договор прекращается.",
+        "Покупатель вправе в одностороннем порядке расторгнуть договор.",
+        "Договор может быть изменен Продавцом в одностороннем внесудебном порядке.",
+    ],
+    "unlimited_liability": [
+        "Ответственность Исполнителя не ограничена.",
+        "Ответственность сторон ничем не ограничивается.",
+        "Поставщик несет неограниченную ответственность.",
+    ],
+    "indefinite_term": [
+        "Договор является бессрочным.",
+        "Настоящий договор заключен на бессрочный период.",
+        "Срок действия договора не определен.",
+    ],
+    "unilateral_change": [
+        "Изменение условий без согласия Арендатора допускается.",
+        "Допускается изменение существенных условий договора без согласия Заказчика.",
+    ],
+    "unlimited_confidentiality": [
+        "Конфиденциальность не ограничена сроком.",
+        "Конфиденциальность информации не ограничивается.",
+    ],
+    "no_force_majeure": [
+        "Форс-мажор не предусмотрен.",
+        "Форс-мажорные обстоятельства не предусмотрены.",
+        "Форс-мажор договором не предусмотрен.",
+    ],
+    "unilateral_disputes": [
+        "Спорные вопросы решаются в одностороннем порядке.",
+        "Все спорные вопросы решаются Продавцом в одностороннем порядке.",
+    ],
+}
+
+FILLER = (
+    "Поставщик обязуется передать товар в собственность Покупателя в согласованные сроки, "
+    "а Покупатель принять и оплатить его на условиях настоящего договора."
+)
+
+
+def recall(analyzer: AIAnalyzer):
+    regex_bank = {rule_id: re.compile(pattern) for rule_id, pattern in REGEX_BANK.items()}
+    found_regex = found_stems = total = 0
+    for rule_id, sentences in VARIANTS.items():
+        for sentence in sentences:
+            total += 1
+            found_regex += bool(regex_bank[rule_id].search(sentence))
+            found_stems += any(
+                pattern_info["id"] == rule_id for _, pattern_info, _, _ in analyzer.stem_matcher.match(sentence)
+            )
+    return found_regex, found_stems, total
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--paragraphs", type=int, default=40000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    analyzer = AIAnalyzer()
+    found_regex, found_stems, total = recall(analyzer)
+    print(f"recall on {total} inflected variants: regex {found_regex}/{total}, stems {found_stems}/{total}")
+
+    sentences = [sentence for variants in VARIANTS.values() for sentence in variants]
+    text = "\n".join(
+        sentences[number // 100 % len(sentences)] if number % 100 == 0 else FILLER
+        for number in range(args.paragraphs)
+    )
+    regex_bank = [re.compile(pattern) for pattern in REGEX_BANK.values()]
+    regex_seconds = best_of(args.repeat, lambda: [list(pattern.finditer(text)) for pattern in regex_bank])
+    stem_seconds = best_of(args.repeat, lambda: analyzer.stem_matcher.match(text))
+    megabytes = len(text.encode("utf-8")) / 1e6
+    print(f"scan of {megabytes:.1f} MB: regex bank {regex_seconds:.2f}s ({megabytes / regex_seconds:.1f} MB/s), "
+          f"phrase rules {stem_seconds:.2f}s ({megabytes / stem_seconds:.1f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
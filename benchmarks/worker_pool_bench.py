@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Memory and start-up cost of analyzer workers (app.services.worker_pool).
+
+Starts --workers worker processes three ways and lets each load what it needs,
+analyze a sample contract and run a garbage collection (as a long-running
+worker would) before it reports ready:
+
+- spawn: a fresh interpreter builds the whole analyzer state itself,
+- fork: forked from a parent that ran the warm-up steps, without sharing
+  arrays or freezing the heap,
+- warm fork: forked after preload_state() (shared arrays, gc.freeze()), the
+  way batch_analyze starts its workers.
+
+The analyzer state includes a clause index built from data/risky_clauses.jsonl
+and a risk scorer trained on synthetic labels, both in a temporary directory.
+For every mode the report gives the time until a worker is ready and its
+memory from /proc/<pid>/smaps_rollup: RSS, PSS (shared pages split between
+the processes using them) and private memory, i.e. what each additional
+worker costs. Fails (exit code 1) when a warm-fork worker exceeds the budgets.
+Linux only.
+
+Usage: python benchmarks/worker_pool_bench.py [--workers 4] [--max-private-mb 40] [--max-ready-ms 1000]
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+SAMPLE = os.path.join(BASE_DIR, "test_contract.doc")  # plain text despite the name
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def sample_text() -> str:
+    with open(SAMPLE, encoding="utf-8") as sample:
+        return sample.read() * 20
+
+
+def worker(connection, text: str):
+    """Load the state (a no-op when inherited), analyze one document, then wait to be measured"""
+    from app.services.ai_analyzer import get_analyzer
+    from app.services.contract_classifier import classify
+    from app.services.warmup import warmup_steps
+
+    for step in warmup_steps:
+        step()
+    get_analyzer().analyze_document(text, contract_type=classify(text))
+    gc.collect()
+    connection.send("ready")
+    connection.recv()
+
+
+def run_mode(context, workers: int, text: str) -> dict:
+    processes = []
+    for _ in range(workers):
+        parent_end, child_end = context.Pipe()
+        started = time.perf_counter()
+        process = context.Process(target=worker, args=(child_end, text), daemon=True)
+        process.start()
+        processes.append((process, parent_end, started))
+
+    ready = []
+    for process, connection, started in processes:
+        if not connection.poll(300):
+            raise SystemExit(f"Worker {process.pid} did not become ready")
+        connection.recv()
+        ready.append(time.perf_counter() - started)
+    # Measured while every worker is alive, so shared pages are split between all of them
+    memory = [memory_kb(process.pid) for process, _, _ in processes]
+    for process, connection, _ in processes:
+        connection.send("stop")
+        process.join(10)
+
+    return {
+        "ready_ms": [seconds * 1000 for seconds in ready],
+        "rss_mb": [sample["rss"] / 1024 for sample in memory],
+        "pss_mb": [sample["pss"] / 1024 for sample in memory],
+        "private_mb": [sample["private"] / 1024 for sample in memory],
+    }
+
+
+def configure(directory: str):
+    """Point the settings of this process and its children at artifacts in ``directory``"""
+    os.environ["CLAUSE_INDEX_DIR"] = os.path.join(directory, "clause_index")
+    os.environ["RISK_SCORER_PATH"] = os.path.join(directory, "risk_scorer.joblib")
+    os.environ["CLAUSE_INDEX_ENABLED"] = "true"
+
+
+def prepare_artifacts():
+    """Build the clause index and a risk scorer where configure() pointed the settings"""
+    from app.services.ai_analyzer import AIAnalyzer
+    from app.services.clause_index import build_index, load_library
+    from app.services.risk_scorer import RiskScorer, build_pipeline, match_features, new_version
+
+    build_index(load_library(os.path.join(BASE_DIR, "data", "risky_clauses.jsonl")), os.environ["CLAUSE_INDEX_DIR"])
+
+    text = sample_text()
+    risks = AIAnalyzer().analyze_document(text, score=False)
+    generator = random.Random(1)
+    features = match_features(text, risks) * 10
+    labels = [generator.randint(0, 1) for _ in features]
+    labels[:2] = [0, 1]
+    pipeline = build_pipeline()
+    pipeline.fit(features, labels)
+    RiskScorer(pipeline, new_version()).save(os.environ["RISK_SCORER_PATH"])
+
+
+def summary(values) -> str:
+    return f"{statistics.median(values):8.1f} {max(values):8.1f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-private-mb", type=float, default=40.0, help="budget of private memory per warm worker")
+    parser.add_argument("--max-ready-ms", type=float, default=1000.0, help="budget of the time until a warm worker is ready")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="worker-pool-bench-")
+    try:
+        configure(directory)
+        # Artifacts are built in a child so this process starts the modes with a clean heap
+        builder = multiprocessing.get_context("spawn").Process(target=prepare_artifacts)
+        builder.start()
+        builder.join()
+        if builder.exitcode != 0:
+            raise SystemExit("Building the benchmark artifacts failed")
+        text = sample_text()
+
+        results = {"spawn": run_mode(multiprocessing.get_context("spawn"), args.workers, text)}
+
+        from app.services.warmup import warmup_steps
+        from app.services.worker_pool import preload_state
+
+        fork = multiprocessing.get_context("fork")
+        started = time.perf_counter()
+        for step in warmup_steps:
+            step()
+        load_seconds = time.perf_counter() - started
+        results["fork"] = run_mode(fork, args.workers, text)
+
+        preloaded = preload_state()
+        results["warm fork"] = run_mode(fork, args.workers, text)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{args.workers} workers; the parent loads the state once in {load_seconds * 1000:.0f} ms, "
+          f"{preloaded.shared_bytes / 1024 / 1024:.1f} MB of arrays shared\n")
+    print(f"{'':<10} {'ready ms':>17} {'RSS MB':>17} {'PSS MB':>17} {'private MB':>17}")
+    print(f"{'':<10}" + f" {'median':>8} {'max':>8}" * 4)
+    for mode, result in results.items():
+        print(f"{mode:<10} {summary(result['ready_ms'])} {summary(result['rss_mb'])} "
+              f"{summary(result['pss_mb'])} {summary(result['private_mb'])}")
+
+    warm = results["warm fork"]
+    failed = False
+    if max(warm["private_mb"]) > args.max_private_mb:
+        print(f"FAIL: a warm worker uses {max(warm['private_mb']):.1f} MB of private memory "
+              f"(budget {args.max_private_mb:.0f} MB)")
+        failed = True
+    if max(warm["ready_ms"]) > args.max_ready_ms:
+        print(f"FAIL: a warm worker took {max(warm['ready_ms']):.0f} ms to become ready "
+              f"(budget {args.max_ready_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
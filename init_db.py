@@ -1,27 +1,42 @@
 #!/usr/bin/env python3
 """
-Script to initialize the database with tables and sample data
+Script to initialize the database schema by applying Alembic migrations
 """
 
 import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from sqlalchemy import create_engine
-from app.database import Base
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
 from app.core.config import settings
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def get_alembic_config() -> Config:
+    alembic_cfg = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return alembic_cfg
+
 def init_database():
-    """Initialize the database with all tables"""
-    print("Creating database tables...")
+    """Bring the database schema up to date with all migrations"""
+    print("Applying database migrations...")
+    
+    alembic_cfg = get_alembic_config()
     
-    # Create engine
+    # Databases created by the old create_all() startup hook have the
+    # initial tables but no migration history; mark them as migrated.
     engine = create_engine(settings.database_url)
+    table_names = inspect(engine).get_table_names()
+    engine.dispose()
+    if "users" in table_names and "alembic_version" not in table_names:
+        print("Existing schema without migration history found, stamping initial revision...")
+        command.stamp(alembic_cfg, "0001")
     
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    command.upgrade(alembic_cfg, "head")
     
-    print("Database tables created successfully!")
+    print("Database schema is up to date!")
     print(f"Database URL: {settings.database_url}")
 
 if __name__ == "__main__":
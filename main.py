@@ -1,19 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import HTTPBearer
+from sqlalchemy import text
 import uvicorn
 
-from app.database import engine, Base
-from app.routers import auth, documents
-from app.core.config import settings
+from app.database import engine
+from app.routers import auth, documents, admin
+from app.core.config import settings, ensure_directories
+from app.core.metrics import REGISTRY, CONTENT_TYPE_LATEST, MetricsMiddleware
+from app.core.tracing import TracingMiddleware
+from app.services.extraction_sandbox import shutdown_extraction_sandbox
+from app.services.warmup import warmup_state, start_warmup
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Database schema is managed by Alembic migrations (see init_db.py),
+# not created on import.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ensure_directories()
+    if settings.warmup_on_startup:
+        start_warmup()
+    yield
+    shutdown_extraction_sandbox()
 
 app = FastAPI(
     title="Legal Document Analysis API",
     description="API для анализа юридических документов и выявления рисков",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -25,9 +41,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request (settings.tracing_enabled)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(documents.router, prefix="/documents", tags=["documents"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -35,7 +58,32 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness probe: the process is up and serving requests"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: database reachable and warm-up (if enabled) finished"""
+    checks = {"warmup": warmup_state.as_dict()}
+    ready = warmup_state.ready
+    
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = str(e)
+        ready = False
+    
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not ready", "checks": checks}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,15 +1,52 @@
 #!/usr/bin/env python3
 """
-Простой mock backend для демонстрации frontend функциональности
+Mock backend для frontend и нагрузочного тестирования.
+
+Сервер многопоточный (ThreadingHTTPServer), принимает multipart-загрузки
+потоково с записью на диск и анализирует документы настоящими
+DocumentProcessor и AIAnalyzer. Для имитации production поддерживаются
+искусственная задержка и внедрение ошибок:
+
+    python mock_backend.py --latency-ms 50 --jitter-ms 20 --error-rate 0.01
+
+Те же параметры задаются переменными окружения MOCK_PORT, MOCK_LATENCY_MS,
+MOCK_JITTER_MS, MOCK_ERROR_RATE, MOCK_ASYNC_PROCESSING и MOCK_UPLOAD_DIR.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
 import json
+import os
+import random
+import sys
+import threading
+import time
 import urllib.parse
 import re
+import copy
 from datetime import datetime
 import uuid
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.document_processor import DocumentProcessor
+from app.services.ai_analyzer import get_analyzer
+
+class MockConfig:
+    """Параметры имитации (задаются из командной строки или окружения)"""
+    port = int(os.environ.get("MOCK_PORT", 8000))
+    latency_ms = float(os.environ.get("MOCK_LATENCY_MS", 0))
+    jitter_ms = float(os.environ.get("MOCK_JITTER_MS", 0))
+    error_rate = float(os.environ.get("MOCK_ERROR_RATE", 0))
+    async_processing = os.environ.get("MOCK_ASYNC_PROCESSING", "0").lower() in ("1", "true", "yes")
+    upload_dir = os.environ.get("MOCK_UPLOAD_DIR", "mock_uploads")
+    max_upload_size = 400 * 1024 * 1024  # 400MB
+
+config = MockConfig()
+
+# Блокировка для данных, разделяемых потоками обработчиков
+db_lock = threading.Lock()
+
 # Mock данные
 users_db = {
     "test@example.com": {
@@ -113,6 +150,174 @@ documents_db = [
 ]
 analysis_results_db = []
 
+class MultipartStreamParser:
+    """Потоковый разбор multipart/form-data с записью файлов на диск
+    
+    Тело читается блоками фиксированного размера, поэтому память не зависит
+    от размера загружаемого файла.
+    """
+    
+    def __init__(self, rfile, content_length, boundary, upload_dir, chunk_size=64 * 1024):
+        self.rfile = rfile
+        self.remaining = content_length
+        self.delimiter = b"\r\n--" + boundary
+        self.upload_dir = upload_dir
+        self.chunk_size = chunk_size
+        # Первой границе не предшествует CRLF — добавляем его, чтобы искать единый разделитель
+        self.buffer = b"\r\n"
+    
+    def _fill(self):
+        """Дочитать следующий блок тела; False, если тело закончилось"""
+        if self.remaining <= 0:
+            return False
+        chunk = self.rfile.read(min(self.chunk_size, self.remaining))
+        if not chunk:
+            self.remaining = 0
+            return False
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+        return True
+    
+    def _read_until(self, marker):
+        """Вернуть данные до marker (без него) и убрать их из буфера"""
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                data = self.buffer[:index]
+                self.buffer = self.buffer[index + len(marker):]
+                return data
+            if len(self.buffer) > 64 * 1024:
+                raise ValueError("Malformed multipart body")
+            if not self._fill():
+                raise ValueError("Unexpected end of multipart body")
+    
+    def _copy_until_delimiter(self, output):
+        """Записать тело части в output до следующего разделителя; вернуть размер"""
+        size = 0
+        keep = len(self.delimiter) - 1
+        while True:
+            index = self.buffer.find(self.delimiter)
+            if index >= 0:
+                output.write(self.buffer[:index])
+                size += index
+                self.buffer = self.buffer[index + len(self.delimiter):]
+                return size
+            if len(self.buffer) > keep:
+                output.write(self.buffer[:-keep])
+                size += len(self.buffer) - keep
+                self.buffer = self.buffer[-keep:]
+            if not self._fill():
+                raise ValueError("Unexpected end of multipart body")
+    
+    def _read_after_delimiter(self):
+        while len(self.buffer) < 2:
+            if not self._fill():
+                break
+        marker, self.buffer = self.buffer[:2], self.buffer[2:]
+        return marker
+    
+    def parse(self):
+        """Вернуть (поля формы, файлы); файлы: [{field, filename, path, size}]"""
+        fields, files = {}, []
+        self._read_until(self.delimiter)
+        
+        while self._read_after_delimiter() == b"\r\n":
+            raw_headers = self._read_until(b"\r\n\r\n").decode("utf-8", errors="replace")
+            disposition = ""
+            for line in raw_headers.split("\r\n"):
+                name, _, value = line.partition(":")
+                if name.strip().lower() == "content-disposition":
+                    disposition = value
+            params = dict(
+                (key.strip().lower(), value.strip().strip('"'))
+                for key, _, value in (item.partition("=") for item in disposition.split(";")[1:])
+            )
+            field = params.get("name", "")
+            
+            if "filename" in params:
+                filename = os.path.basename(params["filename"].replace("\\", "/")) or "uploaded_document"
+                path = os.path.join(self.upload_dir, f"{uuid.uuid4()}_{filename}")
+                with open(path, "wb") as output:
+                    size = self._copy_until_delimiter(output)
+                files.append({"field": field, "filename": filename, "path": path, "size": size})
+            else:
+                value = _LimitedBuffer(1024 * 1024)
+                self._copy_until_delimiter(value)
+                fields[field] = value.getvalue().decode("utf-8", errors="replace")
+        
+        # Дочитываем эпилог, чтобы соединение осталось в корректном состоянии
+        while self._fill():
+            self.buffer = b""
+        return fields, files
+
+class _LimitedBuffer:
+    """Буфер для текстовых полей формы с ограничением размера"""
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise ValueError("Form field too large")
+        self.parts.append(data)
+    
+    def getvalue(self):
+        return b"".join(self.parts)
+
+def simulate_latency():
+    """Искусственная задержка ответа"""
+    delay_ms = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+
+def should_inject_error():
+    return config.error_rate > 0 and random.random() < config.error_rate
+
+def process_uploaded_document(document, file_path):
+    """Извлечение текста и анализ рисков настоящими сервисами"""
+    with db_lock:
+        document["status"] = "processing"
+    try:
+        content = DocumentProcessor().extract_text(file_path)
+        risks = get_analyzer().analyze_document(content)
+    except Exception as e:
+        with db_lock:
+            document["status"] = "error"
+            document["error"] = str(e)
+        print(f"Processing error for document {document['id']}: {e}")
+        return
+    
+    created_at = datetime.now().isoformat()
+    with db_lock:
+        results = []
+        for risk in risks:
+            results.append({
+                "id": next_result_id(),
+                "document_id": document["id"],
+                "risk_level": risk["level"].value,
+                "text_fragment": risk["text"],
+                "explanation": risk["explanation"],
+                "start_position": risk["start_position"],
+                "end_position": risk["end_position"],
+                "confidence_score": risk["confidence"],
+                "created_at": created_at
+            })
+        document["analysis_results"] = results
+        document["status"] = "analyzed"
+
+def next_document_id():
+    """Следующий ID документа (вызывать под db_lock)"""
+    return max((doc["id"] for doc in documents_db), default=0) + 1
+
+_result_ids = iter(range(1000, sys.maxsize))
+
+def next_result_id():
+    return next(_result_ids)
+
+
 class MockAPIHandler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """Обработка CORS preflight запросов"""
@@ -128,8 +333,18 @@ class MockAPIHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', 'http://localhost:3000')
         self.send_header('Access-Control-Allow-Credentials', 'true')
 
+    def before_request(self):
+        """Имитация задержки и сбоев; False, если запрос уже завершен ошибкой"""
+        simulate_latency()
+        if should_inject_error():
+            self.send_error_response(500, "Injected error")
+            return False
+        return True
+
     def do_POST(self):
         """Обработка POST запросов"""
+        if not self.before_request():
+            return
         if self.path.startswith('/auth/'):
             self.handle_auth_post()
         elif self.path.startswith('/documents/'):
@@ -139,7 +354,8 @@ class MockAPIHandler(BaseHTTPRequestHandler):
     
     def do_DELETE(self):
         """Обработка DELETE запросов"""
-        print(f"DELETE request to: {self.path}")
+        if not self.before_request():
+            return
         if self.path.startswith('/documents/'):
             self.handle_documents_delete()
         else:
@@ -147,7 +363,8 @@ class MockAPIHandler(BaseHTTPRequestHandler):
 
     def do_GET(self):
         """Обработка GET запросов"""
-        print(f"GET request to: {self.path}")  # Отладочная информация
+        if self.path != '/health' and not self.before_request():
+            return
         if self.path.startswith('/auth/'):
             self.handle_auth_get()
         elif self.path.startswith('/documents'):
@@ -160,7 +377,6 @@ class MockAPIHandler(BaseHTTPRequestHandler):
                 "version": "1.0.0"
             })
         else:
-            print(f"404 for path: {self.path}")  # Отладочная информация
             self.send_error_response(404, "Not found")
 
     def handle_auth_post(self):
@@ -195,18 +411,20 @@ class MockAPIHandler(BaseHTTPRequestHandler):
         password = data.get('password')
         full_name = data.get('full_name')
 
-        if email in users_db:
-            self.send_error_response(400, "Email already registered")
+        with db_lock:
+            if email in users_db:
+                self.send_error_response(400, "Email already registered")
+                return
 
-        user_id = len(users_db) + 1
-        users_db[email] = {
-            "id": user_id,
-            "email": email,
-            "full_name": full_name,
-            "password": password,
-            "is_active": True,
-            "created_at": datetime.now().isoformat()
-        }
+            user_id = len(users_db) + 1
+            users_db[email] = {
+                "id": user_id,
+                "email": email,
+                "full_name": full_name,
+                "password": password,
+                "is_active": True,
+                "created_at": datetime.now().isoformat()
+            }
 
         self.send_json_response({
             "id": user_id,
@@ -228,6 +446,7 @@ class MockAPIHandler(BaseHTTPRequestHandler):
         auth_header = self.headers.get('Authorization', '')
         if not auth_header.startswith('Bearer '):
             self.send_error_response(401, "Could not validate credentials")
+            return
 
         # Проверяем токен (для демонстрации принимаем любой Bearer токен)
         # Для демонстрации возвращаем тестового пользователя
@@ -271,118 +490,113 @@ class MockAPIHandler(BaseHTTPRequestHandler):
     
     def delete_document(self, doc_id):
         """Удаление документа по ID"""
-        global documents_db
-        original_length = len(documents_db)
-        documents_db = [doc for doc in documents_db if doc['id'] != doc_id]
-        return len(documents_db) < original_length
+        with db_lock:
+            for index, doc in enumerate(documents_db):
+                if doc['id'] == doc_id:
+                    del documents_db[index]
+                    return True
+        return False
 
     def handle_document_upload(self):
         """Обработка загрузки документа"""
-        print("=== Document Upload Started ===")
-        
         # Проверяем авторизацию (для демонстрации принимаем любой Bearer токен)
         auth_header = self.headers.get('Authorization', '')
-        print(f"Auth header: {auth_header[:20]}...")
         if not auth_header.startswith('Bearer '):
             self.send_error_response(401, "Could not validate credentials")
             return
         
         # Получаем данные формы
         content_type = self.headers.get('Content-Type', '')
-        print(f"Content-Type: {content_type}")
         if not content_type.startswith('multipart/form-data'):
             self.send_error_response(400, "Invalid content type")
             return
         
         # Читаем данные формы
         content_length = int(self.headers.get('Content-Length', 0))
-        print(f"Content-Length: {content_length}")
         if content_length == 0:
             self.send_error_response(400, "No file uploaded")
             return
         
         # Проверяем размер файла (400MB)
-        max_size = 400 * 1024 * 1024  # 400MB
+        max_size = config.max_upload_size
         if content_length > max_size:
             self.send_error_response(400, f"Размер файла превышает 400MB. Размер файла: {content_length / (1024*1024):.1f}MB")
             return
         
-        # Простое извлечение имени файла из multipart данных
-        post_data = self.rfile.read(content_length).decode('utf-8', errors='ignore')
-        print(f"Post data length: {len(post_data)}")
+        boundary = None
+        for item in content_type.split(";")[1:]:
+            key, _, value = item.strip().partition("=")
+            if key.lower() == "boundary":
+                boundary = value.strip('"').encode("latin-1")
+        if not boundary:
+            self.send_error_response(400, "Missing multipart boundary")
+            return
         
-        # Ищем имя файла в данных
-        filename = "uploaded_document.pdf"
-        if 'filename=' in post_data:
-            try:
-                filename_start = post_data.find('filename="') + 10
-                filename_end = post_data.find('"', filename_start)
-                if filename_start > 9 and filename_end > filename_start:
-                    filename = post_data[filename_start:filename_end]
-                    print(f"Extracted filename: {filename}")
-            except Exception as e:
-                print(f"Error extracting filename: {e}")
-                pass
+        # Потоковый разбор тела с записью файла на диск
+        os.makedirs(config.upload_dir, exist_ok=True)
+        try:
+            fields, files = MultipartStreamParser(self.rfile, content_length, boundary, config.upload_dir).parse()
+        except ValueError as e:
+            self.send_error_response(400, f"Invalid multipart body: {e}")
+            return
+        
+        if not files:
+            self.send_error_response(400, "No file uploaded")
+            return
         
-        print(f"Final filename: {filename}")
+        upload = files[0]
+        for extra in files[1:]:
+            os.remove(extra["path"])
+        filename = upload["filename"]
+        print(f"Uploaded file: {filename} ({upload['size']} bytes)")
         
         # Определяем расширение файла
         file_extension = filename.lower().split('.')[-1] if '.' in filename else 'pdf'
-        print(f"File extension: {file_extension}")
         
         # Поддерживаемые форматы
         supported_formats = ['docx', 'pdf', 'doc', 'rtf', 'txt']
         if file_extension not in supported_formats:
+            os.remove(upload["path"])
             error_msg = f"Неподдерживаемый формат файла: .{file_extension}. Поддерживаются: {', '.join(supported_formats)}"
             print(f"Format error: {error_msg}")
             self.send_error_response(400, error_msg)
             return
         
-        print(f"File format {file_extension} is supported")
+        with db_lock:
+            doc_id = next_document_id()
+            document = {
+                "id": doc_id,
+                "filename": os.path.basename(upload["path"]),
+                "original_filename": filename,
+                "file_size": upload["size"],
+                "status": "uploaded",
+                "user_id": 1,
+                "created_at": datetime.now().isoformat(),
+                "analysis_results": []
+            }
+            documents_db.append(document)
         
-        # Для демонстрации создаем mock документ
-        doc_id = len(documents_db) + 1
-        document = {
-            "id": doc_id,
-            "filename": f"document_{doc_id}.pdf",
-            "original_filename": filename,
-            "file_size": 1024000,
-            "status": "analyzed",
-            "user_id": 1,
-            "created_at": datetime.now().isoformat(),
-            "analysis_results": [
-                {
-                    "id": 1,
-                    "risk_level": "high",
-                    "text_fragment": "без возврата",
-                    "explanation": "Условие о невозврате средств может быть незаконным",
-                    "confidence_score": 85
-                },
-                {
-                    "id": 2,
-                    "risk_level": "medium",
-                    "text_fragment": "срок действия договора не определен",
-                    "explanation": "Неопределенный срок договора может создавать неопределенность",
-                    "confidence_score": 70
-                }
-            ]
-        }
-        documents_db.append(document)
+        # Анализ настоящими сервисами: синхронно или в фоне (как очередь обработки)
+        if config.async_processing:
+            threading.Thread(target=process_uploaded_document, args=(document, upload["path"]), daemon=True).start()
+        else:
+            process_uploaded_document(document, upload["path"])
 
         self.send_json_response({
             "document_id": doc_id,
             "message": "Document uploaded successfully",
-            "status": "analyzed"
+            "status": document["status"]
         })
 
     def handle_documents_get(self):
         """Обработка GET запросов документов"""
-        print(f"handle_documents_get called with path: {self.path}")  # Отладочная информация
-        if self.path == '/documents':
-            print("Calling handle_get_documents")  # Отладочная информация
+        path = urllib.parse.urlparse(self.path).path.rstrip('/')
+        match = re.fullmatch(r'/documents/(\d+)(/analysis)?', path)
+        if path == '/documents':
             self.handle_get_documents()
+        elif match:
+            self.handle_get_document(int(match.group(1)), analysis=bool(match.group(2)))
         else:
-            print(f"404 in handle_documents_get for path: {self.path}")  # Отладочная информация
             self.send_error_response(404, "Not found")
 
     def handle_get_documents(self):
@@ -394,7 +608,35 @@ class MockAPIHandler(BaseHTTPRequestHandler):
             return
             
         # Для демонстрации возвращаем все документы
-        self.send_json_response(documents_db)
+        with db_lock:
+            documents = copy.deepcopy(documents_db)
+        self.send_json_response(documents)
+
+    def handle_get_document(self, doc_id, analysis=False):
+        """Документ или отчет об анализе в формате основного API"""
+        auth_header = self.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            self.send_error_response(401, "Could not validate credentials")
+            return
+        
+        with db_lock:
+            document = next((copy.deepcopy(doc) for doc in documents_db if doc['id'] == doc_id), None)
+        if document is None:
+            self.send_error_response(404, "Document not found")
+            return
+        
+        if not analysis:
+            self.send_json_response(document)
+            return
+        
+        levels = [result['risk_level'] for result in document['analysis_results']]
+        self.send_json_response({
+            "document": document,
+            "total_risks": len(levels),
+            "high_risks": levels.count("high"),
+            "medium_risks": levels.count("medium"),
+            "low_risks": levels.count("low")
+        })
 
     def get_json_data(self):
         """Получение JSON данных из запроса"""
@@ -424,15 +666,36 @@ class MockAPIHandler(BaseHTTPRequestHandler):
 
 def run_server():
     """Запуск сервера"""
-    server_address = ('', 8000)
-    httpd = HTTPServer(server_address, MockAPIHandler)
-    print("Mock Backend запущен на http://localhost:8000")
+    parser = argparse.ArgumentParser(description="Mock backend для frontend и нагрузочных тестов")
+    parser.add_argument("--port", type=int, default=config.port)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms, help="Искусственная задержка каждого ответа")
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms, help="Случайный разброс задержки (+/-)")
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="Доля запросов, завершаемых ошибкой 500 (0..1)")
+    parser.add_argument("--async-processing", action="store_true", default=config.async_processing,
+                        help="Обрабатывать документы в фоне (статус processing, затем analyzed)")
+    parser.add_argument("--upload-dir", default=config.upload_dir)
+    args = parser.parse_args()
+    config.port = args.port
+    config.latency_ms = args.latency_ms
+    config.jitter_ms = args.jitter_ms
+    config.error_rate = args.error_rate
+    config.async_processing = args.async_processing
+    config.upload_dir = args.upload_dir
+
+    server_address = ('', config.port)
+    httpd = ThreadingHTTPServer(server_address, MockAPIHandler)
+    httpd.daemon_threads = True
+    print(f"Mock Backend запущен на http://localhost:{config.port}")
+    print(f"Задержка: {config.latency_ms:.0f}±{config.jitter_ms:.0f} мс, доля ошибок: {config.error_rate:.2%}, "
+          f"фоновая обработка: {'да' if config.async_processing else 'нет'}")
     print("Доступные эндпоинты:")
     print("   POST /auth/login - Вход в систему")
     print("   POST /auth/register - Регистрация")
     print("   GET /auth/me - Информация о пользователе")
     print("   POST /documents/upload - Загрузка документа")
     print("   GET /documents - Список документов")
+    print("   GET /documents/{id} - Документ")
+    print("   GET /documents/{id}/analysis - Результаты анализа")
     print("   GET /health - Проверка здоровья")
     print("\nFrontend должен быть доступен на http://localhost:3000")
     print("\nТестовые данные:")
@@ -448,4 +711,3 @@ def run_server():
 
 if __name__ == '__main__':
     run_server()
-